@@ -1,16 +1,22 @@
 import streamlit as st
 import pandas as pd
 import time
-import random
-import csv
 import os
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+import beestar
+from browser import SessionPool
+import croma
+import flipkart
+import jobs
+import matching
+from history import get_history
+import normalize
+from page_cache import get_cache
+import pipelines
+import ratelimit
+import timing
+import vijaysales
+from workers import default_workers
 
 # Streamlit Config
 st.set_page_config(page_title="Octolife's Data Scrapping Toolkit", layout="wide")
@@ -31,6 +37,104 @@ st.markdown(
 st.title("Octolife's Data Extracting Toolkit")
 st.logo("logo.png", size = "large")
 
+
+# Crawl depth choice -> (light, deep_new) for the Croma and Vijay Sales runs
+CRAWL_DEPTHS = {
+    "Full": (False, False),
+    "Light": (True, False),
+    "Light + new models in full": (True, True),
+}
+
+
+# Warm Chrome sessions, kept alive across reruns and shared by every run
+@st.cache_resource
+def session_pool():
+    return SessionPool()
+
+
+pool = session_pool()
+
+
+# Where the run's time went per phase, with the numbers for export
+def show_timings(timer):
+    with st.expander(timer.summary()):
+        st.dataframe(pd.DataFrame(timer.breakdown()), use_container_width=True, hide_index=True)
+        st.download_button("⬇️ Timings (JSON)", timing.to_json(), file_name="timings.json",
+                           mime="application/json", key=f"timings_json_{timer.site}")
+        st.download_button("⬇️ Timings (Prometheus)", timing.to_prometheus(), file_name="timings.prom",
+                           mime="text/plain", key=f"timings_prom_{timer.site}")
+
+
+# Preview and download of a finished (or, for a background job, growing) CSV. With the
+# site, the cleaned copy with typed price/tons/stars/reviews columns is offered as well.
+def show_csv(filename, key=None, site=None):
+    df = pd.read_csv(filename)
+    st.write("📄 Preview of Extracted Data:")
+    st.dataframe(df.head(10), use_container_width=True)
+
+    with open(filename, "rb") as f:
+        st.download_button(
+            label="⬇️ Download CSV",
+            data=f,
+            file_name=os.path.basename(filename),
+            mime="text/csv",
+            key=key
+        )
+
+    if site:
+        clean, clean_file = normalize.cleaned(site, filename)
+        st.write("🧹 Cleaned Data:")
+        st.dataframe(clean.head(10), use_container_width=True)
+        with open(clean_file, "rb") as f:
+            st.download_button(
+                label="⬇️ Download Cleaned CSV",
+                data=f,
+                file_name=os.path.basename(clean_file),
+                mime="text/csv",
+                key=f"{key}_clean" if key else None
+            )
+
+
+# Shows a pipeline's progress on the page
+class StreamlitReporter(pipelines.Reporter):
+    def __init__(self, unit="products"):
+        super().__init__()
+        self.unit = unit
+        self.progress_bar = st.progress(0)
+        self.status_text = st.empty()
+        self.shards = {}
+        self.shard_table = st.empty()
+
+    def progress(self, done, total, rows):
+        elapsed = int(time.time() - self.start_time)
+        if total:
+            self.progress_bar.progress(min(done / total, 1.0))
+        if self.unit == "pages":
+            self.status_text.markdown(f"⏳ Scraped {rows} items from {done}/{total} pages. "
+                                      f"Estimated time left: **{self.eta(done, total)} seconds**")
+        elif self.unit == "shards":
+            self.status_text.markdown(f"⏳ {done}/{total} shards done, {rows} unique entries ({elapsed} seconds)...")
+        elif self.unit == "entries":
+            self.status_text.markdown(f"⏳ Scraped {rows} entries so far ({elapsed} seconds)...")
+        else:
+            self.status_text.markdown(f"⏳ Scraped {done}/{total} products. "
+                                      f"Estimated time left: **{self.eta(done, total)} sec**")
+
+    def note(self, message):
+        st.write(message)
+
+    def warn(self, message):
+        st.warning(message)
+
+    def shard(self, label, status):
+        self.shards[label] = status
+        self.shard_table.dataframe(pd.DataFrame(list(self.shards.items()), columns=["Shard", "Status"]),
+                                   use_container_width=True, hide_index=True)
+
+    def finish(self, message):
+        self.progress_bar.empty()
+        self.status_text.success(message)
+
 # Sidebar Menu
 mode = st.sidebar.radio(
     "Select Website",
@@ -38,7 +142,9 @@ mode = st.sidebar.radio(
         "Croma",
         "VijaySales",
         "Flipkart",
-        "BEE Star Label"
+        "BEE Star Label",
+        "Background Jobs",
+        "Compare Sites"
     ]
 )
 
@@ -49,196 +155,43 @@ if mode == "Croma":
         "This tool extracts Title, Brand, Model No, Capacity, BEE rating, ISEER rating, Price, Customer Rating, Number of Reviews, Cooling Power, Air Flow and Product Link")
     st.divider()
     SEARCH_FOR = st.text_input("Which product do you want to scrape?", placeholder="Split AC")
+    NUM_WORKERS = st.number_input("Parallel browsers", min_value=1, max_value=16, value=default_workers(),
+                                  help="Each browser scrapes its own share of the product pages")
+    KEEP_ORDER = st.checkbox("Keep listing order in CSV", value=False,
+                             help="Rows are written in the order Croma lists them instead of as they finish")
+    FETCHER = st.radio("Fetch product pages with", ["Browser", "HTTP fast path"], horizontal=True,
+                       help="The fast path downloads product pages without Chrome and only opens the "
+                            "browser for pages whose details need JavaScript")
+    RESUME = st.checkbox("Resume last run", value=False,
+                         help="Skip discovery and the products already saved by an interrupted run of the same search")
+    USE_CACHE = st.checkbox("Use page cache", value=True,
+                            help="Reuse product pages fetched recently: specs are kept for two weeks, "
+                                 "price and reviews for two hours")
+    CHANGED_ONLY = st.checkbox("Only open new or changed products", value=True,
+                               help="Products whose listing price, rating and reviews match the price history "
+                                    "keep their last saved row instead of having their page opened again")
+    CRAWL = st.radio("Crawl depth", list(CRAWL_DEPTHS), horizontal=True,
+                     help="Light takes title, price and rating straight from the listing cards instead of "
+                          "opening every product page; specs come from the product's last full scrape, if any")
     if st.button("Start Extracting"):
         try:
-            # Setup WebDriver
-            options = webdriver.ChromeOptions()
-            options.add_argument('--disable-gpu')
-            options.add_argument("--window-size=1920,1080")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--no-sandbox")
-            driver = webdriver.Chrome(options=options)
-            driver.get("https://www.croma.com")
-            counter = 0
-
-            # Search for "Split AC"
-            searchbar = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "searchV2"))
-            )
-            searchbar.clear()
-            searchbar.send_keys(SEARCH_FOR)
-            searchbar.send_keys(Keys.RETURN)
-
-            # Wait for results to load
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "h3.product-title a"))
-            )
-
-            # Auto-click "View More" until gone
-            while True:
-                try:
-                    view_more_button = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'View More')]"))
-                    )
-                    driver.execute_script("arguments[0].click();", view_more_button)
-                    time.sleep(1)
-                except:
-                    break
-
-            # Collect product links
-            product_links = driver.find_elements(By.CSS_SELECTOR, "h3.product-title a")
-            links_list = [link.get_attribute("href") for link in product_links]
-            # print(f"Total products found: {len(links_list)}")
-
-            # Set up CSV file
-            filename = "Croma_Data.csv"
-            COLUMNS = ["Title", "Brand", "Model No", "Capacity", "BEE Star", "ISEER", "Price", "Review",
-                       "No of Reviews",
-                       "Cooling", "Air Flow", "Product Link"]
-
-            # Create CSV with headers only if not already present
-            with open(filename, mode="w", newline='', encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(COLUMNS)
-
-            #Time Calculator
-            total_links = len(links_list)
-            st.write(f"🔍 Found **{total_links}** products. Starting detailed scrape...")
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            start_time = time.time()
-
-            # Loop through each product link
-            for i in range(len(links_list)):
-                new_link = links_list[i]
-                # print("Opening:", new_link)
-                counter += 1
-
-                try:
-                    driver.get(new_link)
-                    elapsed = time.time() - start_time
-                    avg_time = elapsed / (i + 1)
-                    remaining = avg_time * (total_links - (i + 1))
-                    progress = int(((i + 1) / total_links) * 100)
-
-                    status_text.markdown(f"⏳ Estimated time left: **{int(remaining)} sec**")
-                    progress_bar.progress(progress)
-
-                    WebDriverWait(driver, 25).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "h1.pd-title.pd-title-normal"))
-                    )
-
-                    # print("✅ Product page loaded.")
-                    # print(f"📦 Product Number {counter}")
-
-                except TimeoutException:
-                    # print(f"⚠️ Skipping product {counter} due to loading timeout.\n")
-                    continue
-
-                driver.execute_script("window.scrollBy(0, 1500);")
-                time.sleep(1)
-
-                try:
-                    view_more_buttons = WebDriverWait(driver, 5).until(
-                        EC.presence_of_all_elements_located((By.CLASS_NAME, "btn-viewmore-click"))
-                    )
-                    driver.execute_script("arguments[0].click();", view_more_buttons[0])
-                    time.sleep(1)
-
-                except Exception as e:
-                    st.warning(f"⚠️ 'View More' button not found or clickable: {e}")
-
-                titles = driver.find_elements(By.CSS_SELECTOR, "li.cp-specification-spec-title > h4")
-                values = driver.find_elements(By.CSS_SELECTOR, "li.cp-specification-spec-details")
-
-                if not titles or not values:
-                    st.warning("❌ Specs not found.")
-                else:
-                    # print(f"✅ Found {len(titles)} spec titles and {len(values)} values.")
-
-                    specs = {t.text.strip(): v.text.strip() for t, v in zip(titles, values)}
-
-                # Main Product Details
-                try:
-                    # Wait for both title and price to appear (max 15 seconds each)
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "h1.pd-title.pd-title-normal"))
-                    )
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.ID, "pdp-product-price"))
-                    )
-
-                    # Extract title
-                    item_title = driver.find_element(By.CSS_SELECTOR, "h1.pd-title.pd-title-normal").text.strip()
-
-                    # Extract price — sometimes it's in a <span> inside the div
-                    price_block = driver.find_element(By.ID, "pdp-product-price")
-                    try:
-                        price_span = price_block.find_element(By.TAG_NAME, "span")
-                        item_price = price_span.text.strip() or price_block.text.strip()
-                    except:
-                        item_price = price_block.text.removeprefix('₹').strip()
-
-                    # Extract review
-                    try:
-                        item_review = driver.find_element(By.CSS_SELECTOR,
-                                                          "span[style*='color: rgb(18, 218, 168)']").text.strip()
-                        item_num_review = driver.find_element(By.CSS_SELECTOR, "a.pr-review.review-text").text.strip()
-                    except:
-                        item_review = "NA"
-                        item_num_review = "NA"
-
-                except Exception as e:
-                    st.warning(f"⚠️ Error loading title/price/review: {e}")
-                    item_title = "NA"
-                    item_price = "NA"
-                    item_review = "NA"
-                    item_num_review = "NA"
-
-                item_brand = specs.get('Brand', 'Not Available')
-                item_model = specs.get('Model Number', 'Not Available')
-                item_capacity = specs.get('Air Conditioner Capacity', 'Not Available')
-                item_BEEstar = specs.get('Energy Efficiency (Star Rating)', 'Not Available')
-                item_ISSER = specs.get('Indian Seasonal Energy Efficiency Ratio (ISEER)', 'Not Available')
-                item_cooling = specs.get('Cooling Capacity', 'Not Available')
-                item_airflow = specs.get('Air Flow Volume', 'Not Available')
-
-                # Write row to CSV immediately
-                with open(filename, mode="a", newline='', encoding="utf-8") as f:
-                    writer = csv.writer(f)
-                    writer.writerow([
-                        item_title,
-                        item_brand,
-                        item_model,
-                        item_capacity,
-                        item_BEEstar,
-                        item_ISSER,
-                        item_price,
-                        item_review,
-                        item_num_review,
-                        item_cooling,
-                        item_airflow,
-                        new_link
-                    ])
+            cache = get_cache() if USE_CACHE else None
+            history = get_history()
+            light, deep_new = CRAWL_DEPTHS[CRAWL]
+            reporter = StreamlitReporter()
+            pipelines.run_croma(SEARCH_FOR, pool, reporter, num_workers=NUM_WORKERS, keep_order=KEEP_ORDER,
+                                fast_path=FETCHER == "HTTP fast path", resume=RESUME, cache=cache,
+                                history=history, changed_only=CHANGED_ONLY, light=light, deep_new=deep_new)
 
             # Clean exit
-            driver.quit()
-            progress_bar.empty()
-            status_text.success("✅ Scraping complete. Data saved to Flipkart_Data.csv")
-
-            # Preview CSV
-            df = pd.read_csv(filename)
-            st.write("📄 Preview of Extracted Data:")
-            st.dataframe(df.head(10), use_container_width=True)
-
-            # Download Button
-            with open(filename, "rb") as f:
-                st.download_button(
-                    label="⬇️ Download CSV",
-                    data=f,
-                    file_name=filename,
-                    mime="text/csv"
-                )
+            reporter.finish(f"✅ Scraping complete. Data saved to {croma.FILENAME}")
+            st.caption(croma.WAITS.summary())
+            st.caption(ratelimit.for_site("croma").summary())
+            show_timings(croma.TIMES)
+            if cache:
+                st.caption(cache.summary())
+            st.caption(history.summary())
+            show_csv(croma.FILENAME, site="croma")
 
         except Exception as e:
             st.error(f"Error occurred: {e}")
@@ -251,248 +204,41 @@ if mode == "VijaySales":
         "This tool extracts Title, Brand, Model No, Capacity, BEE rating, ISEER rating, Price, Customer Rating, Number of Reviews, Number of Buyers, Listing Date,  Cooling Power and Product Link")
     st.divider()
     SEARCH_FOR = st.text_input("Which product do you want to scrape?", placeholder="Split AC")
+    FETCHER = st.radio("Fetch product pages with", ["Browser", "HTTP fast path"], horizontal=True,
+                       help="The fast path downloads product pages without Chrome and only opens the "
+                            "browser for pages whose details need JavaScript")
+    NUM_WORKERS = st.number_input("Parallel browsers", min_value=1, max_value=16, value=default_workers(),
+                                  help="Listing pages are loaded on this many browsers at once")
+    RESUME = st.checkbox("Resume last run", value=False,
+                         help="Skip discovery and the products already saved by an interrupted run of the same search")
+    USE_CACHE = st.checkbox("Use page cache", value=True,
+                            help="Reuse product pages fetched recently: specs are kept for two weeks, "
+                                 "price and reviews for two hours")
+    CHANGED_ONLY = st.checkbox("Only open new or changed products", value=True,
+                               help="Products whose listing price, rating and reviews match the price history "
+                                    "keep their last saved row instead of having their page opened again")
+    CRAWL = st.radio("Crawl depth", list(CRAWL_DEPTHS), horizontal=True,
+                     help="Light takes title, price and rating straight from the listing cards instead of "
+                          "opening every product page; specs come from the product's last full scrape, if any")
     if st.button("Start Extracting"):
         try:
-            def close_popup():
-                # Close or hide popup if it appears
-                try:
-                    popup = driver.find_element(By.ID, "notify-visitors-confirm-popup-box")
-                    if popup.is_displayed():
-                        driver.execute_script("""
-                                   let popup = document.getElementById('notify-visitors-confirm-popup-box');
-                                   if (popup) popup.style.display = 'none';
-                               """)
-                        # print("✅ Closed blocking popup")
-                        time.sleep(0.5)
-                except:
-                    pass  # Popup not found or already closed
-
-
-            def specification_extraction():
-                spec_dict = {}
-                try:
-                    WebDriverWait(driver, 5).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "ul li span.panel-list-key"))
-                    )
-                    spec_items = driver.find_elements(By.CSS_SELECTOR, "ul li")
-                    for item in spec_items:
-                        try:
-                            key = item.find_element(By.CSS_SELECTOR, "span.panel-list-key").text.strip()
-                            value = item.find_element(By.CSS_SELECTOR, "span.panel-list-value").text.strip()
-                            spec_dict[key] = value
-                        except NoSuchElementException:
-                            continue
-                except Exception as e:
-                    pass
-                    # print("❌ Specs section not found initially:", e)
-                return spec_dict
-
-
-            # STEP 1: Setup WebDriver
-            driver = webdriver.Chrome()
-            driver.get(f"https://www.vijaysales.com/search-listing?q={SEARCH_FOR}")
-            counter = 0
-
-            # Wait for results page to load
-            WebDriverWait(driver, 15).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "a.product-card__link"))
-            )
-
-            # print("✅ Search results loaded.")
-
-            # Step 2: Initiate Scrapping
-            links_list = []
-
-            while True:
-                # Wait for initial load
-                WebDriverWait(driver, 15).until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.product-card__link"))
-                )
-
-                products = driver.find_elements(By.CSS_SELECTOR, "a.product-card__link")
-                for item in products:
-                    link = item.get_attribute("href")
-                    links_list.append(link)
-
-                # Check if "NEXT" button is available
-                try:
-                    close_popup()
-                    # Find and click the "Next" button
-                    next_btn = WebDriverWait(driver, 5).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, "a.arrow-btn[jsname='nextBtn']"))
-                    )
-                    is_disabled = next_btn.get_attribute("disabled")
-                    WebDriverWait(driver, 15).until(
-                        EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.product-card__link"))
-                    )
-                    if is_disabled:
-                        # print("🔚 Reached last page.")
-                        break
-                    else:
-                        driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_btn)
-                        time.sleep(2)
-                        next_btn.click()
-                        time.sleep(5)  # Let the next page load
-                except Exception as e:
-                    # print(f"❌ Could not click next: {e}")
-                    break
-
-            # STEP 3: Set up CSV file
-            filename = "VS_Data.csv"
-            COLUMNS = ["Title", "Brand", "Model No", "Capacity", "BEE Star", "ISEER", "Price", "Review",
-                       "No of Reviews",
-                       "Cooling", "Num Buyers", "Listing Date", "Product Link"]
-
-            # Create CSV with headers only if not already present
-            with open(filename, mode="w", newline='', encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(COLUMNS)
-
-            # Time Calculator
-            start_time = time.time()
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            total_links = len(links_list)
-            count = 0
-            # Loop through each product link
-            for i in range(len(links_list)):
-                new_link = links_list[i]
-                # print("Opening:", new_link)
-                counter += 1
-                try:
-                    driver.get(new_link)
-                    close_popup()
-                    WebDriverWait(driver, 25).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "h1.productFullDetail__productName"))
-                    ) or WebDriverWait(driver, 15).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, "p.product__tags--label.label-two"))
-                    )
-                    # print("✅ Product page loaded.")
-                    # print(f"📦 Product Number {counter}")
-
-                except TimeoutException:
-                    # print(f"⚠️ Skipping product {counter} due to loading timeout.\n")
-                    continue
-
-                # === Extract title ===
-                try:
-                    item_title = driver.find_element(By.CSS_SELECTOR, "h1.productFullDetail__productName").text.strip()
-                except NoSuchElementException:
-                    item_title = "NA"
-
-                # == Num of Buyers == #
-                try:
-                    num_buyers = driver.find_element(By.CSS_SELECTOR, "p.product__tags--label.label-two").text
-                except NoSuchElementException:
-                    num_buyers = "NA"
-
-                # === Extract price ===
-                try:
-                    item_price_elem = driver.find_element(By.CLASS_NAME, "product__price--price")
-                    item_price = item_price_elem.get_attribute("data-final-price")
-                    if item_price is None:
-                        item_price = item_price_elem.text.strip().removeprefix("₹")
-                except NoSuchElementException:
-                    item_price = "NA"
-
-                # === Extract review text ===
-                try:
-                    item_review = driver.find_element(By.CSS_SELECTOR, "p.product__title--stats").text.strip()
-                except NoSuchElementException:
-                    item_review = "NA"
-
-                # === Extract number of reviews ===
-                try:
-                    item_no_of_reviews = driver.find_element(By.CSS_SELECTOR,
-                                                             "p.product__title--stats span").text.strip()
-                    item_no_of_reviews = item_no_of_reviews.removeprefix("(").removesuffix(")")
-                except NoSuchElementException:
-                    item_no_of_reviews = "NA"
-
-                # == Extract Model No ==
-                try:
-                    item_no_of_reviews = driver.find_element(By.CSS_SELECTOR,
-                                                             "p.product__title--stats span").text.strip()
-                    item_no_of_reviews = item_no_of_reviews.removeprefix("(").removesuffix(")")
-                except NoSuchElementException:
-                    item_no_of_reviews = "NA"
-
-                # == Extracting data from specifications ==
-                scroll_attempts = 3
-                scroll_height = 1200
-                spec_dict = {}
-
-                for attempt in range(scroll_attempts):
-                    driver.execute_script(f"window.scrollBy(0, {scroll_height});")
-                    time.sleep(1)  # Wait for content to load
-                    spec_dict = specification_extraction()
-                    if spec_dict:  # Break if we got the specs
-                        break
-                    scroll_height += 350
-
-                if not spec_dict:
-                    pass
-                    # print("⚠️ Specs not found even after scrolling.")
-
-                item_brand = spec_dict.get('BRAND', "NA")
-                item_model = spec_dict.get('MODEL NAME', "NA")
-                item_capacity = spec_dict.get('CAPACITY', "NA")
-                item_star_rating = spec_dict.get('STAR RATING') or spec_dict.get('ENERGY RATING', 'NA')
-                item_iseer = spec_dict.get('ISEER VALUE') or spec_dict.get('ISEER', 'NA')
-                item_cooling = spec_dict.get('COOLING') or spec_dict.get('RATED COOLING CAPACITY', 'NA')
-                item_date = spec_dict.get('ITEM AVAILABLE FROM DATE', "NA")
-
-                # Write row to CSV immediately
-                with open(filename, mode="a", newline='', encoding="utf-8") as f:
-                    writer = csv.writer(f)
-                    writer.writerow([
-                        item_title,
-                        item_brand,
-                        item_model,
-                        item_capacity,
-                        item_star_rating,
-                        item_iseer,
-                        item_price,
-                        item_review,
-                        item_no_of_reviews,
-                        item_cooling,
-                        num_buyers,
-                        item_date,
-                        new_link
-                    ])
-
-                    # Time Update
-                    count += 1
-                    elapsed = time.time() - start_time
-                    avg_time = elapsed / count if count else 0
-                    remaining = avg_time * (total_links - count)
-                    percent = min(int((count / total_links) * 100), 100)
-
-                    progress_bar.progress(percent)
-                    status_text.markdown(
-                        f"⏳ Scraped {count}/{total_links} products. Estimated time left: **{int(remaining)} seconds**")
-
-                # Random sleep
-                # time.sleep(random.uniform(1.5, 3.5))
+            cache = get_cache() if USE_CACHE else None
+            history = get_history()
+            light, deep_new = CRAWL_DEPTHS[CRAWL]
+            reporter = StreamlitReporter()
+            pipelines.run_vijaysales(SEARCH_FOR, pool, reporter, num_workers=NUM_WORKERS,
+                                     fast_path=FETCHER == "HTTP fast path", resume=RESUME, cache=cache,
+                                     history=history, changed_only=CHANGED_ONLY, light=light, deep_new=deep_new)
 
             # Clean exit
-            driver.quit()
-            progress_bar.empty()
-            status_text.success("✅ Scraping complete!")
-
-            # Preview CSV
-            df = pd.read_csv(filename)
-            st.write("📄 Preview of Extracted Data:")
-            st.dataframe(df.head(10), use_container_width=True)
-
-            # Download Button
-            with open(filename, "rb") as f:
-                st.download_button(
-                    label="⬇️ Download CSV",
-                    data=f,
-                    file_name=filename,
-                    mime="text/csv"
-                )
+            reporter.finish("✅ Scraping complete!")
+            st.caption(vijaysales.WAITS.summary())
+            st.caption(ratelimit.for_site("vijaysales").summary())
+            show_timings(vijaysales.TIMES)
+            if cache:
+                st.caption(cache.summary())
+            st.caption(history.summary())
+            show_csv(vijaysales.FILENAME, site="vijaysales")
 
         except Exception as e:
             st.error(f"Error occurred: {e}")
@@ -501,131 +247,24 @@ if mode == "VijaySales":
 if mode == "Flipkart":
     st.subheader("Extract AC Data from Flipkart website")
     st.caption(
-        "This tool extracts Title, Price, Customer Rating, Number of Reviews and Product Link. Clean the data in excel to extract brand, ton and BEE rating")
+        "This tool extracts Title, Price, Customer Rating, Number of Reviews and Product Link. The cleaned CSV adds brand, ton and BEE rating read from the title")
     st.divider()
     SEARCH_FOR = st.text_input("Which product do you want to scrape?", placeholder="Split AC")
+    FETCHER = st.radio("Fetch result pages with", ["Browser", "HTTP fast path"], horizontal=True,
+                       help="The fast path downloads result pages without Chrome and only opens the "
+                            "browser for pages that come back without products")
+    NUM_WORKERS = st.number_input("Parallel browsers", min_value=1, max_value=16, value=default_workers(),
+                                  help="Result pages are loaded on this many browsers at once")
     if st.button("Start Extracting"):
         try:
-            # Setup WebDriver
-            driver = webdriver.Chrome()
-            SEARCH = "Split AC"
-            driver.get(f"https://www.flipkart.com/search?q={SEARCH_FOR}")
-            wait = WebDriverWait(driver, 15)
-
-
-            # STEP 1: Close Login Popup
-            def close_popup():
-                try:
-                    wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "button._2KpZ6l._2doB4z"))).click()
-                    # print("✅ Login popup closed.")
-                except:
-                    pass
-                    #print("ℹ️ No login popup to close.")
-
-
-            close_popup()
+            reporter = StreamlitReporter(unit="pages")
+            pipelines.run_flipkart(SEARCH_FOR, pool, reporter, num_workers=NUM_WORKERS,
+                                   fast_path=FETCHER == "HTTP fast path", history=get_history())
 
-            # STEP 2: Get total number of pages
-            try:
-                total_pages_text = driver.find_element(By.CSS_SELECTOR, "div._1G0WLw span").text
-                total_pages = int(total_pages_text.strip().split("of")[-1].strip())
-            except:
-                total_pages = 1  # fallback if pagination not found
-
-            # print(f"🔢 Total pages: {total_pages}")
-
-            # STEP 3: Prepare CSV
-            filename = "FlipKart_Data.csv"
-            COLUMNS = ["Title", "Price", "Star Rating", "Num Reviews", "Product Link"]
-            with open(filename, mode="w", newline='', encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(COLUMNS)
-
-            # Time Calculator
-            start_time = time.time()
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
-            # Estimate total number of products roughly (assume ~24 per page as a rough guess)
-            estimated_total = total_pages * 24
-            count = 0
-
-            # STEP 4: Loop through each page
-            for PAGE in range(1, total_pages + 1):
-                # print(f"\n📄 Scraping page {PAGE}")
-                driver.get(f"https://www.flipkart.com/search?q={SEARCH}&page={PAGE}")
-
-                try:
-                    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.tUxRFH")))
-                except TimeoutException:
-                    # print("❌ Page did not load properly. Skipping...")
-                    continue
-
-                products = driver.find_elements(By.CSS_SELECTOR, "div.tUxRFH")
-
-                for product in products:
-                    try:
-                        title = product.find_element(By.CSS_SELECTOR, "div.KzDlHZ").text.strip()
-                    except:
-                        title = "NA"
-
-                    try:
-                        price = product.find_element(By.CSS_SELECTOR, "div.Nx9bqj._4b5DiR").text.replace("₹",
-                                                                                                         "").replace(
-                            ",",
-                            "").strip()
-                    except:
-                        price = "NA"
-
-                    try:
-                        rating = product.find_element(By.CSS_SELECTOR, "div.XQDdHH").text.strip()
-                    except:
-                        rating = "NA"
-
-                    try:
-                        num_reviews = product.find_element(By.CSS_SELECTOR, "span.Wphh3N").text.strip()
-                    except:
-                        num_reviews = "NA"
-
-                    try:
-                        link = product.find_element(By.CSS_SELECTOR, "a.CGtC98").get_attribute("href")
-                    except:
-                        link = "NA"
-
-                    # Time Update
-                    count += 1
-                    elapsed = time.time() - start_time
-                    avg_time = elapsed / count if count else 0
-                    remaining = avg_time * (estimated_total - count)
-                    percent = min(int((count / estimated_total) * 100), 100)
-
-                    # Update UI
-                    progress_bar.progress(percent)
-                    status_text.markdown(f"⏳ Scraped {count} items. Estimated time left: **{int(remaining)} seconds**")
-
-                    with open(filename, mode="a", newline='', encoding="utf-8") as f:
-                        writer = csv.writer(f)
-                        writer.writerow([title, price, rating, num_reviews, link])
-
-                    # time.sleep(random.uniform(0.3, 0.6))  # polite delay
-
-            driver.quit()
-            progress_bar.empty()
-            status_text.success("✅ Scraping complete. Data saved to Flipkart_Data.csv")
-
-            # Preview CSV
-            df = pd.read_csv(filename)
-            st.write("📄 Preview of Extracted Data:")
-            st.dataframe(df.head(10), use_container_width=True)
-
-            # Download Button
-            with open(filename, "rb") as f:
-                st.download_button(
-                    label="⬇️ Download CSV",
-                    data=f,
-                    file_name=filename,
-                    mime="text/csv"
-                )
+            reporter.finish(f"✅ Scraping complete. Data saved to {flipkart.FILENAME}")
+            st.caption(ratelimit.for_site("flipkart").summary())
+            show_timings(flipkart.TIMES)
+            show_csv(flipkart.FILENAME, site="flipkart")
 
         except Exception as e:
             st.error(f"Error occurred: {e}")
@@ -635,159 +274,173 @@ if mode == "Flipkart":
 if mode == "BEE Star Label":
     st.subheader("Extract AC Data from official BEE star label website by GOI")
     st.caption(
-        "This tool extracts Title, Type, ISEER, Ton, Electricity Consumption and Rating Validity. Clean the data in excel to extract brand and BEE rating")
+        "This tool extracts Title, Type, ISEER, Ton, Electricity Consumption and Rating Validity. The cleaned CSV adds brand and BEE rating read from the title")
     st.divider()
-    appliance_options = ('Room Air Conditioners (Variable Speed)', 'Light Commercial AC Variable Speed', 'Light Commercial Air Conditioners', 'Room Air Conditioners (Fixed Speed)')
-    brand_options = ('Select All', 'PANASONIC', 'DAIKIN', 'LG', 'HAIER', 'SAMSUNG', 'BLUE STAR', 'MITSUBISHI', 'VOLTAS','GENERAL','GREE', 'wybor')
-    SEARCH_FOR = st.selectbox("Select Appliance", options=appliance_options, placeholder='Room Air Conditioners (Variable Speed)')
-    SEARCH_FOR_DICT = {'Room Air Conditioners (Variable Speed)': '179', 'Room Air Conditioners (Fixed Speed)': '1', 'Light Commercial AC Variable Speed': '1211', 'Light Commercial Air Conditioners': '1205'}
-    SEARCH_FOR_BRAND = st.selectbox("Select Brand",options=brand_options, placeholder="Select All")
-    if st.button("Start Extracting"):
+    SEARCH_FOR = st.selectbox("Select Appliance", options=list(beestar.APPLIANCES), placeholder='Room Air Conditioners (Variable Speed)')
+    SEARCH_FOR_BRAND = st.selectbox("Select Brand",options=beestar.BRANDS, placeholder="Select All")
+    FAN_OUT = st.checkbox("Extract every appliance × brand into one file",
+                          help="Runs one search per appliance and brand on parallel browsers and merges the results into one CSV, tagged with Appliance and Brand. Ignores the selections above.")
+    NUM_WORKERS = st.number_input("Parallel browsers", min_value=1, max_value=8, value=default_workers(),
+                                  disabled=not FAN_OUT)
+    START = st.button("Start Extracting")
+    if START and FAN_OUT:
         try:
-            # Filters
-            APPLIANCE_SEARCH = SEARCH_FOR_DICT[SEARCH_FOR]
-            BRAND = SEARCH_FOR_BRAND
-            AC_TYPE = "Select All"
-            MODEL = "Select All"
-            FAMILY_MODEL = "Select All"
-            ISEER = "Select All"
-            NMC_TON = "Select All"
-            BEESTAR = "Select All"
-
-            # Setup WebDriver
-            driver = webdriver.Chrome()
-            driver.get("https://www.beestarlabel.com/SearchCompare")
-            counter = 0
-
-            # STEP 3: Prepare CSV
-            filename = "BEEstarlabel_Data.csv"
-            COLUMNS = ["Title", "Type", "ISEER", "Ton", "Electricity Consumption (kWh/year)", "Valid Till Date"]
-            with open(filename, mode="w", newline='', encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(COLUMNS)
+            reporter = StreamlitReporter(unit="shards")
+            count = pipelines.run_beestar_fanout(pool, reporter, num_workers=NUM_WORKERS)
 
-            try:
-                # Select from dropdown
-                searchbar = WebDriverWait(driver, 20).until(
-                    EC.presence_of_element_located((By.ID, "Equipment"))
-                )
-                select = Select(driver.find_element(By.ID, "Equipment"))
-                select.select_by_value(APPLIANCE_SEARCH)
-            except TimeoutException:
-                st.warning("⏰ Equipment dropdown took too long to load. TRY AGAIN")
-                driver.quit()
-                exit()
+            reporter.finish(f"✅ Scraping complete. {count} entries saved to {beestar.MERGED_FILENAME}")
+            show_timings(beestar.TIMES)
+            show_csv(beestar.MERGED_FILENAME, site="beestar")
 
-            # Wait for filters to load
-            try:
-                WebDriverWait(driver, 20).until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, "ul.filter_listing"))
-                )
-            except TimeoutException:
-                st.warning("⏰ Filters didn't load. TRY AGAIN")
-                driver.quit()
-                exit()
+        except Exception as e:
+            st.error(f"Error occurred: {e}")
 
-            # Auto-select filters
+    elif START:
+        try:
+            reporter = StreamlitReporter(unit="entries")
             try:
-                Select(driver.find_element(By.ID, "brand")).select_by_visible_text(BRAND)
-                Select(driver.find_element(By.ID, "type")).select_by_visible_text(AC_TYPE)
-                Select(driver.find_element(By.ID, "model")).select_by_visible_text(MODEL)
-                Select(driver.find_element(By.ID, "fModel")).select_by_visible_text(FAMILY_MODEL)
-                Select(driver.find_element(By.ID, "Isser")).select_by_visible_text(ISEER)
-                Select(driver.find_element(By.ID, "NMC")).select_by_visible_text(NMC_TON)
-                Select(driver.find_element(By.ID, "starlabel")).select_by_visible_text(BEESTAR)
-            except Exception as e:
-                st.warning(f"⚠️ Error selecting filters: {e}. TRY AGAIN")
-                driver.quit()
+                count = pipelines.run_beestar(SEARCH_FOR, SEARCH_FOR_BRAND, pool, reporter)
+            except RuntimeError as e:
+                st.warning(f"{e}. TRY AGAIN")
                 exit()
 
-            # Submit search
-            try:
-                submit_button = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.ID, "btnSearchresult"))
-                )
-                submit_button.send_keys(Keys.RETURN)
-            except TimeoutException:
-                st.warning("⏰ Submit button not found. TRY AGAIN")
-                driver.quit()
-                exit()
+            reporter.finish(f"✅ Scraping complete. {count} entries saved to {beestar.FILENAME}")
+            show_timings(beestar.TIMES)
+            show_csv(beestar.FILENAME, site="beestar")
 
-            status_text = st.empty()
-            status_text.markdown(
-                f"⏳ Please wait fetching products...."
-            )
+        except Exception as e:
+            st.error(f"Error occurred: {e}")
 
-            # Wait for results
-            try:
-                products = WebDriverWait(driver, 300).until(
-                    EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div.product-column"))
-                )
 
-            except TimeoutException:
-                st.warning("⏰ Results page did not load in 300 seconds. TRY AGAIN")
-                driver.quit()
-                exit()
+# MODULE 5
+JOB_SITES = {
+    "Croma": "croma",
+    "VijaySales": "vijaysales",
+    "Flipkart": "flipkart",
+    "BEE Star Label": "beestar",
+    "BEE Star Label (every appliance × brand)": "beestar_all",
+}
+JOB_STATUS = {"queued": "🕒 Queued", "running": "⏳ Running", "done": "✅ Done", "failed": "❌ Failed"}
+
+
+JOB_FINISHED = ("done", "failed")
+
+
+# One job's progress from the job database. A job still queued or running is polled
+# every two seconds; a finished one is shown once and not polled again.
+def show_job(job_id):
+    job = jobs.get_store().get(job_id)
+    if job is None:
+        st.warning("⚠️ No job with that ID")
+        return
+    if job["status"] in JOB_FINISHED:
+        job_details(job_id, job)
+    else:
+        poll_job(job_id)
+
+
+@st.fragment(run_every=2)
+def poll_job(job_id):
+    job = jobs.get_store().get(job_id)
+    if job["status"] in JOB_FINISHED:
+        # Rerun the page so the finished job is drawn outside this polling fragment
+        st.rerun()
+    job_details(job_id, job)
+
+
+def job_details(job_id, job):
+    st.write(f"**{job_id}** · {job['site']} · {JOB_STATUS.get(job['status'], job['status'])}")
+    if job["total"]:
+        st.progress(min(job["done"] / job["total"], 1.0), text=f"{job['done']}/{job['total']}")
+    st.write(f"📦 {job['rows']} rows saved so far")
+    for message in job["messages"][-5:]:
+        st.caption(message)
+    if job["shards"]:
+        st.dataframe(pd.DataFrame(list(job["shards"].items()), columns=["Shard", "Status"]),
+                     use_container_width=True, hide_index=True)
+    if job["error"]:
+        st.error(f"Error occurred: {job['error']}")
+    if job["output"] and os.path.exists(job["output"]) and os.path.getsize(job["output"]):
+        try:
+            # Cleaned once the job is done, not while it is still writing
+            show_csv(job["output"], key=f"job_{job_id}",
+                     site=job["site"].removesuffix("_all") if job["status"] == "done" else None)
+        except Exception:
+            pass  # Caught the CSV halfway through a batch, next poll will read it
+
+
+if mode == "Background Jobs":
+    st.subheader("Run extractions in the background")
+    st.caption(
+        "Jobs run in their own worker processes and keep going when this page is closed. Keep the job ID to come back to a job later.")
+    st.divider()
+    store = jobs.get_store()
+    if store.queued():
+        jobs.ensure_workers(store)
+
+    SITE = st.selectbox("Website", options=list(JOB_SITES))
+    params = {}
+    if JOB_SITES[SITE] in ("croma", "vijaysales", "flipkart"):
+        params["search_for"] = st.text_input("Which product do you want to scrape?", placeholder="Split AC")
+        params["fast_path"] = st.radio("Fetch pages with", ["Browser", "HTTP fast path"],
+                                       horizontal=True) == "HTTP fast path"
+    if JOB_SITES[SITE] in ("croma", "vijaysales"):
+        params["changed_only"] = st.checkbox("Only open new or changed products", value=True)
+        params["light"], params["deep_new"] = CRAWL_DEPTHS[st.radio("Crawl depth", list(CRAWL_DEPTHS),
+                                                                    horizontal=True)]
+    elif JOB_SITES[SITE] == "beestar":
+        params["appliance"] = st.selectbox("Select Appliance", options=list(beestar.APPLIANCES))
+        params["brand"] = st.selectbox("Select Brand", options=beestar.BRANDS)
+    if JOB_SITES[SITE] != "beestar":
+        params["num_workers"] = st.number_input("Parallel browsers", min_value=1, max_value=8,
+                                                value=default_workers())
+
+    if st.button("Queue Job"):
+        if "search_for" in params and not params["search_for"]:
+            st.warning("⚠️ Enter a product to search for")
+        else:
+            job_id = store.submit(JOB_SITES[SITE], params)
+            jobs.ensure_workers(store)
+            st.query_params["job"] = job_id
+            st.success(f"✅ Queued job **{job_id}**")
 
-            # Timer setup
-            start_time = time.time()
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            total_products = len(products)
-            count = 0
-
-            # Loop through each product
-            for product in products:
-                try:
-                    title = product.find_element(By.CSS_SELECTOR, "div.bg-navy-blue").text.strip()
-                except:
-                    title = "NA"
-
-                try:
-                    values = product.find_elements(By.CSS_SELECTOR, "div.product-body-content strong")
-                    extracted = [v.text.strip() for v in values]
-
-                    rac_type = extracted[0] if len(extracted) > 0 else "NA"
-                    iseer_rating = extracted[1] if len(extracted) > 1 else "NA"
-                    nmc_ton = extracted[2] if len(extracted) > 2 else "NA"
-                    elec_consump = extracted[3] if len(extracted) > 3 else "NA"
-                    validity = extracted[4] if len(extracted) > 4 else "NA"
-                except:
-                    rac_type = iseer_rating = nmc_ton = elec_consump = validity = "NA"
-
-                with open(filename, mode="a", newline='', encoding="utf-8") as f:
-                    writer = csv.writer(f)
-                    writer.writerow([title, rac_type, iseer_rating, nmc_ton, elec_consump, validity])
-
-                    # Time + progress update
-                    count += 1
-                    elapsed = time.time() - start_time
-                    avg_time = elapsed / count if count else 0
-                    remaining = avg_time * (total_products - count)
-                    percent = min(int((count / total_products) * 100), 100)
-
-                    progress_bar.progress(percent)
-                    status_text.markdown(
-                        f"⏳ Scraped {count}/{total_products} entries. Estimated time left: **{int(remaining)} seconds**"
-                    )
-
-            driver.quit()
-            progress_bar.empty()
-            status_text.success("✅ Scraping complete. Data saved to BEEstarlabel_Data.csv")
-
-            # Preview CSV
-            df = pd.read_csv(filename)
-            st.write("📄 Preview of Extracted Data:")
-            st.dataframe(df.head(10), use_container_width=True)
-
-            # Download Button
-            with open(filename, "rb") as f:
-                st.download_button(
-                    label="⬇️ Download CSV",
-                    data=f,
-                    file_name=filename,
-                    mime="text/csv"
-                )
+    st.divider()
+    JOB_ID = st.text_input("Job ID", value=st.query_params.get("job", ""),
+                           help="Reattach to a job started earlier, from this page or another").strip()
+    if JOB_ID:
+        st.query_params["job"] = JOB_ID
+        show_job(JOB_ID)
+
+    recent = store.recent()
+    if recent:
+        st.write("🗂️ Recent jobs")
+        st.dataframe(pd.DataFrame([{
+            "Job ID": job["id"],
+            "Website": job["site"],
+            "Search": job["params"].get("search_for") or job["params"].get("appliance", "All"),
+            "Status": JOB_STATUS.get(job["status"], job["status"]),
+            "Rows": job["rows"],
+            "Queued": time.strftime("%d %b %H:%M", time.localtime(job["created_at"])),
+        } for job in recent]), use_container_width=True, hide_index=True)
+
+# MODULE 6
+if mode == "Compare Sites":
+    st.subheader("Compare the same AC models across websites")
+    st.caption(
+        "Matches models by brand and model number across the last Croma, Vijay Sales, Flipkart and BEE Star Label extractions, with each retailer's price next to the BEE rating")
+    st.divider()
+    FILES = {site: st.text_input(f"{site.title()} CSV", value=filename)
+             for site, filename in matching.DEFAULT_FILES.items()}
+    MIN_SCORE = st.slider("Minimum match score", min_value=0.5, max_value=1.0, value=matching.MIN_SCORE, step=0.05,
+                          help="How alike two model numbers have to be, with tonnage and stars counted in")
+    if st.button("Compare"):
+        try:
+            start = time.time()
+            merged = matching.match_files(FILES, MIN_SCORE)
+            merged.to_csv(matching.FILENAME, index=False, float_format="%.7g")
+            st.success(f"✅ {len(merged)} models found on more than one website "
+                       f"in {time.time() - start:.1f} s. Data saved to {matching.FILENAME}")
+            show_csv(matching.FILENAME)
 
         except Exception as e:
             st.error(f"Error occurred: {e}")
@@ -0,0 +1,253 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import beestar
+import croma
+import flipkart
+import matching
+import normalize
+import pipelines
+import timing
+import vijaysales
+from browser import SessionPool
+from canonical import SeenIndex
+from checkpoint import Checkpoint
+from history import get_history
+from page_cache import get_cache
+
+# Runs the extractors without the UI, e.g. nightly from cron. A JSON config lists the
+# sites and the queries to run for them:
+#
+#   {
+#     "sites": ["croma", "vijaysales", "flipkart", "beestar"],
+#     "queries": ["Split AC", "Window AC", "Inverter AC"],
+#     "fast_path": true,
+#     "changed_only": true,
+#     "light": false,
+#     "num_workers": 2,
+#     "pool_size": 4
+#   }
+#
+#   python batch.py nightly.json
+#
+# Sites run at the same time, each working through its queries in order, and they all
+# borrow browsers from one SessionPool. A product that an earlier query already found is
+# not scraped again for the next one. Each run writes one folder under runs/: a CSV per
+# site holding every query's rows (with a Query column) and its cleaned copy with typed
+# columns (normalize.py), the cross-site model comparison (matching.py), plus
+# summary.json and the phase timings. "site_queries" can give a site its own list, and
+# for beestar (which has no search box) "beestar_appliances" / "beestar_brands" narrow
+# the appliance x brand fan-out. Every row also goes into the price history
+# (history.py); with "changed_only", Croma and Vijay Sales products whose listing still
+# shows the same price, rating and reviews keep their last row instead of being opened
+# again. "light" takes Croma and Vijay Sales rows from the listing cards without opening
+# product pages, and with "deep_new" still opens the ones the history has never scraped
+# in full. Exits with 1 if any site/query failed.
+
+RUNS_DIR = "runs"
+SITES = {
+    "croma": croma,
+    "vijaysales": vijaysales,
+    "flipkart": flipkart,
+    "beestar": beestar,
+}
+DEFAULTS = {
+    "sites": list(SITES),
+    "queries": ["Split AC"],
+    "site_queries": {},
+    "fast_path": True,
+    "use_cache": True,
+    "changed_only": True,
+    "light": False,
+    "deep_new": True,
+    "num_workers": 2,
+    "pool_size": 4,
+    "beestar_appliances": None,
+    "beestar_brands": None,
+}
+
+_print_lock = threading.Lock()
+
+
+def log(message):
+    with _print_lock:
+        print(f"{datetime.now():%H:%M:%S} {message}", flush=True)
+
+
+# Prints a site/query's notes and warnings, and its progress every 10% or so
+class LogReporter(pipelines.Reporter):
+    def __init__(self, prefix):
+        super().__init__()
+        self.prefix = prefix
+        self.last_step = -1
+
+    def progress(self, done, total, rows):
+        step = int(done / total * 10) if total else rows // 100
+        if step != self.last_step:
+            self.last_step = step
+            log(f"{self.prefix} {done}/{total or '?'} done, {rows} rows, ETA {self.eta(done, total)}s")
+
+    def note(self, message):
+        log(f"{self.prefix} {message.replace('**', '')}")
+
+    def warn(self, message):
+        log(f"{self.prefix} {message}")
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "all"
+
+
+# One site's queries, one after the other, sharing a seen-index so overlapping queries
+# don't scrape the same product twice (kept in the run folder as seen-<site>.txt). Each
+# query writes its own part file first.
+def run_site(site, queries, config, pool, run_dir):
+    parts_dir = os.path.join(run_dir, "parts")
+    ckpt_dir = os.path.join(run_dir, "checkpoints")
+    cache = get_cache() if config["use_cache"] else None
+    history = get_history()
+    seen = SeenIndex(os.path.join(run_dir, f"seen-{site}.txt"))
+    results = []
+    for query in queries:
+        part = os.path.join(parts_dir, f"{site}-{_slug(query)}.csv")
+        reporter = LogReporter(f"[{site}:{query}]")
+        start = time.time()
+        result = {"site": site, "query": query, "part": part}
+        try:
+            if site == "croma":
+                rows = pipelines.run_croma(query, pool, reporter, filename=part, num_workers=config["num_workers"],
+                                           fast_path=config["fast_path"], cache=cache, seen=seen,
+                                           history=history, changed_only=config["changed_only"],
+                                           light=config["light"], deep_new=config["deep_new"],
+                                           ckpt=Checkpoint(site, query, directory=ckpt_dir))
+            elif site == "vijaysales":
+                rows = pipelines.run_vijaysales(query, pool, reporter, filename=part,
+                                                num_workers=config["num_workers"], fast_path=config["fast_path"],
+                                                cache=cache, seen=seen, history=history,
+                                                changed_only=config["changed_only"], light=config["light"],
+                                                deep_new=config["deep_new"],
+                                                ckpt=Checkpoint(site, query, directory=ckpt_dir))
+            elif site == "flipkart":
+                rows = pipelines.run_flipkart(query, pool, reporter, filename=part,
+                                              num_workers=config["num_workers"], fast_path=config["fast_path"],
+                                              seen=seen, history=history)
+            else:
+                rows = pipelines.run_beestar_fanout(pool, reporter, filename=part,
+                                                    num_workers=config["num_workers"],
+                                                    appliances=config["beestar_appliances"],
+                                                    brands=config["beestar_brands"])
+            result.update(status="done", rows=rows)
+            log(f"[{site}:{query}] ✅ {rows} rows")
+        except Exception as e:
+            traceback.print_exc()
+            result.update(status="failed", error=str(e) or type(e).__name__)
+            log(f"[{site}:{query}] ❌ {result['error']}")
+        result["seconds"] = round(time.time() - start, 1)
+        results.append(result)
+    return results
+
+
+# Joins a site's part files into its one CSV for the run, with the query each row came from
+def merge_parts(site, results, run_dir):
+    module = SITES[site]
+    columns = beestar.MERGED_COLUMNS if site == "beestar" else module.COLUMNS
+    filename = os.path.join(run_dir, module.MERGED_FILENAME if site == "beestar" else module.FILENAME)
+    rows = 0
+    with open(filename, "w", newline='', encoding="utf-8") as out:
+        writer = csv.writer(out)
+        writer.writerow(["Query"] + columns)
+        for result in results:
+            if not os.path.exists(result["part"]):
+                continue
+            with open(result["part"], newline='', encoding="utf-8") as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for row in reader:
+                    writer.writerow([result["query"]] + row)
+                    rows += 1
+    return filename, rows
+
+
+def load_config(path):
+    config = dict(DEFAULTS)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            config.update(json.load(f))
+    unknown = [site for site in config["sites"] if site not in SITES]
+    if unknown:
+        raise SystemExit(f"Unknown sites: {', '.join(unknown)} (choose from {', '.join(SITES)})")
+    return config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the extractors for a list of sites and queries")
+    parser.add_argument("config", nargs="?", help="JSON config, see the top of batch.py")
+    parser.add_argument("--sites", nargs="+", choices=list(SITES), help="overrides the config's sites")
+    parser.add_argument("--queries", nargs="+", help="overrides the config's queries")
+    parser.add_argument("--out", help=f"output folder, default {RUNS_DIR}/<date-time>")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.sites:
+        config["sites"] = args.sites
+    if args.queries:
+        config["queries"] = args.queries
+
+    run_dir = args.out or os.path.join(RUNS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.join(run_dir, "parts"), exist_ok=True)
+    log(f"Run folder: {run_dir}")
+
+    plan = {}
+    for site in config["sites"]:
+        # BEE has no search box, its fan-out runs once per batch
+        plan[site] = ["all"] if site == "beestar" else config["site_queries"].get(site, config["queries"])
+
+    started = time.time()
+    pool = SessionPool(size=config["pool_size"])
+    try:
+        with ThreadPoolExecutor(max_workers=len(plan)) as executor:
+            futures = {site: executor.submit(run_site, site, queries, config, pool, run_dir)
+                       for site, queries in plan.items()}
+            results = {site: future.result() for site, future in futures.items()}
+    finally:
+        pool.shutdown()
+
+    summary = {"started": datetime.fromtimestamp(started).isoformat(timespec="seconds"),
+               "seconds": round(time.time() - started, 1), "config": config, "sites": {}}
+    for site, site_results in results.items():
+        filename, rows = merge_parts(site, site_results, run_dir)
+        _, clean_file = normalize.clean_csv(site, filename)
+        summary["sites"][site] = {"file": filename, "clean_file": clean_file, "rows": rows, "queries": site_results}
+        log(f"[{site}] {rows} rows in {filename}")
+
+    # The same models side by side, once there are two sites to compare
+    site_files = {site: info["file"] for site, info in summary["sites"].items() if info["rows"]}
+    if len(site_files) >= 2:
+        merged = matching.match_files(site_files)
+        summary["comparison"] = os.path.join(run_dir, matching.FILENAME)
+        merged.to_csv(summary["comparison"], index=False, float_format="%.7g")
+        log(f"{len(merged)} models matched across sites in {summary['comparison']}")
+
+    with open(os.path.join(run_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    with open(os.path.join(run_dir, "timings.json"), "w", encoding="utf-8") as f:
+        f.write(timing.to_json())
+    with open(os.path.join(run_dir, "timings.prom"), "w", encoding="utf-8") as f:
+        f.write(timing.to_prometheus())
+
+    failed = [r for site_results in results.values() for r in site_results if r["status"] != "done"]
+    log(f"Finished in {summary['seconds']}s, {len(failed)} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
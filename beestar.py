@@ -0,0 +1,190 @@
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import Select, WebDriverWait
+
+import extract
+import timing
+
+TIMES = timing.for_site("beestar")
+
+SEARCH_URL = "https://www.beestarlabel.com/SearchCompare"
+FILENAME = "BEEstarlabel_Data.csv"
+COLUMNS = ["Title", "Type", "ISEER", "Ton", "Electricity Consumption (kWh/year)", "Valid Till Date"]
+
+# Fan-out output: every appliance x brand shard merged, each row tagged with its shard
+MERGED_FILENAME = "BEEstarlabel_All.csv"
+MERGED_COLUMNS = ["Appliance", "Brand"] + COLUMNS
+
+# Equipment dropdown values
+APPLIANCES = {'Room Air Conditioners (Variable Speed)': '179', 'Room Air Conditioners (Fixed Speed)': '1', 'Light Commercial AC Variable Speed': '1211', 'Light Commercial Air Conditioners': '1205'}
+BRANDS = ('Select All', 'PANASONIC', 'DAIKIN', 'LG', 'HAIER', 'SAMSUNG', 'BLUE STAR', 'MITSUBISHI', 'VOLTAS','GENERAL','GREE', 'wybor')
+
+# Select id -> option left on "Select All" for every search
+OTHER_FILTERS = ("type", "model", "fModel", "Isser", "NMC", "starlabel")
+
+
+# Fills in and submits the search form on an already loaded SearchCompare page.
+# Raises RuntimeError with a message fit for the user if a step fails.
+def submit_search(driver, appliance, brand="Select All"):
+    try:
+        with TIMES.span("waits"):
+            WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, "Equipment")))
+        Select(driver.find_element(By.ID, "Equipment")).select_by_value(APPLIANCES[appliance])
+    except TimeoutException:
+        raise RuntimeError("⏰ Equipment dropdown took too long to load")
+
+    # Wait for filters to load
+    try:
+        with TIMES.span("waits"):
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "ul.filter_listing"))
+            )
+    except TimeoutException:
+        raise RuntimeError("⏰ Filters didn't load")
+
+    try:
+        Select(driver.find_element(By.ID, "brand")).select_by_visible_text(brand)
+        for select_id in OTHER_FILTERS:
+            Select(driver.find_element(By.ID, select_id)).select_by_visible_text("Select All")
+    except Exception as e:
+        raise RuntimeError(f"⚠️ Error selecting filters: {e}")
+
+    try:
+        submit_button = WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.ID, "btnSearchresult"))
+        )
+        submit_button.send_keys(Keys.RETURN)
+    except TimeoutException:
+        raise RuntimeError("⏰ Submit button not found")
+
+
+# Every (appliance, brand) pair the fan-out covers. BRANDS is only a short list, so each
+# appliance also gets a "Select All" search for every other brand; ShardMerger drops what
+# the single brands already returned. Those shards go last, so a listing from one of the
+# single brands usually keeps its brand tag.
+def shards(appliances=None, brands=None):
+    appliances = appliances or list(APPLIANCES)
+    brands = [b for b in (brands or BRANDS) if b != "Select All"]
+    everything = [(appliance, "Select All") for appliance in appliances]
+    return [(appliance, brand) for appliance in appliances for brand in brands] + everything
+
+
+# Reads the whole result grid from one parsed snapshot. Thousands of cards take
+# milliseconds this way, against a few WebDriver round trips per card before.
+def parse_results(root):
+    rows = []
+    for product in extract.select(root, "div.product-column"):
+        title = extract.first_text(product, "div.bg-navy-blue")
+        extracted = extract.all_text(product, "div.product-body-content strong")
+
+        rac_type = extracted[0] if len(extracted) > 0 else "NA"
+        iseer_rating = extracted[1] if len(extracted) > 1 else "NA"
+        nmc_ton = extracted[2] if len(extracted) > 2 else "NA"
+        elec_consump = extracted[3] if len(extracted) > 3 else "NA"
+        validity = extracted[4] if len(extracted) > 4 else "NA"
+        rows.append([title, rac_type, iseer_rating, nmc_ton, elec_consump, validity])
+    return rows
+
+
+# Hands back the outerHTML of every result card from index arguments[0] onwards
+NEW_CARDS_JS = """
+const cards = document.querySelectorAll('div.product-column');
+return Array.prototype.slice.call(cards, arguments[0]).map(card => card.outerHTML);
+"""
+
+# True once the site shows its "no records" message instead of a result grid
+NO_RESULTS_JS = """
+return /no (records?|results?|data|products?) (were )?found/i.test(document.body ? document.body.innerText : '');
+"""
+
+# True once the page has loaded and no jQuery request is still out
+LOADED_JS = """
+return document.readyState === 'complete' && !(window.jQuery && window.jQuery.active > 0);
+"""
+
+
+# Reads the result grid while it is still rendering and yields rows in batches as new
+# cards show up, so they can go to the CSV straight away. Each poll pulls only the cards
+# added since the last one. Done once the card count has not moved for `settle` seconds
+# and the page has nothing left to load, or straight away (with no rows) when the site
+# says it has no records. Raises TimeoutException if neither a card nor that message
+# shows up within `first_timeout`, and RuntimeError if the grid stops growing for `stall`
+# seconds while the page is still loading, so a cut-off grid is not taken for the whole.
+def stream_results(driver, first_timeout=300, settle=5.0, poll=0.5, stall=60.0):
+    seen = 0
+    start = time.time()
+    last_change = None
+    while True:
+        try:
+            with TIMES.span("extraction"):
+                cards = driver.execute_script(NEW_CARDS_JS, seen)
+        except WebDriverException:
+            cards = []  # Page is still navigating to the results
+        now = time.time()
+        if cards:
+            seen += len(cards)
+            last_change = now
+            with TIMES.span("extraction"):
+                rows = parse_results(extract.parse_html("<div>" + "".join(cards) + "</div>"))
+            yield rows
+        elif last_change is None:
+            if _no_results(driver):
+                return
+            if now - start > first_timeout:
+                raise TimeoutException(f"No results after {first_timeout} seconds")
+        elif now - last_change >= settle and _loaded(driver):
+            return
+        elif now - last_change >= stall:
+            raise RuntimeError(f"⚠️ Results stopped at {seen} entries while the page was still loading")
+        with TIMES.span("waits"):
+            time.sleep(poll)
+
+
+def _no_results(driver):
+    try:
+        return bool(driver.execute_script(NO_RESULTS_JS))
+    except WebDriverException:
+        return False
+
+
+def _loaded(driver):
+    try:
+        return bool(driver.execute_script(LOADED_JS))
+    except WebDriverException:
+        return False
+
+
+# One fan-out shard: runs the search for one appliance and brand and returns all its
+# rows, tagged with the shard. A brand with no certified models (the site says "no
+# records") comes back empty; a search that never answers raises TimeoutException, so
+# the shard is reported as failed instead of passing for an empty brand.
+def scrape_shard(driver, shard):
+    appliance, brand = shard
+    with TIMES.span("navigation"):
+        driver.get(SEARCH_URL)
+    submit_search(driver, appliance, brand)
+    rows = []
+    for batch in stream_results(driver):
+        rows.extend([appliance, brand] + row for row in batch)
+    return rows
+
+
+# Merges shard results into one table. The same listing can come back from more than
+# one shard, only its first copy is kept. Returns the rows not seen before.
+class ShardMerger:
+    def __init__(self):
+        self.seen = set()
+
+    def add(self, rows):
+        fresh = []
+        for row in rows:
+            # Keyed on appliance + card contents, the brand tag is ours
+            key = (row[0],) + tuple(row[2:])
+            if key not in self.seen:
+                self.seen.add(key)
+                fresh.append(row)
+        return fresh
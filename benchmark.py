@@ -0,0 +1,336 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import beestar
+import browser
+import croma
+import extract
+import flipkart
+import http_fetch
+import vijaysales
+
+# Offline benchmark for the fetch + parse path of every module. A local HTTP server (in
+# its own process, so it does not share the GIL or show up in our RSS) serves synthetic
+# pages shaped like each site's markup, with a configurable delay per request. Each site
+# runs in a process of its own through the same entry points the app uses (see
+# run_site). Results go to bench_results/ as JSON, one file per run, and --compare prints
+# the change against an earlier file.
+#
+#   python benchmark.py --latency 80 --products 480
+#   python benchmark.py --compare bench_results/<earlier run>.json
+
+RESULTS_DIR = "bench_results"
+SITES = ("croma", "vijaysales", "flipkart", "beestar")
+CARDS_PER_PAGE = 24
+BRANDS = ("LG", "VOLTAS", "DAIKIN", "BLUE STAR", "PANASONIC", "SAMSUNG", "HAIER", "GREE")
+
+
+def _product(n):
+    rng = random.Random(n)
+    brand = BRANDS[n % len(BRANDS)]
+    ton = rng.choice(("1", "1.5", "2"))
+    stars = rng.choice((3, 4, 5))
+    return {
+        "title": f"{brand} {ton} Ton {stars} Star Inverter Split AC (Copper, Model {brand[:2]}{n:05d})",
+        "brand": brand,
+        "model": f"{brand[:2]}{n:05d}",
+        "ton": ton,
+        "stars": stars,
+        "iseer": f"{rng.uniform(3.5, 5.6):.2f}",
+        "price": 25000 + rng.randrange(0, 40000, 10),
+        "rating": f"{rng.uniform(3.2, 4.8):.1f}",
+        "reviews": rng.randrange(0, 5000),
+    }
+
+
+def croma_product(n):
+    p = _product(n)
+    specs = [("Brand", p["brand"]), ("Model Number", p["model"]),
+             ("Air Conditioner Capacity", f"{p['ton']} Ton"),
+             ("Energy Efficiency (Star Rating)", f"{p['stars']} Star"),
+             ("Indian Seasonal Energy Efficiency Ratio (ISEER)", p["iseer"]),
+             ("Cooling Capacity", f"{int(float(p['ton']) * 3500)} W"), ("Air Flow Volume", "550 CFM")]
+    spec_html = "".join(f"<li class='cp-specification-spec-title'><h4>{k}</h4></li>"
+                        f"<li class='cp-specification-spec-details'>{v}</li>" for k, v in specs)
+    return (f"<html><body><h1 class='pd-title pd-title-normal'>{p['title']}</h1>"
+            f"<div id='pdp-product-price'><span>₹{p['price']:,}</span></div>"
+            f"<span style='color: rgb(18, 218, 168)'>{p['rating']}</span>"
+            f"<a class='pr-review review-text'>{p['reviews']} Reviews</a>"
+            f"<ul>{spec_html}</ul></body></html>")
+
+
+def vijaysales_listing(page, pages):
+    cards = "".join(f"<a class='product-card__link' href='/vijaysales/p/{n}'>{_product(n)['title']}</a>"
+                    for n in range((page - 1) * CARDS_PER_PAGE, page * CARDS_PER_PAGE))
+    disabled = " disabled" if page >= pages else ""
+    return (f"<html><body><p>Showing {(page - 1) * CARDS_PER_PAGE + 1} - {page * CARDS_PER_PAGE} "
+            f"of {pages * CARDS_PER_PAGE} Products</p><div>{cards}</div>"
+            f"<a class='arrow-btn' jsname='nextBtn'{disabled}>Next</a></body></html>")
+
+
+def vijaysales_product(n):
+    p = _product(n)
+    specs = [("BRAND", p["brand"]), ("MODEL NAME", p["model"]), ("CAPACITY", f"{p['ton']} Ton"),
+             ("STAR RATING", f"{p['stars']} Star"), ("ISEER VALUE", p["iseer"]),
+             ("RATED COOLING CAPACITY", f"{int(float(p['ton']) * 3500)} W")]
+    spec_html = "".join(f"<li><span class='panel-list-key'>{k}</span>"
+                        f"<span class='panel-list-value'>{v}</span></li>" for k, v in specs)
+    return (f"<html><body><h1 class='productFullDetail__productName'>{p['title']}</h1>"
+            f"<p class='product__tags--label label-two'>{p['reviews'] * 3} bought this</p>"
+            f"<div class='product__price--price' data-final-price='{p['price']}'>₹{p['price']:,}</div>"
+            f"<p class='product__title--stats'>{p['rating']} <span>({p['reviews']})</span></p>"
+            f"<ul>{spec_html}</ul></body></html>")
+
+
+def flipkart_page(page, pages):
+    cards = "".join(
+        f"<div class='tUxRFH'><a class='CGtC98' href='/flipkart/p/{n}'>"
+        f"<div class='KzDlHZ'>{p['title']}</div><div class='Nx9bqj _4b5DiR'>₹{p['price']:,}</div>"
+        f"<div class='XQDdHH'>{p['rating']}</div><span class='Wphh3N'>{p['reviews']} Ratings</span></a></div>"
+        for n, p in ((n, _product(n)) for n in range((page - 1) * CARDS_PER_PAGE, page * CARDS_PER_PAGE)))
+    return (f"<html><body>{cards}<div class='_1G0WLw'><span>Page {page} of {pages}</span></div>"
+            f"</body></html>")
+
+
+def beestar_results(count):
+    cards = "".join(
+        f"<div class='product-column'><div class='bg-navy-blue'>{p['brand']} / {p['model']}</div>"
+        f"<div class='product-body-content'><strong>Split</strong><strong>{p['iseer']}</strong>"
+        f"<strong>{p['ton']}</strong><strong>{700 + n % 400}</strong><strong>31/12/2027</strong></div></div>"
+        for n, p in ((n, _product(n)) for n in range(count)))
+    return f"<html><body><div class='grid'>{cards}</div></body></html>"
+
+
+def _route(path, query, pages, products):
+    page = int(query.get("page", ["1"])[0])
+    parts = path.strip("/").split("/")
+    if parts[0] == "croma" and parts[1:2] == ["p"]:
+        return croma_product(int(parts[2]))
+    if parts[0] == "vijaysales" and parts[1:2] == ["search-listing"]:
+        return vijaysales_listing(page, pages) if page <= pages else None
+    if parts[0] == "vijaysales" and parts[1:2] == ["p"]:
+        return vijaysales_product(int(parts[2]))
+    if parts[0] == "flipkart" and parts[1:2] == ["search"]:
+        return flipkart_page(page, pages) if page <= pages else None
+    if parts[0] == "beestar" and parts[1:2] == ["results"]:
+        return beestar_results(products)
+    return None
+
+
+def serve(port_queue, latency, jitter, pages, products):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            try:
+                html = _route(url.path, parse_qs(url.query), pages, products)
+            except (ValueError, IndexError):
+                html = None
+            time.sleep(max(0.0, latency + random.uniform(-jitter, jitter)))
+            body = (html or "<html><body>Not found</body></html>").encode("utf-8")
+            self.send_response(200 if html else 404)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(samples, q):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+# Times each page through the real pipeline: feed() notes when a link is handed to it,
+# and the parser wrap() returns records how long that page took until it was parsed
+class Stopwatch:
+    def __init__(self):
+        self.sent = {}
+        self.latencies = []
+
+    def feed(self, urls):
+        for url in urls:
+            self.sent[url] = time.perf_counter()
+            yield url
+
+    def wrap(self, parse):
+        def timed(html, url):
+            result = parse(html, url)
+            self.latencies.append(time.perf_counter() - self.sent.get(url, time.perf_counter()))
+            return result
+
+        return timed
+
+
+# The fast path's entry points, as pipelines.py runs them: fetch_parsed for product
+# and search pages, iter_links_direct for Vijay Sales discovery (streaming straight into
+# the detail fetches) and stream_results for the BEE grid, which needs Chrome
+def run_site(site, base, pages, products, workers):
+    watch = Stopwatch()
+    start = time.perf_counter()
+    rows = 0
+    if site == "croma":
+        urls = [f"{base}/croma/p/{n}" for n in range(products)]
+        for _, _, row in http_fetch.fetch_parsed(watch.feed(urls), watch.wrap(croma.parse_product), workers):
+            rows += row is not None
+    elif site == "vijaysales":
+        links = vijaysales.iter_links_direct(
+            "ac", lambda urls: http_fetch.fetch_parsed(watch.feed(urls), watch.wrap(vijaysales.parse_listing),
+                                                       workers),
+            {}, page_url=lambda search_for, page: f"{base}/vijaysales/search-listing?q={search_for}&page={page}")
+        for _, _, row in http_fetch.fetch_parsed(watch.feed(itertools.islice(links, products)),
+                                                 watch.wrap(vijaysales.parse_product), workers):
+            rows += row is not None
+    elif site == "flipkart":
+        first_url = f"{base}/flipkart/search?page=1"
+        watch.sent[first_url] = time.perf_counter()
+        html = http_fetch.fetch(first_url)
+        rows += len(watch.wrap(flipkart.parse_page)(html, first_url) or [])
+        total = flipkart.total_pages(extract.parse_html(html, first_url))
+        urls = [f"{base}/flipkart/search?page={page}" for page in range(2, total + 1)]
+        for _, _, cards in http_fetch.fetch_parsed(watch.feed(urls), watch.wrap(flipkart.parse_page), workers):
+            rows += len(cards or [])
+    elif site == "beestar":
+        driver = browser.new_driver()
+        try:
+            url = f"{base}/beestar/results"
+            watch.sent[url] = time.perf_counter()
+            driver.get(url)
+            for batch in beestar.stream_results(driver, settle=1.0):
+                rows += len(batch)
+            watch.latencies.append(time.perf_counter() - watch.sent[url])
+        finally:
+            driver.quit()
+    elapsed = time.perf_counter() - start
+    latencies = watch.latencies
+    return {
+        "products": rows,
+        "pages": len(latencies),
+        "seconds": round(elapsed, 3),
+        "products_per_sec": round(rows / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def _site_process(results, *args):
+    try:
+        results.put(run_site(*args))
+    except Exception as e:
+        results.put({"error": f"{type(e).__name__}: {e}".splitlines()[0]})
+
+
+# Every site runs in a fresh interpreter of its own, so its peak RSS is its own and not
+# the running maximum of the sites before it
+def run_isolated(site, base, pages, products, workers):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_site_process, args=(results, site, base, pages, products, workers))
+    process.start()
+    try:
+        return results.get()
+    finally:
+        process.join()
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current, baseline):
+    print(f"\nvs {baseline['commit']} ({baseline['started']})")
+    for site, now in current["sites"].items():
+        before = baseline["sites"].get(site)
+        if not before or "error" in before or "error" in now:
+            continue
+        changes = []
+        for key in ("products_per_sec", "p50_ms", "p95_ms", "peak_rss_mb"):
+            if before[key]:
+                changes.append(f"{key} {(now[key] - before[key]) / before[key] * 100:+.1f}%")
+        print(f"  {site:<11} " + ", ".join(changes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the fetch + parse path")
+    parser.add_argument("--sites", nargs="+", choices=SITES, default=list(SITES))
+    parser.add_argument("--latency", type=float, default=50, help="server delay per request, ms")
+    parser.add_argument("--jitter", type=float, default=10, help="+/- random extra delay, ms")
+    parser.add_argument("--pages", type=int, default=20, help="listing / search pages per site")
+    parser.add_argument("--products", type=int, default=240, help="detail pages (Croma, VijaySales) "
+                                                                   "and BEE result cards")
+    parser.add_argument("--workers", type=int, default=http_fetch.MAX_WORKERS)
+    parser.add_argument("--out", help=f"result file, default {RESULTS_DIR}/<time>-<commit>.json")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    ports = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, daemon=True, args=(
+        ports, args.latency / 1000, args.jitter / 1000, args.pages, args.products))
+    server.start()
+    base = f"http://127.0.0.1:{ports.get(timeout=10)}"
+
+    result = {
+        "commit": _git_rev(),
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "sites": {},
+    }
+    try:
+        print(f"{'site':<11} {'products':>8} {'pages':>6} {'prod/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8}")
+        for site in args.sites:
+            stats = run_isolated(site, base, args.pages, args.products, args.workers)
+            result["sites"][site] = stats
+            if "error" in stats:
+                print(f"{site:<11} skipped: {stats['error']}")
+                continue
+            print(f"{site:<11} {stats['products']:>8} {stats['pages']:>6} {stats['products_per_sec']:>8} "
+                  f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['peak_rss_mb']:>8}")
+    finally:
+        server.terminate()
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{result['started'].replace(':', '')}-{result['commit']}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nSaved to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import queue
+import threading
+
+from selenium import webdriver
+
+import netlog
+import timing
+from http_fetch import HEADERS
+
+POOL_SIZE = 2
+MAX_PAGES = 150
+MAX_HEAP_MB = 1024
+HEADLESS = True
+
+# Requests the extractors never read from: images, fonts, media and third-party trackers.
+# Dropped through CDP Network.setBlockedURLs.
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googleadservices.com*",
+    "*facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*clarity.ms*", "*criteo.*",
+    "*moengage.com*", "*notifyvisitors.com*", "*branch.io*", "*newrelic.com*", "*nr-data.net*",
+    "*youtube.com*", "*ytimg.com*",
+]
+
+# Per-site patterns taken back out of BLOCKED_URLS, for anything a site breaks without
+SITE_ALLOWLIST = {
+    "croma": [],
+    "vijaysales": [],
+    "flipkart": [],
+    "beestar": [],
+}
+
+
+# The one browser profile every module runs with
+def chrome_options():
+    options = webdriver.ChromeOptions()
+    if HEADLESS:
+        options.add_argument("--headless=new")
+    options.add_argument('--disable-gpu')
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--no-sandbox")
+    # Headless Chrome announces itself in the user agent, look like the desktop browser instead
+    options.add_argument(f"--user-agent={HEADERS['User-Agent']}")
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    netlog.enable(options)
+    return options
+
+
+def new_driver():
+    return webdriver.Chrome(options=chrome_options())
+
+
+def block_resources(driver, site=None):
+    allowed = set(SITE_ALLOWLIST.get(site, []))
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs",
+                               {"urls": [url for url in BLOCKED_URLS if url not in allowed]})
+    except:
+        pass  # Not a Chromium driver, nothing to block with
+
+
+def _healthy(driver):
+    try:
+        return bool(driver.window_handles) and driver.current_url is not None
+    except:
+        return False
+
+
+def _heap_mb(driver):
+    try:
+        used = driver.execute_script("return performance.memory ? performance.memory.usedJSHeapSize : 0;")
+        return (used or 0) / (1024 * 1024)
+    except:
+        return 0
+
+
+# Keeps a few Chrome instances running between runs so a new scrape does not pay for
+# browser startup and a cold cache. acquire(site) lends out a warm driver (health-checked
+# first, with that site's resource blocking applied) or starts a new one; release() takes
+# it back, unless it has served MAX_PAGES pages or its JS heap grew past MAX_HEAP_MB, in
+# which case it is quit and a fresh one is started in the background to take its place.
+class SessionPool:
+    def __init__(self, size=POOL_SIZE, max_pages=MAX_PAGES, max_heap_mb=MAX_HEAP_MB, factory=new_driver):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_heap_mb = max_heap_mb
+        self.factory = factory
+        self.idle = queue.LifoQueue()
+        self.pages = {}
+        self.lock = threading.Lock()
+        self.starting = 0
+        self._top_up()
+
+    def acquire(self, site=None):
+        driver = None
+        while driver is None:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if not _healthy(driver):
+                self._discard(driver)
+                driver = None
+        self._top_up()
+        if driver is None:
+            with timing.for_site(site or "browser").span("driver_startup"):
+                driver = self.factory()
+        block_resources(driver, site)
+        return driver
+
+    def release(self, driver, pages=0):
+        with self.lock:
+            used = self.pages.get(id(driver), 0) + pages
+            self.pages[id(driver)] = used
+            keep = self.idle.qsize() + self.starting < self.size
+        if not keep or used >= self.max_pages or _heap_mb(driver) > self.max_heap_mb \
+                or not _healthy(driver):
+            self._discard(driver)
+            self._top_up()
+            return
+        # Don't let the performance log pile up while the driver sits idle
+        netlog.NetworkCapture(driver).drain()
+        self.idle.put(driver)
+
+    # For run_parallel's after_page: every driver logs the network for discovery's JSON
+    # capture, pages scraped for anything else have their log thrown away as they finish
+    def page_done(self, driver):
+        netlog.NetworkCapture(driver).drain()
+
+    def shutdown(self):
+        while True:
+            try:
+                self._discard(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+    def _discard(self, driver):
+        with self.lock:
+            self.pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except:
+            pass
+
+    # Launch browsers in the background until `size` are idle or on their way
+    def _top_up(self):
+        with self.lock:
+            missing = self.size - self.idle.qsize() - self.starting
+            self.starting += max(missing, 0)
+        for _ in range(missing):
+            threading.Thread(target=self._start_one, daemon=True).start()
+
+    def _start_one(self):
+        try:
+            driver = self.factory()
+        except Exception:
+            driver = None
+        with self.lock:
+            self.starting -= 1
+        if driver is not None:
+            self.idle.put(driver)
@@ -0,0 +1,93 @@
+import os
+import re
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# The same product turns up under many URLs: with utm_* / gclid tracking, with the
+# listing's own context (Flipkart's lid, marketplace, srno...), with or without "www."
+# and a trailing slash. canonical_url() keeps only what names the product, and
+# product_key() reduces it to "site:product id" for dedupe.
+
+# Query parameters a site needs to find the product; every other one is dropped
+KEEP_PARAMS = {
+    "flipkart.com": ("pid",),
+}
+
+# Product ID in each site's product URL. Flipkart's pid parameter is read first.
+ID_PATTERNS = {
+    "croma.com": re.compile(r"/p/(\d+)"),
+    "vijaysales.com": re.compile(r"/p/P?(\d+)"),
+    "flipkart.com": re.compile(r"/p/(itm[0-9a-z]+)", re.IGNORECASE),
+}
+
+
+def _site(host):
+    for suffix in ID_PATTERNS:
+        if host == suffix or host.endswith("." + suffix):
+            return suffix
+    return None
+
+
+def canonical_url(url):
+    if not url or url == "NA":
+        return url
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    site = _site(host)
+    keep = KEEP_PARAMS.get(site, ())
+    query = urlencode([(name, value) for name, value in parse_qsl(parts.query) if name in keep])
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", host, path, query, ""))
+
+
+# The site's own product ID, or the URL path when it has none we know how to read
+def product_id(url):
+    parts = urlsplit(canonical_url(url) or "")
+    site = _site(parts.netloc)
+    if site is None:
+        return parts.path
+    if site == "flipkart.com":
+        pid = dict(parse_qsl(parts.query)).get("pid")
+        if pid:
+            return pid.upper()
+    match = ID_PATTERNS[site].search(parts.path)
+    return match.group(1) if match else parts.path
+
+
+# "site:product id", with the host standing in for sites not in ID_PATTERNS
+def product_key(url):
+    host = urlsplit(canonical_url(url) or "").netloc
+    return f"{_site(host) or host}:{product_id(url)}"
+
+
+# The products a run has already scheduled, by product_key(), so a detail page is loaded
+# at most once however many pages or queries list it. With a path every key is also
+# appended to that file, and an index opened on it again starts from what is already
+# there, e.g. to look back at what a batch run covered.
+class SeenIndex:
+    def __init__(self, path=None):
+        self.path = path
+        self.keys = set()
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.keys = {line.rstrip("\n") for line in f if line.strip()}
+
+    def __contains__(self, url):
+        return product_key(url) in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    # True if the product is new, and marks it seen
+    def add(self, url):
+        key = product_key(url)
+        with self.lock:
+            if key in self.keys:
+                return False
+            self.keys.add(key)
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(key + "\n")
+        return True
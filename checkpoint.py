@@ -0,0 +1,67 @@
+import json
+import os
+import re
+import threading
+
+CHECKPOINT_DIR = "checkpoints"
+
+
+# Remembers the links a run discovered and which of them already made it into the CSV,
+# so an interrupted run can pick up where it stopped. Detail pages are scraped while
+# discovery is still running, so the link list is only saved (as JSON) once discovery is
+# over, together with the fields each link's listing card showed (a light crawl builds
+# its rows from them); exists() tells whether it got that far. Finished links are
+# appended to a .done file from CsvSink's on_flush hook, i.e. only after their rows are
+# safely on disk. Background jobs keep theirs in the job's own directory, so they never
+# pick up a run started from the page.
+class Checkpoint:
+    def __init__(self, site, search_for, link_column=-1, directory=CHECKPOINT_DIR):
+        slug = re.sub(r"[^a-z0-9]+", "-", search_for.lower()).strip("-") or "all"
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{site}-{slug}.json")
+        self.done_path = self.path.removesuffix(".json") + ".done"
+        self.link_column = link_column
+        self.lock = threading.Lock()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    # A fresh run: forget the last one's links and finished products
+    def begin(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        open(self.done_path, "w", encoding="utf-8").close()
+
+    def save_links(self, links, listing=None):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"links": links, "listing": listing or {}}, f)
+        os.replace(tmp, self.path)
+
+    def load(self):
+        with open(self.path, encoding="utf-8") as f:
+            links = json.load(f)["links"]
+        return links, self.done_links()
+
+    # product url -> listing card fields, as saved with the links
+    def load_listing(self):
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f).get("listing", {})
+
+    def done_links(self):
+        if not os.path.exists(self.done_path):
+            return set()
+        with open(self.done_path, encoding="utf-8") as f:
+            return {line.rstrip("\n") for line in f if line.strip()}
+
+    # CsvSink on_flush hook
+    def flushed(self, rows):
+        with self.lock, open(self.done_path, "a", encoding="utf-8") as f:
+            f.writelines(f"{row[self.link_column]}\n" for row in rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self):
+        for path in (self.path, self.done_path):
+            if os.path.exists(path):
+                os.remove(path)
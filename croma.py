@@ -0,0 +1,248 @@
+import re
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+import canonical
+import extract
+import netlog
+import ratelimit
+import timing
+import waits
+
+WAITS = waits.for_site("croma")
+TIMES = timing.for_site("croma")
+LIMITS = ratelimit.for_site("croma")
+
+FILENAME = "Croma_Data.csv"
+COLUMNS = ["Title", "Brand", "Model No", "Capacity", "BEE Star", "ISEER", "Price", "Review",
+           "No of Reviews",
+           "Cooling", "Air Flow", "Product Link"]
+# Row index -> captured listing field, for netlog.fill_missing
+LISTING_FIELDS = {0: "title", 6: "price", 7: "rating", 8: "reviews"}
+# The search API's responses; other JSON on the page (recommendations, recently viewed)
+# lists products that are not search results
+SEARCH_API = re.compile(r"croma\.com/[^?]*search", re.IGNORECASE)
+
+
+# The result cards from index arguments[0] onwards: link, and the title, price and
+# rating the card shows
+CARDS_JS = """
+const links = document.querySelectorAll('h3.product-title a');
+return Array.prototype.slice.call(links, arguments[0]).map(link => {
+    const card = link.closest('li') || link.parentElement;
+    const text = selector => {
+        const element = card.querySelector(selector);
+        return element ? element.textContent.trim() : null;
+    };
+    return {href: link.href, title: link.textContent.trim(), price: text('span.amount'),
+            rating: text('span.rating-text')};
+});
+"""
+
+
+# Yields product links while it pages through the search results, so detail scraping can
+# start on the first batch while "View More" is still being clicked. Each batch only
+# reads the cards added since the last one. Besides the rendered cards, the JSON the
+# search page pulls in for every batch is captured from the network log (SEARCH_API
+# responses only): `listing` is filled with product url -> title/price/rating/reviews
+# from that data (and from the cards where the JSON has gaps), its links are yielded too,
+# and once the API has returned as many products as it says there are, we stop clicking
+# instead of waiting for the button to time out. Links come out canonical but can repeat.
+def iter_links(driver, search_for, listing):
+    capture = netlog.NetworkCapture(driver)
+    capture.drain()
+    total = None
+    from_api = set()
+
+    def harvest():
+        nonlocal total
+        found = []
+        for url, payload in capture.json_payloads(SEARCH_API):
+            products = netlog.find_products(payload, driver.current_url)
+            listing.update(products)
+            from_api.update(products)
+            found.extend(products)
+            total = max(total or 0, netlog.find_total(payload) or 0) or None
+        return found
+
+    def read_cards():
+        with TIMES.span("extraction"):
+            new_cards = driver.execute_script(CARDS_JS, cards)
+        found = []
+        for card in new_cards:
+            link = canonical.canonical_url(card.pop("href"))
+            netlog.add_card(listing, link, card)
+            found.append(link)
+        return found
+
+    ratelimit.get(driver, "https://www.croma.com", TIMES)
+
+    # Search for "Split AC"
+    searchbar = WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.ID, "searchV2"))
+    )
+    searchbar.clear()
+    searchbar.send_keys(search_for)
+    with LIMITS.slot():
+        searchbar.send_keys(Keys.RETURN)
+
+        # Wait for results to load
+        with TIMES.span("waits"):
+            WebDriverWait(driver, 15).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "h3.product-title a"))
+            )
+
+    # Auto-click "View More" until gone
+    cards = 0
+    while True:
+        # The JSON first, so the listing fields are at hand when these links get scheduled
+        yield from harvest()
+        new_links = read_cards()
+        cards += len(new_links)
+        yield from new_links
+        if total and len(from_api) >= total:
+            break
+        try:
+            view_more_button = WAITS.until(
+                driver, EC.element_to_be_clickable((By.XPATH, "//button[contains(text(), 'View More')]")),
+                "view_more", 5
+            )
+            # Every click pulls the next batch from the site, so it waits for the limiter
+            with LIMITS.slot():
+                driver.execute_script("arguments[0].click();", view_more_button)
+                # Wait for the next batch of products to land
+                WAITS.settle(driver, waits.count_changed("h3.product-title a", cards), "listing_grow", 1,
+                             replaces=1)
+        except:
+            break
+
+    # Any the JSON had that never got rendered, plus cards that rendered after the last check
+    yield from harvest()
+    yield from read_cards()
+
+
+# Scrapes one product page with the given driver. Returns (row, warnings), row is None
+# when the page did not load in time. Safe to call from worker threads: nothing here
+# touches Streamlit, the caller shows the warnings.
+# Pages that gave a full row are stored in `cache` (a PageCache) if given. The caller
+# looks the page up there first: specs_page is the cached HTML when it is still fresh
+# for specs, and then the scroll + "View More" expansion is skipped.
+def scrape_product(driver, new_link, cache=None, specs_page=None):
+    warnings = []
+    cached_specs = read_product(extract.parse_html(specs_page, new_link))[1] if specs_page else {}
+
+    try:
+        with TIMES.span("navigation"):
+            driver.get(new_link)
+        with TIMES.span("waits"):
+            WebDriverWait(driver, 25).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "h1.pd-title.pd-title-normal"))
+            )
+    except TimeoutException:
+        return None, warnings
+
+    if not cached_specs:
+        expand_specs(driver, warnings)
+
+    # Main Product Details
+    try:
+        # Wait for price to appear (max 15 seconds), the title is already there
+        with TIMES.span("waits"):
+            WebDriverWait(driver, 15).until(
+                EC.presence_of_element_located((By.ID, "pdp-product-price"))
+            )
+    except Exception as e:
+        warnings.append(f"⚠️ Error loading title/price/review: {e}")
+
+    # Read everything from one page snapshot instead of a WebDriver call per field
+    with TIMES.span("extraction"):
+        html = driver.page_source
+        item_title, specs, item_price, item_review, item_num_review = read_product(extract.parse_html(html, new_link))
+    if cached_specs:
+        specs = cached_specs
+    elif not specs:
+        warnings.append("❌ Specs not found.")
+    elif cache is not None and item_title and item_price is not None:
+        cache.put(new_link, html)
+
+    row = build_row(item_title or "NA", specs, item_price or "NA", item_review, item_num_review, new_link)
+    return row, warnings
+
+
+def expand_specs(driver, warnings):
+    with TIMES.span("scrolling"):
+        driver.execute_script("window.scrollBy(0, 1500);")
+
+    try:
+        # Used to be a 1s sleep after the scroll, the button showing up is the real signal
+        view_more_buttons = WAITS.until(
+            driver, EC.presence_of_all_elements_located((By.CLASS_NAME, "btn-viewmore-click")),
+            "spec_view_more", 5, replaces=1
+        )
+        before = len(driver.find_elements(By.CSS_SELECTOR, "li.cp-specification-spec-details"))
+        driver.execute_script("arguments[0].click();", view_more_buttons[0])
+        WAITS.settle(driver, EC.any_of(waits.stale(view_more_buttons[0]),
+                                       waits.count_changed("li.cp-specification-spec-details", before)),
+                     "spec_expand", 1, replaces=1)
+
+    except Exception as e:
+        warnings.append(f"⚠️ 'View More' button not found or clickable: {e}")
+
+
+def build_row(item_title, specs, item_price, item_review, item_num_review, new_link):
+    return [
+        item_title,
+        specs.get('Brand', 'Not Available'),
+        specs.get('Model Number', 'Not Available'),
+        specs.get('Air Conditioner Capacity', 'Not Available'),
+        specs.get('Energy Efficiency (Star Rating)', 'Not Available'),
+        specs.get('Indian Seasonal Energy Efficiency Ratio (ISEER)', 'Not Available'),
+        item_price,
+        item_review,
+        item_num_review,
+        specs.get('Cooling Capacity', 'Not Available'),
+        specs.get('Air Flow Volume', 'Not Available'),
+        new_link
+    ]
+
+
+# Pulls the product fields out of a parsed page in one pass. Title and price are None
+# when missing.
+def read_product(root):
+    item_title = extract.first_text(root, "h1.pd-title.pd-title-normal", None)
+
+    titles = extract.all_text(root, "li.cp-specification-spec-title > h4")
+    values = extract.all_text(root, "li.cp-specification-spec-details")
+    specs = dict(zip(titles, values))
+
+    # Price — sometimes it's in a <span> inside the div
+    item_price = None
+    price_block = extract.first(root, "#pdp-product-price")
+    if price_block is not None:
+        price_span = extract.first(price_block, "span")
+        if price_span is not None:
+            item_price = extract.text(price_span) or extract.text(price_block)
+        else:
+            item_price = extract.text(price_block).removeprefix('₹').strip()
+
+    item_review = extract.first_text(root, "span[style*='color: rgb(18, 218, 168)']", None)
+    item_num_review = extract.first_text(root, "a.pr-review.review-text", None)
+    if item_review is None or item_num_review is None:
+        item_review = "NA"
+        item_num_review = "NA"
+
+    return item_title, specs, item_price, item_review, item_num_review
+
+
+# Parses a product page fetched over plain HTTP. Returns the CSV row, or None when the
+# title, price or spec table is missing from the static HTML and the page has to go
+# through the browser instead.
+def parse_product(html, new_link):
+    item_title, specs, item_price, item_review, item_num_review = read_product(extract.parse_html(html, new_link))
+    if not item_title or item_price is None or not specs:
+        return None
+    return build_row(item_title, specs, item_price, item_review, item_num_review, new_link)
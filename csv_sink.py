@@ -0,0 +1,94 @@
+import csv
+import os
+import threading
+import time
+
+import timing
+
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 2.0
+
+
+# Keeps the output CSV open for the whole run. Rows are queued in memory and a writer
+# thread appends them in batches, once BATCH_SIZE rows are waiting or FLUSH_INTERVAL
+# seconds have passed. Every batch is flushed and fsynced, so a crash loses at most the
+# rows still waiting. on_flush(rows), if given, is called after each batch is on disk.
+# With `site`, the time spent writing is timed as that site's csv_write phase.
+class CsvSink:
+    def __init__(self, filename, columns=None, append=False, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, on_flush=None, site=None):
+        self.filename = filename
+        self.timer = timing.for_site(site) if site else None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.file = open(filename, mode="a" if append else "w", newline='', encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        if columns and not append:
+            self.writer.writerow(columns)
+        self.rows_written = 0
+
+        self.pending = []
+        self.closed = False
+        self.error = None
+        self.cond = threading.Condition()
+        self.io_lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, row):
+        self.writerows([row])
+
+    def writerows(self, rows):
+        if self.error:
+            raise self.error
+        with self.cond:
+            self.pending.extend(rows)
+            if len(self.pending) >= self.batch_size:
+                self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        self.thread.join()
+        self._drain()
+        self.file.close()
+        if self.error:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.closed and len(self.pending) < self.batch_size:
+                    self.cond.wait(timeout=self.flush_interval)
+                closed = self.closed
+            self._drain()
+            if closed:
+                return
+
+    # Swaps the pending rows out under the I/O lock, so batches hit the file in order
+    def _drain(self):
+        with self.io_lock:
+            with self.cond:
+                batch, self.pending = self.pending, []
+            if not batch or self.file.closed:
+                return
+            start = time.perf_counter()
+            try:
+                self.writer.writerows(batch)
+                self.file.flush()
+                os.fsync(self.file.fileno())
+                self.rows_written += len(batch)
+                if self.timer:
+                    self.timer.record("csv_write", time.perf_counter() - start)
+                if self.on_flush:
+                    self.on_flush(batch)
+            except Exception as e:
+                self.error = e
@@ -0,0 +1,52 @@
+from functools import lru_cache
+
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+
+
+# Helpers for reading fields out of raw HTML with lxml, using the same CSS selectors the
+# Selenium code uses.
+
+def parse_html(page, base_url=None):
+    root = lxml_html.fromstring(page, base_url=base_url)
+    if base_url:
+        root.make_links_absolute(base_url)
+    return root
+
+
+# One page_source round trip for the whole page; every field is then read locally instead
+# of costing a find_element(...).text call each.
+def snapshot(driver):
+    return parse_html(driver.page_source, driver.current_url)
+
+
+# Translating a CSS selector to XPath costs more than running it, so do it once per selector
+@lru_cache(maxsize=None)
+def _compiled(selector):
+    return CSSSelector(selector)
+
+
+def select(root, selector):
+    return _compiled(selector)(root)
+
+
+def text(element):
+    return " ".join(element.text_content().split())
+
+
+def first(root, selector):
+    found = select(root, selector)
+    return found[0] if found else None
+
+
+def first_text(root, selector, default="NA"):
+    element = first(root, selector)
+    return text(element) if element is not None else default
+
+
+def all_text(root, selector):
+    return [text(element) for element in select(root, selector)]
+
+
+def links(root, selector):
+    return [element.get("href") for element in select(root, selector) if element.get("href")]
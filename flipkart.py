@@ -0,0 +1,91 @@
+from urllib.parse import quote_plus
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+import canonical
+import extract
+import timing
+
+FILENAME = "FlipKart_Data.csv"
+COLUMNS = ["Title", "Price", "Star Rating", "Num Reviews", "Product Link"]
+# Columns that hold the fields PriceHistory keeps
+LISTING_FIELDS = {0: "title", 1: "price", 2: "rating", 3: "reviews"}
+
+TIMES = timing.for_site("flipkart")
+
+
+# Reads every result card on a search page from one parsed snapshot
+def parse_cards(root):
+    rows = []
+    for product in extract.select(root, "div.tUxRFH"):
+        title = extract.first_text(product, "div.KzDlHZ")
+        price = extract.first_text(product, "div.Nx9bqj._4b5DiR").replace("₹", "").replace(",", "").strip()
+        rating = extract.first_text(product, "div.XQDdHH")
+        num_reviews = extract.first_text(product, "span.Wphh3N")
+        link = extract.first(product, "a.CGtC98")
+        link = canonical.canonical_url(link.get("href", "NA")) if link is not None else "NA"
+        rows.append([title, price, rating, num_reviews, link])
+    return rows
+
+
+def search_url(search_for, page=1):
+    return f"https://www.flipkart.com/search?q={quote_plus(search_for)}&page={page}"
+
+
+def close_popup(driver):
+    with TIMES.span("popups"):
+        _close_popup(driver)
+
+
+def _close_popup(driver):
+    try:
+        WebDriverWait(driver, 15).until(
+            EC.element_to_be_clickable((By.CSS_SELECTOR, "button._2KpZ6l._2doB4z"))
+        ).click()
+        # print("✅ Login popup closed.")
+    except:
+        pass
+        #print("ℹ️ No login popup to close.")
+
+
+def total_pages(root):
+    try:
+        total_pages_text = extract.first_text(root, "div._1G0WLw span")
+        return int(total_pages_text.strip().split("of")[-1].strip())
+    except:
+        return 1  # fallback if pagination not found
+
+
+# For pages fetched over HTTP. None when the page came back without result cards
+# (blocked or not rendered), so it gets retried in a browser.
+def parse_page(html, url):
+    return parse_cards(extract.parse_html(html, url)) or None
+
+
+def scrape_page(driver, url):
+    root = open_page(driver, url)
+    if root is None:
+        return None
+    with TIMES.span("extraction"):
+        return parse_cards(root)
+
+
+# Loads a results page in the browser and returns one snapshot of it, None if no result
+# card showed up. With `popup`, the login popup is closed before waiting for the cards.
+def open_page(driver, url, popup=False):
+    with TIMES.span("navigation"):
+        driver.get(url)
+    if popup:
+        close_popup(driver)
+    try:
+        with TIMES.span("waits"):
+            WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.tUxRFH")))
+    except TimeoutException:
+        # print("❌ Page did not load properly. Skipping...")
+        return None
+    # One snapshot per page, every card is parsed locally
+    with TIMES.span("extraction"):
+        return extract.snapshot(driver)
@@ -0,0 +1,174 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import canonical
+import netlog
+
+HISTORY_PATH = os.path.join("history", "prices.sqlite")
+
+
+# "₹34,990.00" / 34990 / "4.3 ★" -> float, None when there is no number in it
+def number(value):
+    if value is None:
+        return None
+    match = re.search(r"\d+(?:\.\d+)?", str(value).replace(",", ""))
+    return float(match.group()) if match else None
+
+
+# Every run's price, rating and review count per product, across runs. `products` holds
+# one row per site + product ID with the latest values and the last full CSV row (one
+# with more than the listing fields, i.e. from a detail page), so a product whose listing
+# card still shows the same price, rating and reviews can reuse that row instead of
+# having its detail page opened again. `observations` keeps one
+# timestamped row per product per run, indexed for trend queries over long ranges.
+class PriceHistory:
+    def __init__(self, path=HISTORY_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS products (
+                site TEXT NOT NULL,
+                product_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT,
+                price REAL,
+                rating REAL,
+                reviews REAL,
+                row TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (site, product_id)
+            ) WITHOUT ROWID""")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS observations (
+                site TEXT NOT NULL,
+                product_id TEXT NOT NULL,
+                observed_at REAL NOT NULL,
+                price REAL,
+                rating REAL,
+                reviews REAL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS observations_product "
+                          "ON observations (site, product_id, observed_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS observations_time ON observations (site, observed_at)")
+        self.conn.commit()
+        self.reused = 0
+
+    # Stores rows as they are written to a site's CSV. `fields` maps column index ->
+    # "title"/"price"/"rating"/"reviews" (the sites' LISTING_FIELDS), the link is the last
+    # column. Rows without a link are skipped.
+    def record(self, site, rows, fields):
+        now = time.time()
+        products = []
+        observations = []
+        for row in rows:
+            url = row[-1]
+            if not url or url == "NA":
+                continue
+            values = {field: row[index] for index, field in fields.items()}
+            product_id = canonical.product_id(url)
+            price, rating, reviews = (number(values.get(field)) for field in ("price", "rating", "reviews"))
+            # A row a light crawl built from the listing alone must not replace the full one
+            full = any(value not in netlog.MISSING for index, value in enumerate(row[:-1]) if index not in fields)
+            products.append((site, product_id, url, values.get("title"), price, rating, reviews,
+                             json.dumps(row) if full else None, now, now))
+            observations.append((site, product_id, now, price, rating, reviews))
+        if not products:
+            return
+        with self.lock:
+            with self.conn:
+                self.conn.executemany("""
+                    INSERT INTO products (site, product_id, url, title, price, rating, reviews, row, first_seen,
+                                          last_seen)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (site, product_id) DO UPDATE SET
+                        url = excluded.url, title = excluded.title, price = excluded.price,
+                        rating = excluded.rating, reviews = excluded.reviews,
+                        row = COALESCE(excluded.row, products.row),
+                        last_seen = excluded.last_seen""", products)
+                self.conn.executemany("INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?)", observations)
+
+    # The stored row for a product whose listing values (a netlog record: title, price,
+    # rating, reviews) match what was saved last time, else None: the product is new,
+    # something changed, or the listing gave nothing to compare.
+    def unchanged_row(self, site, url, record):
+        if not record:
+            return None
+        listed = {field: number(record.get(field)) for field in ("price", "rating", "reviews")}
+        if listed["price"] is None:
+            return None
+        with self.lock:
+            stored = self.conn.execute("SELECT price, rating, reviews, row FROM products "
+                                       "WHERE site = ? AND product_id = ?",
+                                       (site, canonical.product_id(url))).fetchone()
+        if stored is None or stored[3] is None:
+            return None
+        for value, old in zip(listed.values(), stored[:3]):
+            if value is not None and value != old:
+                return None
+        with self.lock:
+            self.reused += 1
+        return json.loads(stored[3])
+
+    # The product's last full row, None if it never had its detail page scraped
+    def last_row(self, site, url):
+        with self.lock:
+            stored = self.conn.execute("SELECT row FROM products WHERE site = ? AND product_id = ?",
+                                       (site, canonical.product_id(url))).fetchone()
+        return json.loads(stored[0]) if stored and stored[0] else None
+
+    # (observed_at, price, rating, reviews) for one product, oldest first
+    def trend(self, site, url, since=None):
+        with self.lock:
+            return self.conn.execute("SELECT observed_at, price, rating, reviews FROM observations "
+                                     "WHERE site = ? AND product_id = ? AND observed_at >= ? ORDER BY observed_at",
+                                     (site, canonical.product_id(url), since or 0)).fetchall()
+
+    # Products whose price moved between their first and last observation since `since`,
+    # as (product_id, title, first price, last price), biggest drop first
+    def price_changes(self, site, since=None):
+        with self.lock:
+            return self.conn.execute("""
+                WITH span AS (
+                    SELECT product_id, MIN(observed_at) AS first_at, MAX(observed_at) AS last_at
+                    FROM observations WHERE site = ? AND observed_at >= ? AND price IS NOT NULL
+                    GROUP BY product_id
+                )
+                SELECT span.product_id, products.title, first.price, last.price
+                FROM span
+                JOIN observations AS first ON first.site = ? AND first.product_id = span.product_id
+                    AND first.observed_at = span.first_at
+                JOIN observations AS last ON last.site = ? AND last.product_id = span.product_id
+                    AND last.observed_at = span.last_at
+                JOIN products ON products.site = ? AND products.product_id = span.product_id
+                WHERE first.price != last.price
+                ORDER BY last.price - first.price""", (site, since or 0, site, site, site)).fetchall()
+
+    def reset_stats(self):
+        self.reused = 0
+
+    def summary(self):
+        with self.lock:
+            products, observations = self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM products), (SELECT COUNT(*) FROM observations)").fetchone()
+        return (f"📈 Price history: {products} products, {observations} observations, "
+                f"{self.reused} unchanged products reused")
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_history():
+    global _history
+    with _history_lock:
+        if _history is None:
+            _history = PriceHistory()
+        return _history
@@ -0,0 +1,140 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import ratelimit
+import timing
+from workers import close_iterator
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/126.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-IN,en;q=0.9",
+}
+MAX_WORKERS = 8
+
+_session = None
+_session_lock = threading.Lock()
+
+
+# One keep-alive connection pool shared by every fetch, so repeated product pages on the
+# same host skip the TCP/TLS handshake. 429 and 503 are not retried here, they go back to
+# the site's rate limiter, which slows down instead.
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=2, backoff_factor=0.5, status_forcelist=[500, 502, 504],
+                          allowed_methods=["GET"], respect_retry_after_header=False)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS * 2, max_retries=retry)
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+# Returns the page HTML, or None if the request failed, came back non-200 or was a block
+# page. Every request goes through its site's limiter (ratelimit.py), which hears about
+# timeouts, 429/503 and block pages and sets how fast and how many at once.
+def fetch(url, timeout=15):
+    with ratelimit.for_url(url).slot() as slot:
+        try:
+            with timing.for_url(url).span("navigation"):
+                response = get_session().get(url, timeout=timeout)
+        except (requests.Timeout, requests.ConnectionError):
+            slot.report(ratelimit.TIMEOUT)
+            return None
+        except requests.RequestException:
+            slot.report(None)
+            return None
+        outcome = ratelimit.response_outcome(response.status_code, response.text)
+        slot.report(outcome, ratelimit.retry_after(response.headers.get("Retry-After")))
+    if response.status_code != 200 or outcome != ratelimit.OK:
+        return None
+    return response.text
+
+
+# Fetches every link over HTTP and runs parse(html, link) on it. Yields (index, link, row)
+# as pages come in, row is None when the fetch failed or the parser could not find the
+# fields in the static HTML (i.e. the page needs a browser to render them). With a
+# PageCache, pages still fresh for price are not downloaded again, and pages that parsed
+# are stored for next time. `links` can be an iterator that is still producing: it is read
+# on a thread of its own, and only about two links per worker are taken from it ahead of
+# the downloads. Closing the generator early cancels the downloads not yet started.
+def fetch_parsed(links, parse, max_workers=MAX_WORKERS, cache=None):
+    def parse_timed(html, link):
+        with timing.for_url(link).span("extraction"):
+            return parse(html, link)
+
+    def work(link):
+        if cache is not None:
+            html = cache.get(link, "price")
+            if html is not None:
+                try:
+                    row = parse_timed(html, link)
+                except Exception:
+                    row = None
+                if row is not None:
+                    return row
+
+        html = fetch(link)
+        if html is None:
+            return None
+        try:
+            row = parse_timed(html, link)
+        except Exception:
+            return None
+        if row is not None and cache is not None:
+            cache.put(link, html)
+        return row
+
+    results = queue.Queue()
+    slots = threading.Semaphore(max_workers * 2)
+    stop = threading.Event()
+    feed_errors = []
+
+    def feed(pool):
+        submitted = 0
+        link_iter = iter(links)
+        try:
+            for i, link in enumerate(link_iter):
+                while not slots.acquire(timeout=0.5):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                future = pool.submit(work, link)
+                future.add_done_callback(lambda f, i=i, link=link: results.put((i, link, f)))
+                submitted += 1
+        except Exception as e:
+            if not stop.is_set():
+                feed_errors.append(e)
+        finally:
+            close_iterator(link_iter)
+            results.put(submitted)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    threading.Thread(target=feed, args=(pool,), daemon=True).start()
+    total = None
+    received = 0
+    try:
+        while total is None or received < total:
+            item = results.get()
+            if isinstance(item, int):
+                total = item
+                continue
+            received += 1
+            slots.release()
+            i, link, future = item
+            yield i, link, future.result()
+    finally:
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+    if feed_errors:
+        raise feed_errors[0]
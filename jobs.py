@@ -0,0 +1,316 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+
+import beestar
+import croma
+import flipkart
+import normalize
+import pipelines
+import vijaysales
+from browser import SessionPool
+from checkpoint import Checkpoint
+from history import get_history
+from page_cache import get_cache
+
+# Scrapes that run in worker processes of their own, so they keep going when the page is
+# closed or the Streamlit server restarts. Jobs are queued in a SQLite file; up to
+# MAX_RUNNING workers are started on demand, each takes one job at a time off the queue
+# and leaves once the queue has been empty for IDLE_EXIT seconds. A job writes its CSV
+# into jobs/<id>/ as it goes and its progress into the database, which is all the page
+# needs to reattach to it by ID.
+#
+#   python jobs.py worker     (started by ensure_workers(), not by hand)
+
+JOBS_DIR = "jobs"
+DB_PATH = os.path.join(JOBS_DIR, "jobs.sqlite")
+MAX_RUNNING = 3
+IDLE_EXIT = 30
+HEARTBEAT = 5
+# A worker that has not checked in for this long is gone, its job is queued again
+STALE_AFTER = 60
+# Runs a job gets before a worker dying on it (e.g. Chrome taking the process down with
+# it) marks it failed instead of queueing it again
+MAX_ATTEMPTS = 3
+MAX_MESSAGES = 50
+
+SITES = {
+    "croma": croma.FILENAME,
+    "vijaysales": vijaysales.FILENAME,
+    "flipkart": flipkart.FILENAME,
+    "beestar": beestar.FILENAME,
+    "beestar_all": beestar.MERGED_FILENAME,
+}
+
+
+class JobStore:
+    def __init__(self, path=DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                site TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                worker INTEGER,
+                done INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                rows INTEGER NOT NULL DEFAULT 0,
+                messages TEXT NOT NULL DEFAULT '[]',
+                shards TEXT NOT NULL DEFAULT '{}',
+                error TEXT,
+                output TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )""")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS workers (
+                pid INTEGER PRIMARY KEY,
+                seen_at REAL NOT NULL
+            )""")
+
+    def submit(self, site, params):
+        if site not in SITES:
+            raise ValueError(f"Unknown site: {site}")
+        job_id = uuid.uuid4().hex[:8]
+        output = os.path.join(JOBS_DIR, job_id, SITES[site])
+        with self.lock:
+            self.conn.execute("INSERT INTO jobs (id, site, params, status, created_at, output) "
+                              "VALUES (?, ?, ?, 'queued', ?, ?)",
+                              (job_id, site, json.dumps(params), time.time(), output))
+        return job_id
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job(row)
+
+    def recent(self, limit=20):
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [_job(row) for row in rows]
+
+    # Takes the oldest queued job for `worker`, or returns None. BEGIN IMMEDIATE keeps two
+    # workers from claiming the same one.
+    def claim(self, worker):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute("SELECT * FROM jobs WHERE status = 'queued' "
+                                        "ORDER BY created_at LIMIT 1").fetchone()
+                if row is not None:
+                    self.conn.execute("UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                                      "started_at = COALESCE(started_at, ?) WHERE id = ?",
+                                      (worker, time.time(), row["id"]))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return _job(row)
+
+    def update(self, job_id, **fields):
+        if "messages" in fields:
+            fields["messages"] = json.dumps(fields["messages"][-MAX_MESSAGES:])
+        if "shards" in fields:
+            fields["shards"] = json.dumps(fields["shards"])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def heartbeat(self, pid):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO workers (pid, seen_at) VALUES (?, ?)", (pid, time.time()))
+
+    def leave(self, pid):
+        with self.lock:
+            self.conn.execute("DELETE FROM workers WHERE pid = ?", (pid,))
+
+    def live_workers(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM workers WHERE seen_at > ?",
+                                     (time.time() - STALE_AFTER,)).fetchone()[0]
+
+    def queued(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    # Jobs whose worker died mid-run go back on the queue and resume from their checkpoint,
+    # unless they have already had MAX_ATTEMPTS runs: then they are marked failed
+    def requeue_orphans(self):
+        now = time.time()
+        with self.lock:
+            self.conn.execute("""
+                UPDATE jobs SET status = 'failed', worker = NULL, finished_at = ?,
+                    error = 'The worker died on each of its ' || attempts || ' attempts'
+                WHERE status = 'running' AND attempts >= ?
+                    AND worker NOT IN (SELECT pid FROM workers WHERE seen_at > ?)""",
+                              (now, MAX_ATTEMPTS, now - STALE_AFTER))
+            self.conn.execute("""
+                UPDATE jobs SET status = 'queued', worker = NULL
+                WHERE status = 'running' AND worker NOT IN (SELECT pid FROM workers WHERE seen_at > ?)""",
+                              (now - STALE_AFTER,))
+            self.conn.execute("DELETE FROM workers WHERE seen_at <= ?", (now - STALE_AFTER,))
+
+
+def _job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    job["messages"] = json.loads(job["messages"])
+    job["shards"] = json.loads(job["shards"])
+    return job
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JobStore()
+        return _store
+
+
+# Starts worker processes for the queued jobs, up to MAX_RUNNING in total. They are
+# detached from the caller so they outlive the Streamlit server.
+def ensure_workers(store=None, max_running=MAX_RUNNING):
+    store = store or get_store()
+    store.requeue_orphans()
+    missing = min(store.queued(), max_running - store.live_workers())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(max(missing, 0)):
+        log = open(os.path.join(JOBS_DIR, "workers.log"), "a", encoding="utf-8")
+        if os.name == "nt":
+            detach = {"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            detach = {"start_new_session": True}
+        process = subprocess.Popen([sys.executable, os.path.join(here, "jobs.py"), "worker"], cwd=os.getcwd(),
+                                   stdin=subprocess.DEVNULL, stdout=log, stderr=log, **detach)
+        log.close()
+        # Count it as live straight away so a quick second call doesn't start another
+        store.heartbeat(process.pid)
+
+
+# Writes a job's progress to the database, at most once a second for plain progress
+class JobReporter(pipelines.Reporter):
+    def __init__(self, store, job_id, messages=None):
+        super().__init__()
+        self.store = store
+        self.job_id = job_id
+        self.messages = list(messages or [])
+        self.shards = {}
+        self.last_write = 0.0
+
+    def progress(self, done, total, rows):
+        now = time.time()
+        if now - self.last_write >= 1.0 or (total and done >= total):
+            self.last_write = now
+            self.store.update(self.job_id, done=done, total=total, rows=rows)
+
+    def note(self, message):
+        self.messages.append(message)
+        self.store.update(self.job_id, messages=self.messages)
+
+    def warn(self, message):
+        self.note(message)
+
+    def shard(self, label, status):
+        self.shards[label] = status
+        self.store.update(self.job_id, shards=self.shards)
+
+
+def run_job(store, job, pool):
+    params = job["params"]
+    job_dir = os.path.dirname(job["output"])
+    os.makedirs(job_dir, exist_ok=True)
+    reporter = JobReporter(store, job["id"], job["messages"])
+    # A job picked up again after its worker died carries on where it stopped
+    resume = job["started_at"] is not None
+    cache = get_cache() if params.get("use_cache", True) else None
+    history = get_history()
+    changed_only = params.get("changed_only", False)
+    depth = dict(light=params.get("light", False), deep_new=params.get("deep_new", False))
+    site = job["site"]
+    common = dict(filename=job["output"], num_workers=params.get("num_workers"))
+
+    if site == "croma":
+        ckpt = Checkpoint("croma", params["search_for"], directory=job_dir)
+        rows = pipelines.run_croma(params["search_for"], pool, reporter, keep_order=params.get("keep_order", False),
+                                   fast_path=params.get("fast_path", False), resume=resume, cache=cache,
+                                   ckpt=ckpt, history=history, changed_only=changed_only, **depth, **common)
+    elif site == "vijaysales":
+        ckpt = Checkpoint("vijaysales", params["search_for"], directory=job_dir)
+        rows = pipelines.run_vijaysales(params["search_for"], pool, reporter,
+                                        fast_path=params.get("fast_path", False), resume=resume, cache=cache,
+                                        ckpt=ckpt, history=history, changed_only=changed_only, **depth,
+                                        **common)
+    elif site == "flipkart":
+        rows = pipelines.run_flipkart(params["search_for"], pool, reporter,
+                                      fast_path=params.get("fast_path", False), history=history, **common)
+    elif site == "beestar":
+        rows = pipelines.run_beestar(params["appliance"], params.get("brand", "Select All"), pool, reporter,
+                                     filename=job["output"])
+    else:
+        rows = pipelines.run_beestar_fanout(pool, reporter, **common)
+    # The cleaned copy is written once, here, for the page to show
+    if os.path.exists(job["output"]) and os.path.getsize(job["output"]):
+        normalize.clean_csv(site.removesuffix("_all"), job["output"])
+    return rows
+
+
+def work(store=None, idle_exit=IDLE_EXIT):
+    store = store or get_store()
+    worker = os.getpid()
+    store.heartbeat(worker)
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(HEARTBEAT):
+            store.heartbeat(worker)
+
+    threading.Thread(target=beat, daemon=True).start()
+    pool = SessionPool(size=1)
+    idle_since = time.time()
+    try:
+        while True:
+            store.requeue_orphans()
+            job = store.claim(worker)
+            if job is None:
+                if time.time() - idle_since > idle_exit:
+                    return
+                time.sleep(1)
+                continue
+            try:
+                rows = run_job(store, job, pool)
+                store.update(job["id"], status="done", rows=rows, finished_at=time.time())
+            except Exception as e:
+                traceback.print_exc()
+                store.update(job["id"], status="failed", error=str(e) or type(e).__name__,
+                             finished_at=time.time())
+            idle_since = time.time()
+    finally:
+        stop.set()
+        pool.shutdown()
+        store.leave(worker)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["worker"]:
+        work()
+    else:
+        print("usage: python jobs.py worker")
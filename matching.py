@@ -0,0 +1,224 @@
+import argparse
+import os
+import re
+import sys
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import pandas as pd
+
+import beestar
+import croma
+import flipkart
+import normalize
+import vijaysales
+
+# Finds the same AC model across the sites' CSVs and lines them up in one comparison
+# table: each retailer's price next to the BEE label's stars, ISEER and consumption.
+#
+# Comparing every row with every other one is quadratic, so rows are put in blocks
+# first: one per brand + model-number prefix (the first BLOCK_PREFIX characters of each
+# model-like token, i.e. letters and digits mixed, like "FTKM50" in "FTKM50UV16V"). Only
+# rows sharing a block are scored against each other, by how alike their model numbers
+# are, with a bonus when tonnage and stars agree. Each row is then joined with its best
+# match from every other site, if that row picks it back (mutual best, so one model
+# can't swallow its neighbours). Flipkart has no model column, its tokens come from the
+# title.
+#
+#   python matching.py --croma Croma_Data.csv --vijaysales VS_Data.csv \
+#       --flipkart FlipKart_Data.csv --beestar BEEstarlabel_All.csv
+
+SITES = ("croma", "vijaysales", "flipkart", "beestar")
+DEFAULT_FILES = {
+    "croma": croma.FILENAME,
+    "vijaysales": vijaysales.FILENAME,
+    "flipkart": flipkart.FILENAME,
+    "beestar": beestar.MERGED_FILENAME,
+}
+FILENAME = "Comparison.csv"
+# Column the model number is in, per site
+MODEL_COLUMNS = {
+    "croma": "Model No",
+    "vijaysales": "Model No",
+    "flipkart": "Title",
+    "beestar": "Title",
+}
+BLOCK_PREFIX = 6
+# Blocks bigger than this are generic tokens, not model families, and are skipped
+MAX_BLOCK = 500
+MIN_SCORE = 0.8
+TOKEN = r"[A-Z0-9]*\d[A-Z0-9]*"
+# Brand names the sites spell differently, after dropping spaces and punctuation
+BRAND_KEYS = {
+    "OGENERAL": "GENERAL",
+    "FUJITSUGENERAL": "GENERAL",
+}
+# Model-like tokens that are really units or ratings
+NOT_MODELS = re.compile(r"^(\d+(\.\d+)?)(TON|T|STAR|W|KW|L|KG|MM|CM|M|HP|CFM)?$")
+
+
+# Model-like tokens in each value: upper-cased, punctuation dropped, at least 4
+# characters with letters and digits both
+def model_tokens(series):
+    upper = series.astype("string").fillna("").str.upper()
+    words = upper.str.findall(TOKEN)
+    # A model written with separators ("FTKM 50 UV") is also tried glued together
+    glued = upper.str.replace(r"[^A-Z0-9]", "", regex=True)
+
+    def keep(tokens):
+        return [token for token in dict.fromkeys(tokens)
+                if len(token) >= 4 and re.search(r"[A-Z]", token) and not NOT_MODELS.match(token)]
+
+    return [keep(found + ([whole] if len(whole) <= 20 else [])) for found, whole in zip(words, glued)]
+
+
+def brand_keys(series):
+    keys = series.astype("string").fillna("").str.upper().str.replace(r"[^A-Z0-9]", "", regex=True)
+    return keys.replace(BRAND_KEYS)
+
+
+# One site's cleaned rows as match records: brand, model tokens, tons, stars and the
+# columns that go into the comparison table
+def records(site, df):
+    model_column = MODEL_COLUMNS[site]
+    frame = pd.DataFrame({
+        "site": site,
+        "brand": df["Brand"].astype("string") if "Brand" in df else pd.Series(pd.NA, index=df.index),
+        "model": df[model_column].astype("string") if model_column in df else "",
+        "tokens": model_tokens(df[model_column]) if model_column in df else [[]] * len(df),
+        "tons": df["Tons"] if "Tons" in df else float("nan"),
+        "stars": df["Stars"] if "Stars" in df else pd.NA,
+        "title": df["Title"].astype("string") if "Title" in df else "",
+    }, index=df.index)
+    for column in ("Price (₹)", "Rating", "Reviews", "ISEER", "kWh/year", "Product Link"):
+        if column in df:
+            frame[column] = df[column]
+    return frame[frame["tokens"].str.len() > 0].reset_index(drop=True)
+
+
+# brand + token prefix -> indexes of the records in it
+def build_blocks(all_records):
+    blocks = defaultdict(set)
+    for i, (brand, tokens) in enumerate(zip(brand_keys(all_records["brand"]), all_records["tokens"])):
+        for token in tokens:
+            blocks[(brand, token[:BLOCK_PREFIX])].add(i)
+    return {key: members for key, members in blocks.items() if 1 < len(members) <= MAX_BLOCK}
+
+
+def score(a, b):
+    best = max(SequenceMatcher(None, x, y).ratio() for x in a["tokens"] for y in b["tokens"])
+    if pd.notna(a["tons"]) and pd.notna(b["tons"]):
+        best += 0.1 if abs(a["tons"] - b["tons"]) < 0.01 else -0.2
+    if pd.notna(a["stars"]) and pd.notna(b["stars"]):
+        best += 0.05 if a["stars"] == b["stars"] else -0.1
+    return min(best, 1.0)
+
+
+# {site: cleaned DataFrame} -> one row per model, with each site's columns side by side
+def match(frames, min_score=MIN_SCORE):
+    all_records = pd.concat([records(site, df) for site, df in frames.items()], ignore_index=True)
+    rows = all_records.to_dict("records")
+    sites = all_records["site"].tolist()
+
+    # Best candidate on every other site, per record, within the blocks only
+    best = defaultdict(dict)
+    scored = set()
+    for members in build_blocks(all_records).values():
+        members = sorted(members)
+        for n, i in enumerate(members):
+            for j in members[n + 1:]:
+                if sites[i] == sites[j] or (i, j) in scored:
+                    continue
+                scored.add((i, j))
+                value = score(rows[i], rows[j])
+                if value < min_score:
+                    continue
+                for this, other in ((i, j), (j, i)):
+                    current = best[this].get(sites[other])
+                    if current is None or value > current[1]:
+                        best[this][sites[other]] = (other, value)
+
+    # Mutual best matches are joined into groups, one record per site at most
+    group_of = {}
+    groups = []
+    for i in range(len(rows)):
+        for site, (j, value) in best[i].items():
+            if best[j].get(sites[i], (None,))[0] != i:
+                continue
+            gi, gj = group_of.get(i), group_of.get(j)
+            if gi is None and gj is None:
+                group_of[i] = group_of[j] = len(groups)
+                groups.append({sites[i]: i, sites[j]: j, "score": value})
+            elif gi is not None and gj is None and sites[j] not in groups[gi]:
+                group_of[j] = gi
+                groups[gi][sites[j]] = j
+                groups[gi]["score"] = min(groups[gi]["score"], value)
+            elif gj is not None and gi is None and sites[i] not in groups[gj]:
+                group_of[i] = gj
+                groups[gj][sites[i]] = i
+                groups[gj]["score"] = min(groups[gj]["score"], value)
+
+    table = []
+    for group in groups:
+        members = [rows[group[site]] for site in SITES if site in group]
+        first = members[0]
+        entry = {
+            "Brand": next((m["brand"] for m in members if pd.notna(m["brand"])), pd.NA),
+            "Model": next((m["model"] for m in members if m["site"] != "flipkart"), first["model"]),
+            "Tons": next((m["tons"] for m in members if pd.notna(m["tons"])), float("nan")),
+            "Stars": next((m["stars"] for m in members if m["site"] == "beestar" and pd.notna(m["stars"])),
+                          next((m["stars"] for m in members if pd.notna(m["stars"])), pd.NA)),
+            "Sites": len(members),
+            "Match Score": round(group["score"], 3),
+        }
+        for site in SITES:
+            row = rows[group[site]] if site in group else {}
+            if site == "beestar":
+                entry["BEE ISEER"] = row.get("ISEER", float("nan"))
+                entry["BEE kWh/year"] = row.get("kWh/year", float("nan"))
+                entry["BEE Title"] = row.get("title", pd.NA)
+            else:
+                entry[f"{site.title()} Price (₹)"] = row.get("Price (₹)", float("nan"))
+                entry[f"{site.title()} Rating"] = row.get("Rating", float("nan"))
+                entry[f"{site.title()} Link"] = row.get("Product Link", pd.NA)
+        table.append(entry)
+
+    merged = pd.DataFrame(table)
+    if merged.empty:
+        return merged
+    merged["Brand"] = merged["Brand"].astype("category")
+    prices = merged.filter(like="Price (₹)").astype("float32")
+    merged[prices.columns] = prices
+    merged["Lowest Price (₹)"] = prices.min(axis=1)
+    return merged.sort_values(["Sites", "Brand", "Model"], ascending=[False, True, True],
+                              ignore_index=True)
+
+
+# {site: CSV filename} -> comparison table, reading and cleaning each file
+def match_files(files, min_score=MIN_SCORE):
+    frames = {}
+    for site, filename in files.items():
+        if filename and os.path.exists(filename):
+            raw = pd.read_csv(filename, dtype=str, keep_default_na=False)
+            frames[site] = normalize.normalize(site, raw)
+    if len(frames) < 2:
+        raise ValueError("Need the CSVs of at least two sites to compare")
+    return match(frames, min_score)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Match the same AC models across the sites' CSVs")
+    for site in SITES:
+        parser.add_argument(f"--{site}", default=DEFAULT_FILES[site], help=f"default {DEFAULT_FILES[site]}")
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE)
+    parser.add_argument("--out", default=FILENAME)
+    args = parser.parse_args(argv)
+
+    merged = match_files({site: getattr(args, site) for site in SITES}, args.min_score)
+    merged.to_csv(args.out, index=False, float_format="%.7g")
+    print(f"{len(merged)} models matched across sites, saved to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
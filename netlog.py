@@ -0,0 +1,167 @@
+import base64
+import json
+from urllib.parse import urljoin
+
+import canonical
+
+# Key names the retail search APIs use for product fields, tried in order
+URL_KEYS = ("url", "productUrl", "product_url", "pdpUrl", "url_path", "canonicalUrl", "link")
+TITLE_KEYS = ("name", "title", "productName", "product_name", "displayName")
+PRICE_KEYS = ("price", "finalPrice", "final_price", "sellingPrice", "selling_price", "offerPrice",
+              "special_price", "mop")
+RATING_KEYS = ("rating", "averageRating", "average_rating", "avgRating", "finalReviewRating", "rating_summary")
+REVIEW_KEYS = ("reviewCount", "review_count", "numberOfReviews", "totalReviews", "ratingCount",
+               "finalReviewRatingCount", "reviews_count")
+TOTAL_KEYS = ("totalResults", "total_count", "totalCount", "numFound", "totalProducts", "total_products")
+VALUE_KEYS = ("value", "amount", "formattedValue", "formatted", "final")
+
+MISSING = ("NA", "Not Available", "", None)
+
+
+# Turns on Chrome's performance log, which carries the DevTools Network events
+def enable(options):
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+
+
+# Reads the JSON responses a page received, straight from the DevTools Network events.
+# A body is only fetched once its request has finished loading; responses still in flight
+# are kept for the next call. With `url_pattern` (a compiled regex) only responses whose
+# URL matches are read, e.g. the site's search API and not its recommendations.
+class NetworkCapture:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pending = {}
+
+    # Throw away everything logged so far, e.g. by the previous page this driver loaded
+    def drain(self):
+        try:
+            self.driver.get_log("performance")
+        except:
+            pass
+        self.pending = {}
+
+    def json_payloads(self, url_pattern=None):
+        try:
+            entries = self.driver.get_log("performance")
+        except:
+            return
+        finished = []
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            params = message.get("params", {})
+            if message.get("method") == "Network.responseReceived":
+                response = params.get("response", {})
+                if "json" in response.get("mimeType", ""):
+                    self.pending[params["requestId"]] = response.get("url")
+            elif message.get("method") == "Network.loadingFinished":
+                finished.append(params.get("requestId"))
+
+        for request_id in finished:
+            url = self.pending.pop(request_id, None)
+            if url is None or (url_pattern is not None and not url_pattern.search(url)):
+                continue
+            try:
+                body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                text = body["body"]
+                if body.get("base64Encoded"):
+                    text = base64.b64decode(text).decode("utf-8")
+                yield url, json.loads(text)
+            except Exception:
+                continue
+
+
+def _first(node, keys):
+    for key in keys:
+        if node.get(key) not in (None, ""):
+            return node[key]
+    return None
+
+
+def _scalar(value):
+    while isinstance(value, dict):
+        value = _first(value, VALUE_KEYS)
+    return value
+
+
+# Walks a JSON payload and picks out every object that looks like a product, i.e. has a
+# link and a price. Returns {canonical product url: {"title", "price", "rating", "reviews"}}.
+def find_products(payload, base_url):
+    records = {}
+
+    def walk(node):
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+            return
+        if not isinstance(node, dict):
+            return
+        link = _first(node, URL_KEYS)
+        price = _scalar(_first(node, PRICE_KEYS))
+        if isinstance(link, str) and price is not None:
+            records[canonical.canonical_url(urljoin(base_url, link))] = {
+                "title": _scalar(_first(node, TITLE_KEYS)),
+                "price": price,
+                "rating": _scalar(_first(node, RATING_KEYS)),
+                "reviews": _scalar(_first(node, REVIEW_KEYS)),
+            }
+            return
+        for value in node.values():
+            walk(value)
+
+    walk(payload)
+    return records
+
+
+# Largest result count advertised anywhere in the payload, or None
+def find_total(payload):
+    totals = []
+
+    def walk(node):
+        if isinstance(node, list):
+            for item in node:
+                walk(item)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key in TOTAL_KEYS and isinstance(value, int):
+                    totals.append(value)
+                else:
+                    walk(value)
+
+    walk(payload)
+    return max(totals) if totals else None
+
+
+# Adds a product's fields read off its listing card to `listing`. Values already there
+# (from the JSON, which is more exact than card text) are kept, only gaps are filled.
+def add_card(listing, url, record):
+    known = listing.setdefault(url, {})
+    for field, value in record.items():
+        if known.get(field) in MISSING and value not in MISSING:
+            known[field] = value
+
+
+# A CSV row from the listing fields alone, for a crawl that skips the product page:
+# `base` (e.g. the product's last full row) or NA in every cell, with the record's
+# title/price/rating/reviews written over it. The base row's listing cells are cleared
+# first, a value the card doesn't show is NA rather than last run's.
+def listing_row(columns, fields, record, link, base=None):
+    row = list(base) if base else ["NA"] * len(columns)
+    for index, field in fields.items():
+        row[index] = str(record[field]) if record.get(field) not in MISSING else "NA"
+    row[-1] = link
+    return row
+
+
+# Fills the cells a detail page left empty from the captured listing record.
+# `columns` maps row index -> record field.
+def fill_missing(row, record, columns):
+    if not record:
+        return row
+    for index, field in columns.items():
+        if row[index] in MISSING and record.get(field) not in (None, ""):
+            row[index] = str(record[field])
+    return row
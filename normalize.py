@@ -0,0 +1,185 @@
+import os
+
+import pandas as pd
+
+# Turns a site's scraped CSV into typed columns with vectorized pandas string ops, so
+# prices, capacities, star ratings, ISEER and review counts can be sorted and compared
+# without cleaning them by hand in Excel. The parsed columns are added next to the raw
+# text, except ISEER and Brand, which are replaced by their typed version:
+#
+#   Price (₹)   float32     "₹45,990" -> 45990
+#   Tons        float32     "1.5 Ton", "5100 W" -> 1.5
+#   Stars       Int8        "5 Star", "4" -> 5
+#   ISEER       float32     "4.65" -> 4.65
+#   Rating      float32     "4.3" -> 4.3
+#   Reviews     Int32       "(1,234)", "1,234 Ratings & 120 Reviews" -> 1234
+#   Brand       category
+#
+# Flipkart and BEE mostly have a title to go on, so brand, tonnage and stars are read
+# from it.
+
+NUMBER = r"(\d+(?:\.\d+)?)"
+# Watts of cooling per ton of refrigeration
+WATTS_PER_TON = 3516.85
+# Brands whose name is more than the title's first word
+BRAND_ALIASES = {
+    "blue": "Blue Star",
+    "o": "O General",
+    "o-general": "O General",
+    "lloyd": "Lloyd",
+}
+
+# Site -> {parsed column: (raw column, parser name)}
+COLUMN_PARSERS = {
+    "croma": {
+        "Price (₹)": ("Price", "price"),
+        "Tons": ("Capacity", "tons"),
+        "Stars": ("BEE Star", "stars"),
+        "ISEER": ("ISEER", "decimal"),
+        "Rating": ("Review", "decimal"),
+        "Reviews": ("No of Reviews", "count"),
+    },
+    "vijaysales": {
+        "Price (₹)": ("Price", "price"),
+        "Tons": ("Capacity", "tons"),
+        "Stars": ("BEE Star", "stars"),
+        "ISEER": ("ISEER", "decimal"),
+        "Rating": ("Review", "decimal"),
+        "Reviews": ("No of Reviews", "count"),
+    },
+    "flipkart": {
+        "Price (₹)": ("Price", "price"),
+        "Rating": ("Star Rating", "decimal"),
+        "Reviews": ("Num Reviews", "count"),
+        "Tons": ("Title", "tons"),
+        "Stars": ("Title", "stars"),
+    },
+    "beestar": {
+        "ISEER": ("ISEER", "decimal"),
+        "Tons": ("Ton", "tons"),
+        "Stars": ("Title", "stars"),
+        "kWh/year": ("Electricity Consumption (kWh/year)", "decimal"),
+    },
+}
+
+
+def _text(series):
+    return series.astype("string").str.strip()
+
+
+# The first number, so "₹ 34,990 ₹ 59,990" (price and MRP) is 34990 and "Rs. 45,990" is 45990
+def price(series):
+    return decimal(series)
+
+
+def decimal(series):
+    found = _text(series).str.replace(",", "", regex=False).str.extract(NUMBER, expand=False)
+    return pd.to_numeric(found, errors="coerce").astype("float32")
+
+
+# The first number, e.g. the ratings in "1,234 Ratings & 120 Reviews"
+def count(series):
+    found = _text(series).str.replace(",", "", regex=False).str.extract(r"(\d+)", expand=False)
+    return pd.to_numeric(found, errors="coerce").astype("Int32")
+
+
+# "1.5 Ton" / "1.5 T" anywhere in the text, else watts converted, else a bare number
+# that is small enough to be tons already
+def tons(series):
+    text = _text(series).str.lower().str.replace(",", "", regex=False)
+    tagged = pd.to_numeric(text.str.extract(NUMBER + r"\s*(?:tons?|tr?)\b", expand=False), errors="coerce")
+    watts = pd.to_numeric(text.str.extract(NUMBER + r"\s*(?:w|watts?)\b", expand=False), errors="coerce")
+    bare = pd.to_numeric(text.where(text.str.fullmatch(NUMBER).fillna(False)), errors="coerce")
+    from_watts = (watts / WATTS_PER_TON * 4).round() / 4
+    result = tagged.fillna(from_watts).fillna(bare.where(bare <= 5))
+    return result.astype("float32")
+
+
+# "5 Star" anywhere in the text, else a bare 1-5
+def stars(series):
+    text = _text(series).str.lower()
+    tagged = text.str.extract(r"\b([1-5])\s*-?\s*star", expand=False)
+    bare = text.str.extract(r"^([1-5])(?:\.0)?$", expand=False)
+    return pd.to_numeric(tagged.fillna(bare), errors="coerce").astype("Int8")
+
+
+def brand(series, from_title=False):
+    text = _text(series)
+    if from_title:
+        first = text.str.extract(r"^([\w&'-]+)", expand=False)
+        text = first.str.lower().map(BRAND_ALIASES).fillna(first)
+    text = text.where(~text.isin(["NA", "Not Available", ""]))
+    return text.str.upper().astype("category")
+
+
+PARSERS = {"price": price, "decimal": decimal, "count": count, "tons": tons, "stars": stars}
+# The dtype of every column normalize() adds or replaces
+DTYPES = {
+    "Price (₹)": "float32",
+    "Tons": "float32",
+    "Stars": "Int8",
+    "ISEER": "float32",
+    "Rating": "float32",
+    "Reviews": "Int32",
+    "kWh/year": "float32",
+    "Brand": "category",
+    "Type": "category",
+    "Appliance": "category",
+}
+
+
+# A site's scraped rows with the parsed columns added
+def normalize(site, df):
+    df = df.copy()
+    for column, (raw, parser) in COLUMN_PARSERS[site].items():
+        if raw in df.columns:
+            df[column] = PARSERS[parser](df[raw])
+    # Croma, Vijay Sales and the BEE fan-out have a Brand column, the rest only a title
+    if "Brand" in df.columns:
+        df["Brand"] = brand(df["Brand"])
+    elif "Title" in df.columns:
+        df["Brand"] = brand(df["Title"], from_title=True)
+    if "Valid Till Date" in df.columns:
+        df["Valid Till Date"] = pd.to_datetime(df["Valid Till Date"], errors="coerce", dayfirst=True)
+    for column in ("Type", "Appliance"):
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    return df
+
+
+def clean_filename(filename):
+    root, ext = os.path.splitext(filename)
+    return f"{root}_Clean{ext or '.csv'}"
+
+
+# Reads a site's CSV, writes the normalized one next to it (<name>_Clean.csv) and
+# returns the typed DataFrame and that file's name
+def clean_csv(site, filename):
+    df = normalize(site, pd.read_csv(filename, dtype=str, keep_default_na=False))
+    out = clean_filename(filename)
+    # float32 holds about 7 significant digits, don't print the noise past them
+    df.to_csv(out, index=False, float_format="%.7g")
+    return df, out
+
+
+# A cleaned file read back with the dtypes normalize() gave its columns
+def read_clean(filename):
+    header = pd.read_csv(filename, nrows=0).columns
+    typed = {column: dtype for column, dtype in DTYPES.items() if column in header}
+    df = pd.read_csv(filename, dtype={**{column: str for column in header}, **typed}, keep_default_na=False,
+                     na_values={column: [""] for column in typed})
+    # brand() gives categories of pandas strings, read_csv of Python ones
+    if "Brand" in df.columns:
+        df["Brand"] = df["Brand"].astype("string").astype("category")
+    if "Valid Till Date" in df.columns:
+        df["Valid Till Date"] = pd.to_datetime(df["Valid Till Date"], errors="coerce")
+    return df
+
+
+# The cleaned file as it is when it is newer than the CSV, else clean_csv(), so showing
+# a finished run again doesn't write it again
+def cleaned(site, filename):
+    out = clean_filename(filename)
+    if os.path.exists(out) and os.path.getmtime(out) >= os.path.getmtime(filename):
+        return read_clean(out), out
+    return clean_csv(site, filename)
@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from canonical import canonical_url
+
+CACHE_PATH = os.path.join("page_cache", "pages.sqlite")
+MAX_BYTES = 512 * 1024 * 1024
+
+# How long a cached page can stand in for each kind of field. Specs (capacity, ISEER,
+# model number...) almost never change, price and reviews do. Reviews are read from the
+# same page as the price, so they go by the price TTL.
+TTL = {
+    "specs": 14 * 24 * 3600,
+    "price": 2 * 3600,
+}
+
+
+# Product page HTML on disk, keyed by canonical URL (canonical.py, the same key the rest
+# of the run uses). Pages are stored zlib-compressed in one SQLite file; when the total
+# goes over max_bytes the least recently used pages are dropped first.
+class PageCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                html BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS pages_used_at ON pages (used_at)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    # The cached HTML and the set of field classes (TTL keys) it is still fresh for, from
+    # one query; (None, set()) when there is nothing fresh. A page fresh for price counts
+    # as a hit, as it saves a request, anything else as a miss. count=False is for a
+    # second look at a page whose lookup was already counted.
+    def lookup(self, url, count=True):
+        key = canonical_url(url)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT html, fetched_at FROM pages WHERE url = ?", (key,)).fetchone()
+            fresh = {field_class for field_class, ttl in TTL.items() if row is not None and now - row[1] <= ttl}
+            if count:
+                if "price" in fresh:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+            if not fresh:
+                return None, fresh
+            self.conn.execute("UPDATE pages SET used_at = ? WHERE url = ?", (now, key))
+            self.conn.commit()
+        return zlib.decompress(row[0]).decode("utf-8"), fresh
+
+    # Returns the cached HTML if it is fresh enough for `field_class`, else None
+    def get(self, url, field_class="price"):
+        html, fresh = self.lookup(url)
+        return html if field_class in fresh else None
+
+    def put(self, url, html):
+        key = canonical_url(url)
+        blob = zlib.compress(html.encode("utf-8"), 6)
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM pages WHERE url = ?", (key,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO pages (url, html, size, fetched_at, used_at) "
+                              "VALUES (?, ?, ?, ?, ?)", (key, blob, len(blob), now, now))
+            self.total_bytes += len(blob) - (old[0] if old else 0)
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            victims = self.conn.execute("SELECT url, size FROM pages ORDER BY used_at LIMIT 50").fetchall()
+            if not victims:
+                self.total_bytes = 0
+                return
+            for url, size in victims:
+                self.conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def summary(self):
+        return f"🗄️ Page cache: {self.hits} hits, {self.misses} misses, {self.total_bytes / 1e6:.1f} MB on disk"
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache()
+        return _cache
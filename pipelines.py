@@ -0,0 +1,532 @@
+import time
+from functools import partial
+
+from selenium.common.exceptions import TimeoutException
+
+import beestar
+import canonical
+import croma
+import extract
+import flipkart
+import http_fetch
+import netlog
+import ratelimit
+import vijaysales
+from checkpoint import Checkpoint
+from csv_sink import CsvSink
+from workers import Channel, interleave, run_parallel, default_workers
+
+# The scrape of each site without any UI, so the same run can be driven from Streamlit,
+# from a background job or from the command line. Progress goes to a Reporter; each
+# run_* function returns the number of rows it wrote. Product links are canonicalized
+# (see canonical.py) before anything is scheduled, so URL variants of one product are
+# scraped once. Runs that share `seen` (a canonical.SeenIndex, e.g. across the queries
+# of one batch) skip the products already in it and add the ones they schedule. Every
+# page, over HTTP or in a browser, waits for its site's limiter (see ratelimit.py).
+
+
+# Links discovered ahead of the detail scrape. Once this many are waiting, discovery
+# pauses until a browser (or the HTTP pool) takes the next one.
+QUEUE_SIZE = 32
+
+
+# Receives a run's progress. This one prints notes and warnings and ignores the rest,
+# the Streamlit page and the job runner have their own.
+class Reporter:
+    def __init__(self):
+        self.start_time = time.time()
+
+    # done/total are products (or pages, for Flipkart), rows is what is in the CSV so far
+    def progress(self, done, total, rows):
+        pass
+
+    def note(self, message):
+        print(message)
+
+    def warn(self, message):
+        print(message)
+
+    # Status of one part of a run that is split up, e.g. a BEE appliance x brand shard
+    def shard(self, label, status):
+        pass
+
+    def eta(self, done, total):
+        if not done:
+            return 0
+        return int((time.time() - self.start_time) / done * (total - done))
+
+
+# With a PriceHistory every row is recorded in it, and with changed_only=True a product
+# whose listing price, rating and reviews match its last recorded row gets that row again
+# instead of a visit to its page. light=True skips product pages altogether: rows are the
+# listing card's title, price and rating on top of the product's last full row (NA where
+# there is none), and with deep_new=True products the history has no full row for are
+# still scraped in full. The same goes for run_vijaysales.
+def run_croma(search_for, pool, reporter, filename=croma.FILENAME, num_workers=None, keep_order=False,
+              fast_path=False, resume=False, cache=None, ckpt=None, seen=None, history=None, changed_only=False,
+              light=False, deep_new=False):
+    croma.WAITS.reset()
+    croma.TIMES.reset()
+    ratelimit.for_site("croma").reset()
+    if cache:
+        cache.reset_stats()
+    if history:
+        history.reset_stats()
+    num_workers = num_workers or default_workers()
+    ckpt = ckpt or Checkpoint("croma", search_for)
+    listing = {}
+
+    # "View More" is clicked on a browser of its own while the product pages are scraped
+    def discover():
+        driver = pool.acquire("croma")
+        try:
+            yield from croma.iter_links(driver, search_for, listing)
+        finally:
+            pool.release(driver, pages=1)
+
+    def reuse(link):
+        if light:
+            return _light_row("croma", croma, link, listing.get(link), history, deep_new)
+        return history.unchanged_row("croma", link, listing.get(link))
+
+    pending = _pending(ckpt, resume, discover, seen, reporter,
+                       reuse if light or (history and changed_only) else None, light, listing)
+    # Create CSV with headers, or keep adding to it when resuming
+    sink = CsvSink(filename, croma.COLUMNS, append=bool(pending.done), site="croma",
+                   on_flush=_on_flush("croma", ckpt, history, croma.LISTING_FIELDS))
+    count = 0
+    written = 0
+    # With keep_order, pages that finish early wait here (by their place in the listing,
+    # None for a page that gave no row) until every page before them is done, so the CSV
+    # keeps growing in listing order
+    finished = {}
+    next_out = 0
+
+    def write_row(link, row):
+        nonlocal written, next_out
+        if row is not None:
+            written += 1
+            # Anything the product page didn't show, take from the captured listing JSON
+            netlog.fill_missing(row, listing.get(row[-1]), croma.LISTING_FIELDS)
+        if not keep_order:
+            if row is not None:
+                sink.write(row)
+            return
+        finished[pending.order[link]] = row
+        while next_out in finished:
+            row = finished.pop(next_out)
+            next_out += 1
+            if row is not None:
+                sink.write(row)
+
+    try:
+        scrape = _limited_scrape(croma, partial(croma.scrape_product, cache=cache), cache, checked=fast_path)
+        if fast_path:
+            results = _http_then_browser(pending, croma.parse_product, scrape, "croma", pool, num_workers, cache)
+        else:
+            results = run_parallel(pending, scrape, partial(pool.acquire, "croma"), num_workers=num_workers,
+                                   release_driver=pool.release, after_page=pool.page_done,
+                                   queue_size=QUEUE_SIZE)
+        for i, new_link, result in pending.merge(results):
+            count += 1
+            row = None
+            if isinstance(result, Exception):
+                reporter.warn(f"⚠️ Error scraping {new_link}: {result}")
+            else:
+                row, warnings = result
+                for warning in warnings:
+                    reporter.warn(warning)
+            write_row(new_link, row)
+            pending.announce(reporter)
+            reporter.progress(count, pending.queued, written)
+        pending.announce(reporter)
+
+        # Only left over if a page never came back
+        sink.writerows(row for _, row in sorted(finished.items()) if row is not None)
+    finally:
+        pending.close()
+        sink.close()
+    ckpt.clear()
+    return sink.rows_written
+
+
+def run_vijaysales(search_for, pool, reporter, filename=vijaysales.FILENAME, num_workers=None,
+                   fast_path=False, resume=False, cache=None, ckpt=None, seen=None, history=None,
+                   changed_only=False, light=False, deep_new=False):
+    vijaysales.WAITS.reset()
+    vijaysales.TIMES.reset()
+    ratelimit.for_site("vijaysales").reset()
+    if cache:
+        cache.reset_stats()
+    if history:
+        history.reset_stats()
+    num_workers = num_workers or default_workers()
+    ckpt = ckpt or Checkpoint("vijaysales", search_for)
+    listing = {}
+
+    # Open the listing pages straight by URL, in parallel; click "Next" only if that fails
+    def discover():
+        if fast_path and (yield from vijaysales.iter_links_direct(
+                search_for, lambda urls: http_fetch.fetch_parsed(urls, vijaysales.parse_listing), listing)):
+            return
+        if (yield from vijaysales.iter_links_direct(
+                search_for, lambda urls: run_parallel(urls, ratelimit.limited(vijaysales.scrape_listing),
+                                                      partial(pool.acquire, "vijaysales"),
+                                                      num_workers=num_workers, release_driver=pool.release,
+                                                      after_page=pool.page_done),
+                listing)):
+            return
+        driver = pool.acquire("vijaysales")
+        try:
+            yield from vijaysales.iter_links(driver, search_for, listing)
+        finally:
+            pool.release(driver, pages=1)
+
+    def reuse(link):
+        if light:
+            return _light_row("vijaysales", vijaysales, link, listing.get(link), history, deep_new)
+        return history.unchanged_row("vijaysales", link, listing.get(link))
+
+    pending = _pending(ckpt, resume, discover, seen, reporter,
+                       reuse if light or (history and changed_only) else None, light, listing)
+    # Create CSV with headers, or keep adding to it when resuming
+    sink = CsvSink(filename, vijaysales.COLUMNS, append=bool(pending.done), site="vijaysales",
+                   on_flush=_on_flush("vijaysales", ckpt, history, vijaysales.LISTING_FIELDS))
+    count = 0
+
+    def scrape_page(driver, link, specs_page=None):
+        return vijaysales.scrape_product(driver, link, cache=cache, specs_page=specs_page), []
+
+    scrape = _limited_scrape(vijaysales, scrape_page, cache, checked=fast_path)
+
+    try:
+        if fast_path:
+            results = _http_then_browser(pending, vijaysales.parse_product, scrape, "vijaysales", pool,
+                                         num_workers, cache)
+        else:
+            results = run_parallel(pending, scrape, partial(pool.acquire, "vijaysales"), num_workers=num_workers,
+                                   release_driver=pool.release, after_page=pool.page_done,
+                                   queue_size=QUEUE_SIZE)
+        for i, new_link, result in pending.merge(results):
+            if isinstance(result, Exception):
+                reporter.warn(f"⚠️ Error scraping {new_link}: {result}")
+            elif result[0] is not None:
+                row = result[0]
+                netlog.fill_missing(row, listing.get(row[-1]), vijaysales.LISTING_FIELDS)
+                sink.write(row)
+                count += 1
+            pending.announce(reporter)
+            reporter.progress(count, pending.queued, count)
+        pending.announce(reporter)
+    finally:
+        pending.close()
+        sink.close()
+    ckpt.clear()
+    return sink.rows_written
+
+
+def run_flipkart(search_for, pool, reporter, filename=flipkart.FILENAME, num_workers=None, fast_path=False,
+                 seen=None, history=None):
+    flipkart.TIMES.reset()
+    ratelimit.for_site("flipkart").reset()
+    num_workers = num_workers or default_workers()
+
+    # Open the first page, over HTTP if we can
+    first_url = flipkart.search_url(search_for, 1)
+    html = http_fetch.fetch(first_url) if fast_path else None
+    first_rows = flipkart.parse_page(html, first_url) if html else None
+    if first_rows:
+        root = extract.parse_html(html, first_url)
+        driver = None
+    else:
+        driver = pool.acquire("flipkart")
+        # One load gives page 1's rows and the page count, closing the login popup on the way
+        root = ratelimit.limited(partial(flipkart.open_page, popup=True))(driver, first_url)
+        with flipkart.TIMES.span("extraction"):
+            first_rows = flipkart.parse_cards(root) if root is not None else []
+
+    total_pages = flipkart.total_pages(root) if root is not None else 1
+    sink = CsvSink(filename, flipkart.COLUMNS, site="flipkart",
+                   on_flush=_on_flush("flipkart", None, history, flipkart.LISTING_FIELDS))
+    count = 0
+    pages_done = 0
+
+    def write_rows(rows):
+        nonlocal count, pages_done
+        pages_done += 1
+        if seen is not None:
+            rows = [row for row in rows if row[-1] == "NA" or seen.add(row[-1])]
+        sink.writerows(rows)
+        count += len(rows)
+        reporter.progress(pages_done, total_pages, count)
+
+    try:
+        write_rows(first_rows)
+
+        # Fetch the remaining pages concurrently, each page is parsed as soon as it arrives
+        page_urls = [flipkart.search_url(search_for, page) for page in range(2, total_pages + 1)]
+        browser_urls = page_urls
+        if fast_path:
+            browser_urls = []
+            for i, url, rows in http_fetch.fetch_parsed(page_urls, flipkart.parse_page):
+                if rows is None:
+                    browser_urls.append(url)
+                else:
+                    write_rows(rows)
+
+        results = run_parallel(browser_urls, ratelimit.limited(flipkart.scrape_page),
+                               partial(pool.acquire, "flipkart"), num_workers=num_workers,
+                               drivers=[driver] if driver else None, release_driver=pool.release,
+                               after_page=pool.page_done)
+        for i, url, rows in results:
+            if isinstance(rows, Exception) or rows is None:
+                rows = []
+            write_rows(rows)
+    finally:
+        sink.close()
+    return sink.rows_written
+
+
+# Passes discovered links on to the detail scrape while discovery is still running, in
+# canonical form. Repeats (by product ID), links a resumed run already finished and links
+# another run sharing `seen` took are dropped. reuse(link), if given, returns a row to
+# write instead of opening the page (e.g. the product's last row from PriceHistory) or
+# None; those rows come out of merge() next to the scraped ones. Once discovery is over
+# every link it found is saved to the checkpoint, so a resumed run can skip it, with its
+# card fields from `listing` (product url -> fields) for a resumed light crawl. `queued`
+# counts the links passed on so far, which is the progress total until discovery is done,
+# and `order` is each one's place in discovery order.
+class _Pending:
+    def __init__(self, links, done, seen, ckpt, reuse=None, light=False, listing=None):
+        self.links = links
+        self.listing = listing if listing is not None else {}
+        self.done = done
+        self.seen = seen if seen is not None else canonical.SeenIndex()
+        self.ckpt = ckpt
+        self.reuse = reuse
+        self.light = light
+        self.reused = Channel()
+        self.found = {}
+        self.order = {}
+        self.queued = 0
+        self.skipped = 0
+        self.finished = False
+        self.announced = False
+        self.merged = None
+
+    def __iter__(self):
+        try:
+            for link in self.links:
+                link = canonical.canonical_url(link)
+                key = canonical.product_key(link)
+                if key in self.found:
+                    continue
+                self.found[key] = link
+                if link in self.done or not self.seen.add(link):
+                    continue
+                self.order[link] = self.queued
+                self.queued += 1
+                row = self.reuse(link) if self.reuse else None
+                if row is not None:
+                    self.skipped += 1
+                    self.reused.put((self.order[link], link, (row, [])))
+                    continue
+                yield link
+            links = list(self.found.values())
+            self.ckpt.save_links(links, {link: self.listing[link] for link in links if link in self.listing})
+            self.finished = True
+        finally:
+            self.reused.close()
+
+    # (i, link, result) from `results` and from the reused rows, as they come
+    def merge(self, results):
+        def scraped():
+            try:
+                yield from results
+            finally:
+                # Discovery may never get to the end if the scrape stopped early
+                self.reused.close()
+
+        self.merged = interleave(scraped(), self.reused)
+        return self.merged
+
+    # Stops the scrape behind merge() when the run ends early (an error, a Streamlit rerun)
+    def close(self):
+        if self.merged is not None:
+            self.merged.close()
+
+    # Called from the thread that reports, discovery itself runs on a worker thread
+    def announce(self, reporter):
+        if self.finished and not self.announced:
+            self.announced = True
+            if self.light:
+                reused = f", **{self.skipped}** taken from the listing"
+            else:
+                reused = f", **{self.skipped}** unchanged since the last run" if self.reuse else ""
+            reporter.note(f"🔍 Found **{len(self.found)}** products, **{self.queued - self.skipped}** "
+                          f"to scrape{reused}")
+
+
+# Where a run's links come from: the checkpoint when a resumed run got past discovery,
+# otherwise discover(), skipping what a resumed run already saved. `listing` is filled
+# with the card fields saved in the checkpoint when discovery isn't run again.
+def _pending(ckpt, resume, discover, seen, reporter, reuse=None, light=False, listing=None):
+    if resume and ckpt.exists():
+        links, done = ckpt.load()
+        if listing is not None:
+            listing.update(ckpt.load_listing())
+        reporter.note(f"♻️ Resuming: **{len(done)}** of **{len(links)}** products already saved")
+    elif resume and ckpt.done_links():
+        links, done = discover(), ckpt.done_links()
+        reporter.note(f"♻️ Resuming: **{len(done)}** products already saved, searching again for the rest")
+    else:
+        ckpt.begin()
+        links, done = discover(), set()
+        reporter.note("🔍 Searching... product pages are scraped as soon as they are found")
+    return _Pending(links, done, seen, ckpt, reuse, light, listing)
+
+
+# scrape(driver, link, specs_page=None) behind the site's limiter, with each product
+# looked up in the cache once, before it waits for the limiter: a page still fresh for
+# price gives its row without a request, one only fresh for specs is passed on as
+# specs_page. checked=True when the price was already looked up (by the HTTP stage of
+# the fast path), then only the specs are taken from the cache.
+def _limited_scrape(module, scrape, cache, checked=False):
+    if cache is None:
+        return ratelimit.limited(scrape)
+    specs_pages = {}
+
+    def cached(link):
+        html, fresh = cache.lookup(link, count=not checked)
+        if "price" in fresh and not checked:
+            row = module.parse_product(html, link)
+            if row is not None:
+                return row, []
+        if "specs" in fresh:
+            specs_pages[link] = html
+        return None
+
+    def run(driver, link):
+        return scrape(driver, link, specs_page=specs_pages.pop(link, None))
+
+    return ratelimit.limited(run, cached=cached)
+
+
+# A light crawl's row for one product, None when its page has to be opened after all:
+# the card gave nothing to go by, or (with deep_new) the history has no full row for it
+def _light_row(site, module, link, record, history, deep_new):
+    if not record:
+        return None
+    known = history.last_row(site, link) if history else None
+    if known is None and deep_new:
+        return None
+    return netlog.listing_row(module.COLUMNS, module.LISTING_FIELDS, record, link, known)
+
+
+# A CsvSink on_flush hook that marks rows done in the checkpoint and, with a history,
+# records them in it
+def _on_flush(site, ckpt, history, fields):
+    def flushed(rows):
+        if ckpt:
+            ckpt.flushed(rows)
+        if history:
+            history.record(site, rows, fields)
+
+    return flushed
+
+
+# Fast path for a stream of product links: plain HTTP first, and the pages that need
+# JavaScript go on through a Channel to `num_workers` browsers while HTTP carries on.
+# Yields (i, link, result) from both as they finish, i being the link's place in `links`
+# and result (row, warnings) or the exception the browser scrape raised.
+def _http_then_browser(links, parse, scrape, site, pool, num_workers, cache):
+    channel = Channel(QUEUE_SIZE)
+
+    def http_stage():
+        try:
+            for i, link, row in http_fetch.fetch_parsed(links, parse, cache=cache):
+                if row is None:
+                    channel.put((i, link))
+                else:
+                    yield i, link, (row, [])
+        finally:
+            channel.close()
+
+    def browser_stage():
+        try:
+            for _, (i, link), result in run_parallel(channel, lambda driver, job: scrape(driver, job[1]),
+                                                     partial(pool.acquire, site), num_workers=num_workers,
+                                                     release_driver=pool.release, after_page=pool.page_done):
+                yield i, link, result
+        finally:
+            channel.cancel()
+
+    return interleave(http_stage(), browser_stage())
+
+
+# One search on the BEE site. Raises RuntimeError with a message for the user when the
+# form or the results do not load.
+def run_beestar(appliance, brand, pool, reporter, filename=beestar.FILENAME):
+    beestar.TIMES.reset()
+    ratelimit.for_site("beestar").reset()
+    driver = pool.acquire("beestar")
+    sink = None
+    finished = False
+    try:
+        ratelimit.get(driver, beestar.SEARCH_URL, beestar.TIMES)
+        beestar.submit_search(driver, appliance, brand)
+
+        sink = CsvSink(filename, beestar.COLUMNS, site="beestar")
+        count = 0
+        # Stream results into the CSV as the grid renders, no waiting for the whole page
+        for rows in beestar.stream_results(driver):
+            sink.writerows(rows)
+            count += len(rows)
+            reporter.progress(0, 0, count)
+        finished = True
+    except TimeoutException:
+        raise RuntimeError("⏰ Results page did not load in 300 seconds")
+    finally:
+        if sink:
+            sink.close()
+        # A browser that failed mid-search may be stuck on the page, don't lend it out again
+        if finished:
+            pool.release(driver, pages=1)
+        else:
+            driver.quit()
+    return sink.rows_written
+
+
+# Every appliance x brand search on parallel browsers, merged into one CSV tagged with
+# Appliance and Brand. Failed shards are reported and skipped.
+def run_beestar_fanout(pool, reporter, filename=beestar.MERGED_FILENAME, num_workers=None, appliances=None,
+                       brands=None):
+    beestar.TIMES.reset()
+    ratelimit.for_site("beestar").reset()
+    num_workers = num_workers or default_workers()
+    shards = beestar.shards(appliances, brands)
+    merger = beestar.ShardMerger()
+    for appliance, brand in shards:
+        reporter.shard(f"{appliance} / {brand}", "⏳ queued")
+
+    sink = CsvSink(filename, beestar.MERGED_COLUMNS, site="beestar")
+    failed = 0
+    try:
+        for done, (i, shard, result) in enumerate(run_parallel(
+                shards, ratelimit.limited(beestar.scrape_shard, url_of=lambda shard: beestar.SEARCH_URL),
+                partial(pool.acquire, "beestar"),
+                num_workers=num_workers, release_driver=pool.release, after_page=pool.page_done), start=1):
+            label = f"{shard[0]} / {shard[1]}"
+            if isinstance(result, Exception):
+                failed += 1
+                reporter.shard(label, f"❌ {str(result).splitlines()[0] if str(result) else type(result).__name__}")
+            else:
+                fresh = merger.add(result)
+                sink.writerows(fresh)
+                reporter.shard(label, f"✅ {len(result)} rows, {len(result) - len(fresh)} duplicates")
+            reporter.progress(done, len(shards), len(merger.seen))
+    finally:
+        sink.close()
+    if failed:
+        reporter.warn(f"⚠️ {failed} of {len(shards)} shards failed")
+    return sink.rows_written
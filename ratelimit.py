@@ -0,0 +1,337 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import TimeoutException
+
+import timing
+
+# What a request tells its site's limiter when it finishes. None: it failed in a way that
+# says nothing about how loaded the site is (a 404, a parse error...).
+OK = "ok"
+TIMEOUT = "timeout"
+THROTTLED = "throttled"
+BLOCKED = "blocked"
+
+# Site -> (starting requests per second, starting requests in flight). Both grow from
+# there while the site keeps answering. Hosts that aren't one of the sites (e.g. the
+# benchmark's local server) get DEFAULT_LIMITS, with no rate limit, only the window.
+SITE_LIMITS = {
+    "croma": (3.0, 6),
+    "vijaysales": (3.0, 6),
+    "flipkart": (2.0, 4),
+    "beestar": (2.0, 4),
+}
+DEFAULT_LIMITS = (None, 6)
+MIN_RATE = 0.2
+MAX_RATE = 25.0
+RATE_STEP = 1.0
+MAX_CONCURRENCY = 16
+# How much the bucket can save up, in seconds at the current rate
+BURST_SECONDS = 2.0
+# How long a site is left alone after it pushed back, doubled while it keeps doing so,
+# unless it sent a Retry-After
+BACKOFF = 5.0
+MAX_BACKOFF = 120.0
+
+# Where every process keeps the sites' shared limiter state
+LIMITS_PATH = os.path.join("limits", "limits.sqlite")
+# A slot that is not given back in this long (its process died) is free again
+SLOT_LEASE = 900.0
+# How often a request waiting for a slot held by another process looks again
+POLL = 0.1
+
+# Block / challenge pages are short; longer pages are only judged by their <title>
+BLOCK_PAGE_MAX = 30000
+BLOCK_MARKERS = ("access denied", "are you a human", "verify you are human", "captcha",
+                 "pardon our interruption", "request unsuccessful", "you have been blocked",
+                 "attention required", "too many requests")
+TITLE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+HIDDEN = re.compile(r"<(script|style|noscript|template|head)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+TAG = re.compile(r"<[^>]*>")
+
+
+def is_block_title(title):
+    title = (title or "").lower()
+    return any(marker in title for marker in BLOCK_MARKERS)
+
+
+# Judged by the <title> and, for short pages, the visible text: markers inside scripts
+# (e.g. the reCAPTCHA loader on a login form) don't count
+def is_block_page(html):
+    if not html:
+        return False
+    title = TITLE.search(html[:BLOCK_PAGE_MAX])
+    if title and is_block_title(title.group(1)):
+        return True
+    return len(html) < BLOCK_PAGE_MAX and is_block_title(_visible_text(html))
+
+
+def _visible_text(html):
+    text = HIDDEN.sub(" ", html)
+    return TAG.sub(" ", text)
+
+
+# Retry-After header (seconds or an HTTP date) -> seconds, None if missing or unreadable
+def retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def response_outcome(status, html):
+    if status in (429, 503):
+        return THROTTLED
+    if status == 403 or is_block_page(html):
+        return BLOCKED
+    return OK if status < 400 else None
+
+
+# Set inside limiter.slot() to say how the request went; it is OK unless reported, or
+# TIMEOUT if a Selenium TimeoutException ends the block
+class Slot:
+    def __init__(self):
+        self.outcome = OK
+        self.retry_after = None
+
+    def report(self, outcome, retry_after=None):
+        self.outcome = outcome
+        self.retry_after = retry_after
+
+
+# Politeness for one site, shared by every fetcher that talks to it (HTTP and browsers)
+# in every process: the Streamlit server, background jobs and batch runs all keep the
+# site's state in one SQLite row, so together they stay within one limit. A token bucket
+# spaces requests out to `rate` per second, and at most `window` of them are in flight at
+# once (each holds a row in `slots`, leased for SLOT_LEASE seconds in case its process
+# dies). Both follow AIMD: each window's worth of clean responses adds one slot and
+# RATE_STEP requests per second, while a timeout, 429/503 or block page halves them and
+# pauses the site for a backoff. Requests already in flight when the site pushed back
+# count as the same event, so one burst of failures only halves things once. `rate` and
+# `concurrency` are where a site starts the first time it is seen.
+class DomainLimiter:
+    def __init__(self, site, rate, concurrency, path=None):
+        path = path or LIMITS_PATH
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.site = site
+        self.requests = 0
+        self.pushbacks = {}
+        self.cond = threading.Condition()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS limits (
+                site TEXT PRIMARY KEY,
+                rate REAL,
+                concurrency REAL NOT NULL,
+                tokens REAL NOT NULL,
+                refilled REAL NOT NULL,
+                paused_until REAL NOT NULL,
+                backoff REAL NOT NULL,
+                cut_at REAL NOT NULL,
+                clean INTEGER NOT NULL
+            )""")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS slots (
+                id INTEGER PRIMARY KEY,
+                site TEXT NOT NULL,
+                expires REAL NOT NULL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS slots_site ON slots (site, expires)")
+        self.conn.execute("INSERT OR IGNORE INTO limits VALUES (?, ?, ?, 1.0, ?, 0, ?, 0, 0)",
+                          (site, rate, float(concurrency), time.time(), BACKOFF))
+        self._load()
+
+    # Reads the shared state into rate, window, tokens...; the caller holds self.cond
+    def _load(self):
+        (self.rate, self.window, self.tokens, self.refilled, self.paused_until, self.backoff, self.cut_at,
+         self.clean) = self.conn.execute("SELECT rate, concurrency, tokens, refilled, paused_until, backoff, "
+                                         "cut_at, clean FROM limits WHERE site = ?", (self.site,)).fetchone()
+
+    # The shared state, loaded and written back in one transaction, so processes take
+    # turns at it
+    @contextmanager
+    def _shared(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._load()
+            yield
+            self.conn.execute("UPDATE limits SET rate = ?, concurrency = ?, tokens = ?, refilled = ?, "
+                              "paused_until = ?, backoff = ?, cut_at = ?, clean = ? WHERE site = ?",
+                              (self.rate, self.window, self.tokens, self.refilled, self.paused_until,
+                               self.backoff, self.cut_at, self.clean, self.site))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _refill(self, now):
+        if self.rate is not None:
+            burst = max(1.0, self.rate * BURST_SECONDS)
+            self.tokens = min(burst, self.tokens + max(0.0, now - self.refilled) * self.rate)
+        self.refilled = now
+
+    def in_flight(self):
+        with self.cond:
+            return self.conn.execute("SELECT COUNT(*) FROM slots WHERE site = ? AND expires > ?",
+                                     (self.site, time.time())).fetchone()[0]
+
+    # Blocks until the site has a free slot and a token. Returns the ticket to hand to
+    # release(): when the request started and which slot it holds.
+    def acquire(self):
+        with self.cond:
+            while True:
+                with self._shared():
+                    now = time.time()
+                    self._refill(now)
+                    in_flight = self.conn.execute("SELECT COUNT(*) FROM slots WHERE site = ? AND expires > ?",
+                                                  (self.site, now)).fetchone()[0]
+                    if now < self.paused_until:
+                        wait = self.paused_until - now
+                    elif in_flight >= int(self.window):
+                        # Released here, notify() ends the wait sooner; by another process, the poll
+                        wait = POLL
+                    elif self.rate is not None and self.tokens < 1:
+                        wait = (1 - self.tokens) / self.rate
+                    else:
+                        if self.rate is not None:
+                            self.tokens -= 1
+                        slot = self.conn.execute("INSERT INTO slots (site, expires) VALUES (?, ?)",
+                                                 (self.site, now + SLOT_LEASE)).lastrowid
+                        self.requests += 1
+                        return now, slot
+                self.cond.wait(wait)
+
+    def release(self, ticket, outcome=OK, retry_after=None):
+        started, slot = ticket
+        with self.cond:
+            with self._shared():
+                now = time.time()
+                self.conn.execute("DELETE FROM slots WHERE id = ? OR (site = ? AND expires <= ?)",
+                                  (slot, self.site, now))
+                if outcome == OK:
+                    self.backoff = BACKOFF
+                    self.clean += 1
+                    if self.clean >= int(self.window):
+                        self.clean = 0
+                        self.window = min(MAX_CONCURRENCY, self.window + 1)
+                        if self.rate is not None:
+                            self.rate = min(MAX_RATE, self.rate + RATE_STEP)
+                elif outcome is not None:
+                    self.pushbacks[outcome] = self.pushbacks.get(outcome, 0) + 1
+                    self.clean = 0
+                    if started >= self.cut_at:
+                        self.cut_at = now
+                        self.window = max(1.0, self.window / 2)
+                        if self.rate is not None:
+                            self.rate = max(MIN_RATE, self.rate / 2)
+                            self.tokens = 0.0
+                        pause = self.backoff if retry_after is None else retry_after
+                        self.paused_until = max(self.paused_until, now + min(pause, MAX_BACKOFF))
+                        self.backoff = min(MAX_BACKOFF, self.backoff * 2)
+            self.cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        ticket = self.acquire()
+        slot = Slot()
+        try:
+            yield slot
+        except TimeoutException:
+            if slot.outcome == OK:
+                slot.outcome = TIMEOUT
+            raise
+        except BaseException:
+            if slot.outcome == OK:
+                slot.outcome = None
+            raise
+        finally:
+            self.release(ticket, slot.outcome, slot.retry_after)
+
+    # Learned rate and window carry over between runs, only this process's counts start again
+    def reset(self):
+        with self.cond:
+            self.requests = 0
+            self.pushbacks = {}
+
+    def summary(self):
+        with self.cond:
+            self._load()
+            rate = "no rate limit" if self.rate is None else f"{self.rate:.1f} req/s"
+            pushbacks = ", ".join(f"{count} {outcome}" for outcome, count in sorted(self.pushbacks.items()))
+            return (f"🚦 {self.requests} requests at {rate}, up to {int(self.window)} at once"
+                    + (f" (slowed down for {pushbacks})" if pushbacks else ""))
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+# One limiter per site in each process. What a site tolerates lives in LIMITS_PATH, so it
+# is remembered between Streamlit reruns and runs, and shared with the other processes.
+def for_site(site):
+    with _limiters_lock:
+        if site not in _limiters:
+            rate, concurrency = SITE_LIMITS.get(site, DEFAULT_LIMITS)
+            _limiters[site] = DomainLimiter(site, rate, concurrency)
+        return _limiters[site]
+
+
+def for_url(url):
+    host = urlsplit(url).netloc.lower()
+    for suffix, site in timing.SITE_HOSTS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return for_site(site)
+    return for_site(host or "other")
+
+
+def _title(driver):
+    try:
+        return driver.title
+    except Exception:
+        return ""
+
+
+# Loads a page in the browser through its site's limiter, reporting a block page or a
+# load that timed out. `timer` (a PhaseTimer) times the load itself, not the wait for a slot.
+def get(driver, url, timer=None):
+    with for_url(url).slot() as slot:
+        if timer is not None:
+            with timer.span("navigation"):
+                driver.get(url)
+        else:
+            driver.get(url)
+        if is_block_title(_title(driver)):
+            slot.report(BLOCKED)
+
+
+# Wraps a browser scrape(driver, job) so every page waits for its site's limiter and
+# reports back how it went. The scrapes return None (or a (None, ...) tuple) when the
+# page never rendered: that is a block page if the title says so, a timeout otherwise.
+# url_of(job) gives the page's URL, by default the job is the URL. cached(job), if
+# given, is tried first and a result other than None is returned without a request.
+def limited(scrape, url_of=None, cached=None):
+    def run(driver, job):
+        if cached is not None:
+            result = cached(job)
+            if result is not None:
+                return result
+        with for_url(url_of(job) if url_of else job).slot() as slot:
+            result = scrape(driver, job)
+            if result is None or (isinstance(result, tuple) and result[0] is None):
+                slot.report(BLOCKED if is_block_title(_title(driver)) else TIMEOUT)
+            return result
+
+    return run
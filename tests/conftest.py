@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repo, next to app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ratelimit  # noqa: E402
+
+
+# Every test starts with fresh limiters, kept in its own temporary directory
+@pytest.fixture(autouse=True)
+def limits(tmp_path, monkeypatch):
+    monkeypatch.setattr(ratelimit, "LIMITS_PATH", str(tmp_path / "limits.sqlite"))
+    monkeypatch.setattr(ratelimit, "_limiters", {})
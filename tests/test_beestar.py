@@ -0,0 +1,53 @@
+import pytest
+
+import beestar
+
+
+def test_every_appliance_gets_a_select_all_shard_last():
+    shards = beestar.shards(["Room Air Conditioners (Fixed Speed)"], ["Select All", "LG", "VOLTAS"])
+    assert shards == [("Room Air Conditioners (Fixed Speed)", "LG"),
+                      ("Room Air Conditioners (Fixed Speed)", "VOLTAS"),
+                      ("Room Air Conditioners (Fixed Speed)", "Select All")]
+    assert len(beestar.shards()) == len(beestar.APPLIANCES) * len(beestar.BRANDS)
+
+
+def test_select_all_adds_only_brands_missing_from_the_list():
+    appliance = "Room Air Conditioners (Fixed Speed)"
+    card = ["Split", "4.1", "1.5", "850", "31/12/2026"]
+    merger = beestar.ShardMerger()
+    assert merger.add([[appliance, "LG", "LG / RS-Q19"] + card]) == [[appliance, "LG", "LG / RS-Q19"] + card]
+    fresh = merger.add([[appliance, "Select All", "LG / RS-Q19"] + card,
+                        [appliance, "Select All", "LLOYD / GLS18"] + card])
+    assert fresh == [[appliance, "Select All", "LLOYD / GLS18"] + card]
+
+
+class GridDriver:
+    def __init__(self, batches, loaded=True):
+        self.batches = list(batches)
+        self.loaded = loaded
+
+    def execute_script(self, script, *args):
+        if script == beestar.NEW_CARDS_JS:
+            return self.batches.pop(0) if self.batches else []
+        if script == beestar.LOADED_JS:
+            return self.loaded
+        return False
+
+
+def card(title):
+    return f'<div class="product-column"><div class="bg-navy-blue">{title}</div></div>'
+
+
+def test_grid_is_done_once_it_settles_on_a_loaded_page():
+    driver = GridDriver([[card("LG / A"), card("LG / B")], [], [card("LG / C")]])
+    rows = [row for batch in beestar.stream_results(driver, settle=0.05, poll=0.01, stall=5)
+            for row in batch]
+    assert [row[0] for row in rows] == ["LG / A", "LG / B", "LG / C"]
+
+
+def test_grid_that_stalls_while_loading_is_a_failure():
+    driver = GridDriver([[card("LG / A")]], loaded=False)
+    results = beestar.stream_results(driver, settle=0.01, poll=0.01, stall=0.1)
+    assert [row[0] for row in next(results)] == ["LG / A"]
+    with pytest.raises(RuntimeError, match="stopped at 1 entries"):
+        next(results)
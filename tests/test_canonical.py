@@ -0,0 +1,33 @@
+import canonical
+
+
+def test_canonical_url_drops_tracking_and_trailing_slash():
+    url = "https://WWW.Croma.com/lg-ac/p/123456/?utm_source=x&gclid=y#reviews"
+    assert canonical.canonical_url(url) == "https://www.croma.com/lg-ac/p/123456"
+
+
+def test_flipkart_keeps_pid_only():
+    url = "https://www.flipkart.com/lg-ac/p/itmabc123?pid=ACNG8&lid=LST1&marketplace=FLIPKART&srno=s_1"
+    assert canonical.canonical_url(url) == "https://www.flipkart.com/lg-ac/p/itmabc123?pid=ACNG8"
+
+
+def test_product_key_matches_url_variants():
+    a = canonical.product_key("https://www.croma.com/lg-ac/p/123456?utm_source=x")
+    b = canonical.product_key("https://www.croma.com/other-slug/p/123456/")
+    assert a == b == "croma.com:123456"
+    assert canonical.product_key("https://www.vijaysales.com/x/p/P2345") == "vijaysales.com:2345"
+    assert canonical.product_key("https://www.flipkart.com/x/p/itmabc?pid=acng8") == "flipkart.com:ACNG8"
+    assert canonical.product_key("https://www.flipkart.com/x/p/itmABC") == "flipkart.com:itmABC"
+
+
+def test_unknown_host_keys_on_path():
+    assert canonical.product_key("http://127.0.0.1:8000/croma/p/1") == "127.0.0.1:8000:/croma/p/1"
+
+
+def test_seen_index_adds_once_and_persists(tmp_path):
+    path = tmp_path / "seen.txt"
+    seen = canonical.SeenIndex(str(path))
+    assert seen.add("https://www.croma.com/a/p/1")
+    assert not seen.add("https://www.croma.com/b/p/1/?utm_source=x")
+    assert "https://www.croma.com/c/p/1" in seen
+    assert len(canonical.SeenIndex(str(path))) == 1
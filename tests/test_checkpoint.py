@@ -0,0 +1,53 @@
+import os
+
+from checkpoint import Checkpoint
+from csv_sink import CsvSink
+
+LINKS = [f"https://www.croma.com/ac/p/{n}" for n in range(5)]
+
+
+def test_paths_come_from_site_and_search(tmp_path):
+    ckpt = Checkpoint("croma", "LG  Split AC!", directory=str(tmp_path))
+    assert ckpt.path == os.path.join(str(tmp_path), "croma-lg-split-ac.json")
+    assert ckpt.done_path.endswith("croma-lg-split-ac.done")
+    assert Checkpoint("croma", "", directory=str(tmp_path)).path.endswith("croma-all.json")
+
+
+def test_links_and_listing_round_trip(tmp_path):
+    ckpt = Checkpoint("croma", "ac", directory=str(tmp_path))
+    ckpt.begin()
+    assert not ckpt.exists()
+    ckpt.save_links(LINKS, {LINKS[0]: {"Title": "LG 1.5 Ton"}})
+    assert ckpt.exists()
+    assert ckpt.load() == (LINKS, set())
+    assert ckpt.load_listing() == {LINKS[0]: {"Title": "LG 1.5 Ton"}}
+
+
+def test_only_flushed_rows_count_as_done(tmp_path):
+    ckpt = Checkpoint("croma", "ac", directory=str(tmp_path))
+    ckpt.begin()
+    ckpt.save_links(LINKS)
+    sink = CsvSink(str(tmp_path / "out.csv"), ["Title", "Link"], batch_size=100,
+                   flush_interval=60, on_flush=ckpt.flushed)
+    sink.writerows([["a", LINKS[0]], ["b", LINKS[2]]])
+    assert ckpt.done_links() == set()
+    sink.close()
+
+    # What a resumed run sees after the interruption
+    links, done = Checkpoint("croma", "ac", directory=str(tmp_path)).load()
+    assert links == LINKS
+    assert done == {LINKS[0], LINKS[2]}
+    assert [link for link in links if link not in done] == [LINKS[1], LINKS[3], LINKS[4]]
+
+
+def test_begin_forgets_the_last_run(tmp_path):
+    ckpt = Checkpoint("croma", "ac", directory=str(tmp_path))
+    ckpt.begin()
+    ckpt.save_links(LINKS)
+    ckpt.flushed([["a", LINKS[0]]])
+    ckpt.begin()
+    assert not ckpt.exists()
+    assert ckpt.done_links() == set()
+    ckpt.clear()
+    assert not os.path.exists(ckpt.done_path)
+    assert ckpt.done_links() == set()
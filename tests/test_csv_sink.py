@@ -0,0 +1,69 @@
+import csv
+import time
+
+import pytest
+
+from csv_sink import CsvSink
+
+
+def read(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def test_rows_are_written_in_order_with_the_header(tmp_path):
+    path = tmp_path / "out.csv"
+    with CsvSink(str(path), ["Title", "Link"], batch_size=3) as sink:
+        for n in range(10):
+            sink.write([f"t{n}", f"l{n}"])
+    assert read(path) == [["Title", "Link"]] + [[f"t{n}", f"l{n}"] for n in range(10)]
+    assert sink.rows_written == 10
+
+
+def test_full_batches_are_flushed_before_close(tmp_path):
+    flushed = []
+    sink = CsvSink(str(tmp_path / "out.csv"), ["Title"], batch_size=2,
+                   flush_interval=60, on_flush=flushed.append)
+    sink.writerows([["a"], ["b"]])
+    deadline = time.time() + 5
+    while not flushed and time.time() < deadline:
+        time.sleep(0.01)
+    assert flushed == [[["a"], ["b"]]]
+    assert read(tmp_path / "out.csv") == [["Title"], ["a"], ["b"]]
+    sink.close()
+
+
+def test_partial_batch_is_flushed_after_the_interval(tmp_path):
+    flushed = []
+    sink = CsvSink(str(tmp_path / "out.csv"), batch_size=100,
+                   flush_interval=0.05, on_flush=flushed.append)
+    sink.write(["a"])
+    deadline = time.time() + 5
+    while not flushed and time.time() < deadline:
+        time.sleep(0.01)
+    assert flushed == [[["a"]]]
+    sink.close()
+
+
+def test_append_keeps_the_old_rows_and_skips_the_header(tmp_path):
+    path = str(tmp_path / "out.csv")
+    with CsvSink(path, ["Title"]) as sink:
+        sink.write(["a"])
+    with CsvSink(path, ["Title"], append=True) as sink:
+        sink.write(["b"])
+    assert read(path) == [["Title"], ["a"], ["b"]]
+
+
+def test_writer_error_is_raised_to_the_caller(tmp_path):
+    def broken(rows):
+        raise OSError("disk full")
+
+    sink = CsvSink(str(tmp_path / "out.csv"), batch_size=1, on_flush=broken)
+    sink.write(["a"])
+    deadline = time.time() + 5
+    while sink.error is None and time.time() < deadline:
+        time.sleep(0.01)
+    with pytest.raises(OSError, match="disk full"):
+        sink.write(["b"])
+    with pytest.raises(OSError, match="disk full"):
+        sink.close()
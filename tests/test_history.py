@@ -0,0 +1,65 @@
+import pytest
+
+import history
+import netlog
+
+COLUMNS = ["Title", "Brand", "Price", "Review", "No of Reviews", "Product Link"]
+FIELDS = {0: "title", 2: "price", 3: "rating", 4: "reviews"}
+URL = "https://www.croma.com/lg-ac/p/123456"
+
+
+@pytest.fixture
+def prices(tmp_path):
+    store = history.PriceHistory(str(tmp_path / "prices.sqlite"))
+    yield store
+    store.conn.close()
+
+
+def full_row(price="₹45,990"):
+    return ["LG 1.5 Ton AC", "LG", price, "4.3", "120", URL]
+
+
+def test_number():
+    assert history.number("₹34,990.00") == 34990.0
+    assert history.number("4.3 ★") == 4.3
+    assert history.number("NA") is None
+    assert history.number(None) is None
+
+
+def test_unchanged_listing_reuses_the_row(prices):
+    prices.record("croma", [full_row()], FIELDS)
+    record = {"title": "LG 1.5 Ton AC", "price": "45990", "rating": "4.3", "reviews": "120"}
+    assert prices.unchanged_row("croma", URL + "?utm_source=x", record) == full_row()
+    assert prices.reused == 1
+
+
+def test_changed_price_or_new_product_is_scraped(prices):
+    prices.record("croma", [full_row()], FIELDS)
+    assert prices.unchanged_row("croma", URL, {"price": "₹42,990", "rating": "4.3"}) is None
+    assert prices.unchanged_row("croma", URL, {"price": "₹45,990", "reviews": "121"}) is None
+    assert prices.unchanged_row("croma", URL, {"rating": "4.3"}) is None
+    assert prices.unchanged_row("croma", URL, None) is None
+    assert prices.unchanged_row("vijaysales", URL, {"price": "₹45,990"}) is None
+    assert prices.reused == 0
+
+
+def test_missing_listing_values_are_not_compared(prices):
+    prices.record("croma", [full_row()], FIELDS)
+    assert prices.unchanged_row("croma", URL, {"price": "₹45,990", "rating": None}) == full_row()
+
+
+def test_price_changes(prices):
+    prices.record("croma", [full_row()], FIELDS)
+    prices.record("croma", [full_row("₹42,990")], FIELDS)
+    other = ["Voltas AC", "Voltas", "₹30,000", "4.0", "10", "https://www.croma.com/voltas-ac/p/654321"]
+    prices.record("croma", [other, other], FIELDS)
+    assert prices.price_changes("croma") == [("123456", "LG 1.5 Ton AC", 45990.0, 42990.0)]
+
+
+def test_listing_only_row_keeps_the_full_row(prices):
+    prices.record("croma", [full_row()], FIELDS)
+    light = netlog.listing_row(COLUMNS, FIELDS, {"title": "LG 1.5 Ton AC", "price": "₹42,990"}, URL)
+    prices.record("croma", [light], FIELDS)
+    assert prices.last_row("croma", URL) == full_row()
+    assert prices.unchanged_row("croma", URL, {"price": "₹42,990"}) == full_row()
+    assert [price for _, price, _, _ in prices.trend("croma", URL)] == [45990.0, 42990.0]
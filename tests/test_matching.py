@@ -0,0 +1,121 @@
+import pandas as pd
+import pytest
+
+import matching
+
+
+def frame(rows):
+    return pd.DataFrame(rows)
+
+
+FRAMES = {
+    "croma": frame([
+        {"Title": "Daikin 1.5 Ton 5 Star Split AC", "Brand": "DAIKIN", "Model No": "FTKM50UV16V",
+         "Tons": 1.5, "Stars": 5, "Price (₹)": 45990.0, "Product Link": "https://www.croma.com/a/p/1"},
+        {"Title": "LG 1 Ton 3 Star Split AC", "Brand": "LG", "Model No": "RS-Q13ENXE",
+         "Tons": 1.0, "Stars": 3, "Price (₹)": 31990.0, "Product Link": "https://www.croma.com/b/p/2"},
+    ]),
+    "vijaysales": frame([
+        {"Title": "Daikin Split AC", "Brand": "Daikin", "Model No": "FTKM50UV16V",
+         "Tons": 1.5, "Stars": 5, "Price (₹)": 44990.0, "Product Link": "https://www.vijaysales.com/a/p/P1"},
+        {"Title": "Daikin Split AC", "Brand": "Daikin", "Model No": "FTKM60UV16V",
+         "Tons": 1.8, "Stars": 5, "Price (₹)": 52990.0, "Product Link": "https://www.vijaysales.com/b/p/P2"},
+    ]),
+    "beestar": frame([
+        {"Title": "DAIKIN / FTKM50UV16V", "Brand": "DAIKIN", "Tons": 1.5, "Stars": 5,
+         "ISEER": 5.2, "kWh/year": 780.0},
+    ]),
+}
+
+
+def test_same_model_is_joined_across_sites():
+    table = matching.match(FRAMES)
+    daikin = table[table["Model"] == "FTKM50UV16V"].iloc[0]
+    assert daikin["Sites"] == 3
+    assert daikin["Croma Price (₹)"] == 45990
+    assert daikin["Vijaysales Price (₹)"] == 44990
+    assert daikin["Lowest Price (₹)"] == 44990
+    assert daikin["BEE ISEER"] == 5.2
+    assert table.iloc[0]["Model"] == "FTKM50UV16V"
+
+
+def test_neighbouring_model_is_not_swallowed():
+    table = matching.match(FRAMES)
+    assert "FTKM60UV16V" not in set(table["Model"])
+    assert len(table) == 1
+
+
+def test_tonnage_mismatch_is_penalised():
+    a = {"tokens": ["FTKM50UV16V"], "tons": 1.5, "stars": 5}
+    assert matching.score(a, dict(a)) == 1.0
+    assert matching.score(a, dict(a, tons=2.0)) < matching.score(a, dict(a, tons=None))
+
+
+def test_model_tokens():
+    tokens = matching.model_tokens(pd.Series(["Daikin 1.5 Ton 5 Star FTKM50UV16V", "LG 5STAR 1.5TON", None]))
+    assert tokens[0] == ["FTKM50UV16V"]
+    assert "5STAR" not in tokens[1] and "5TON" not in tokens[1]
+    assert tokens[2] == []
+    assert "FTKM50UV16V" in matching.model_tokens(pd.Series(["FTKM 50 UV16V"]))[0]
+
+
+def test_brand_keys():
+    keys = matching.brand_keys(pd.Series(["O General", "Fujitsu General", "Blue Star"]))
+    assert keys.tolist() == ["GENERAL", "GENERAL", "BLUESTAR"]
+
+
+def test_no_matches():
+    assert matching.match({"croma": FRAMES["croma"].iloc[:1]}).empty
+
+
+def test_mutual_best_keeps_one_row_per_site():
+    croma = frame([
+        {"Brand": "DAIKIN", "Model No": "FTKM50UV16V", "Tons": 1.5, "Stars": 5, "Price (₹)": 45990.0},
+        {"Brand": "DAIKIN", "Model No": "FTKM50UV16W", "Tons": 1.5, "Stars": 5, "Price (₹)": 46990.0},
+    ])
+    vijaysales = frame([{"Brand": "DAIKIN", "Model No": "FTKM50UV16V", "Tons": 1.5, "Stars": 5,
+                         "Price (₹)": 44990.0}])
+    table = matching.match({"croma": croma, "vijaysales": vijaysales})
+    assert len(table) == 1
+    assert table.iloc[0]["Croma Price (₹)"] == 45990
+
+
+def test_other_brand_is_never_compared():
+    croma = frame([{"Brand": "LG", "Model No": "FTKM50UV16V", "Tons": 1.5, "Stars": 5, "Price (₹)": 1.0}])
+    assert matching.match({"croma": croma, "vijaysales": FRAMES["vijaysales"]}).empty
+
+
+def test_blocks_group_brand_and_model_prefix():
+    records = pd.concat([matching.records(site, df) for site, df in FRAMES.items()], ignore_index=True)
+    blocks = matching.build_blocks(records)
+    assert set(blocks) == {("DAIKIN", "FTKM50")}
+    assert len(blocks[("DAIKIN", "FTKM50")]) == 3
+
+
+def test_match_files_cleans_the_raw_csvs(tmp_path):
+    croma_csv = tmp_path / "croma.csv"
+    pd.DataFrame([{
+        "Title": "Daikin 1.5 Ton 5 Star Inverter Split AC (FTKM50UV16V)", "Brand": "Daikin",
+        "Model No": "FTKM50UV16V", "Capacity": "1.5 Ton", "BEE Star": "5 Star", "ISEER": "5.2",
+        "Price": "₹45,990", "Review": "4.3", "No of Reviews": "(120)", "Cooling": "NA", "Air Flow": "NA",
+        "Product Link": "https://www.croma.com/a/p/1",
+    }]).to_csv(croma_csv, index=False)
+    flipkart_csv = tmp_path / "flipkart.csv"
+    pd.DataFrame([{
+        "Title": "Daikin 2024 Model 1.5 Ton 5 Star Split Inverter AC - White (FTKM50UV16V, Copper Condenser)",
+        "Price": "₹ 44,490 ₹ 67,400", "Star Rating": "4.2", "Num Reviews": "1,234 Ratings & 120 Reviews",
+        "Product Link": "https://www.flipkart.com/a/p/itm1?pid=ACNG1",
+    }]).to_csv(flipkart_csv, index=False)
+
+    table = matching.match_files({"croma": str(croma_csv), "flipkart": str(flipkart_csv),
+                                  "beestar": str(tmp_path / "missing.csv")})
+    assert len(table) == 1
+    row = table.iloc[0]
+    assert row["Model"] == "FTKM50UV16V"
+    assert row["Flipkart Price (₹)"] == 44490
+    assert row["Lowest Price (₹)"] == 44490
+
+
+def test_match_files_needs_two_sites(tmp_path):
+    with pytest.raises(ValueError):
+        matching.match_files({"croma": str(tmp_path / "missing.csv")})
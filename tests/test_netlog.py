@@ -0,0 +1,19 @@
+import netlog
+
+COLUMNS = ["Title", "Brand", "Price", "Review", "No of Reviews", "Product Link"]
+FIELDS = {0: "title", 2: "price", 3: "rating", 4: "reviews"}
+URL = "https://www.croma.com/lg-ac/p/123456"
+FULL_ROW = ["LG 1.5 Ton AC", "LG", "₹45,990", "4.3", "120", URL]
+
+
+def test_listing_row_clears_the_base_rows_listing_cells():
+    record = {"title": "LG 1.5 Ton AC", "price": "₹42,990", "rating": None}
+    row = netlog.listing_row(COLUMNS, FIELDS, record, URL, base=FULL_ROW)
+    assert row == ["LG 1.5 Ton AC", "LG", "₹42,990", "NA", "NA", URL]
+    assert FULL_ROW[2] == "₹45,990"
+
+
+def test_listing_row_without_a_base_row():
+    record = {"title": "LG 1.5 Ton AC", "price": 42990, "rating": 4.1, "reviews": ""}
+    assert netlog.listing_row(COLUMNS, FIELDS, record, URL) == ["LG 1.5 Ton AC", "NA", "42990", "4.1", "NA", URL]
+
@@ -0,0 +1,81 @@
+import math
+
+import pandas as pd
+
+import normalize
+
+
+def values(series):
+    return [None if pd.isna(value) else value for value in series.tolist()]
+
+
+def test_price_takes_the_first_number():
+    prices = normalize.price(pd.Series(["₹45,990", "₹ 34,990 ₹ 59,990", "Rs. 45,990", "₹45,990.50", "NA", ""]))
+    assert values(prices) == [45990, 34990, 45990, 45990.5, None, None]
+
+
+def test_decimal_and_count():
+    assert values(normalize.decimal(pd.Series(["4.3", "4.65 ISEER", "NA"]))) == [
+        pd.Series([4.3], dtype="float32")[0], pd.Series([4.65], dtype="float32")[0], None]
+    assert values(normalize.count(pd.Series(["(1,234)", "1,234 Ratings & 120 Reviews", "NA"]))) == [1234, 1234, None]
+
+
+def test_tons_from_tag_watts_or_bare_number():
+    tons = normalize.tons(pd.Series(["1.5 Ton", "LG 2 T Split AC", "5100 W", "1.5", "12", "NA"]))
+    assert values(tons) == [1.5, 2.0, 1.5, 1.5, None, None]
+
+
+def test_stars():
+    assert values(normalize.stars(pd.Series(["5 Star", "LG 3-Star AC", "4", "4.0", "7", ""]))) == [5, 3, 4, 4, None, None]
+
+
+def test_brand_from_title_uses_aliases():
+    brands = normalize.brand(pd.Series(["Blue Star 1.5 Ton AC", "LG 1 Ton AC", "O-General 2 Ton"]), from_title=True)
+    assert values(brands.astype("string")) == ["BLUE STAR", "LG", "O GENERAL"]
+
+
+def test_normalize_adds_typed_columns():
+    raw = pd.DataFrame({
+        "Title": ["LG AC"], "Brand": ["LG"], "Capacity": ["1.5 Ton"], "BEE Star": ["5 Star"],
+        "ISEER": ["4.65"], "Price": ["₹45,990"], "Review": ["4.3"], "No of Reviews": ["(120)"],
+    })
+    df = normalize.normalize("croma", raw)
+    assert df["Price (₹)"][0] == 45990
+    assert df["Tons"][0] == 1.5
+    assert df["Stars"][0] == 5
+    assert math.isclose(df["ISEER"][0], 4.65, rel_tol=1e-6)
+    assert df["Reviews"][0] == 120
+    assert df["Price"][0] == "₹45,990"
+
+
+def test_clean_filename():
+    assert normalize.clean_filename("runs/Croma_Data.csv") == "runs/Croma_Data_Clean.csv"
+
+
+def test_cleaned_reads_the_file_back_with_its_dtypes(tmp_path):
+    filename = tmp_path / "croma.csv"
+    pd.DataFrame({
+        "Title": ["LG AC", "Voltas AC"], "Brand": ["LG", "NA"], "Capacity": ["1.5 Ton", "NA"],
+        "BEE Star": ["5 Star", ""], "ISEER": ["4.65", "NA"], "Price": ["₹45,990", "₹30,000"],
+        "Review": ["4.3", "NA"], "No of Reviews": ["(120)", "NA"], "Product Link": ["a", "b"],
+    }).to_csv(filename, index=False)
+    fresh, out = normalize.cleaned("croma", str(filename))
+    again, same = normalize.cleaned("croma", str(filename))
+    assert same == out
+    assert again.dtypes.to_dict() == fresh.dtypes.to_dict()
+    assert again["Price"].tolist() == fresh["Price"].tolist()
+    assert values(again["Stars"]) == [5, None]
+    assert values(again["Brand"].astype("string")) == ["LG", None]
+
+
+def test_cleaned_bee_file_keeps_dates_and_categories(tmp_path):
+    filename = tmp_path / "bee.csv"
+    pd.DataFrame({
+        "Appliance": ["Room Air Conditioners (Fixed Speed)"], "Brand": ["DAIKIN"], "Title": ["DAIKIN / FTL50"],
+        "Type": ["Split"], "ISEER": ["3.9"], "Ton": ["1.5"], "Electricity Consumption (kWh/year)": ["1016.5"],
+        "Valid Till Date": ["31/12/2027"],
+    }).to_csv(filename, index=False)
+    fresh, _ = normalize.cleaned("beestar", str(filename))
+    again, _ = normalize.cleaned("beestar", str(filename))
+    assert again.dtypes.to_dict() == fresh.dtypes.to_dict()
+    assert again["Valid Till Date"][0] == pd.Timestamp(2027, 12, 31)
@@ -0,0 +1,56 @@
+import time
+
+import page_cache
+from page_cache import PageCache
+
+URL = "https://www.croma.com/lg-ac/p/123456"
+
+
+def age(cache, url, seconds):
+    cache.conn.execute("UPDATE pages SET fetched_at = ?, used_at = ? WHERE url = ?",
+                       (time.time() - seconds, time.time() - seconds, url))
+    cache.conn.commit()
+
+
+def test_fresh_page_is_returned_under_its_canonical_url(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    cache.put(URL + "?utm_source=x", "<html>LG</html>")
+    assert cache.get(URL + "/") == "<html>LG</html>"
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_ttl_per_field_class(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    cache.put(URL, "<html>LG</html>")
+    age(cache, URL, page_cache.TTL["price"] + 60)
+    assert cache.get(URL, "price") is None
+    assert cache.get(URL, "specs") == "<html>LG</html>"
+    assert cache.lookup(URL, count=False) == ("<html>LG</html>", {"specs"})
+    age(cache, URL, page_cache.TTL["specs"] + 60)
+    assert cache.lookup(URL) == (None, set())
+    assert cache.misses == 3
+
+
+def test_least_recently_used_pages_are_evicted(tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite"), max_bytes=10 ** 9)
+    pages = {f"https://www.croma.com/ac/p/{n}": f"<html>{n} {'x' * 50}</html>" for n in range(4)}
+    for n, (url, html) in enumerate(pages.items()):
+        cache.put(url, html)
+        age(cache, url, 100 - n)
+    urls = list(pages)
+    # Reading page 0 makes it the most recently used
+    assert cache.get(urls[0]) is not None
+    sizes = dict(cache.conn.execute("SELECT url, size FROM pages").fetchall())
+    cache.max_bytes = cache.total_bytes - sizes[urls[1]] - sizes[urls[2]] + 1
+    cache.put(urls[3], pages[urls[3]])
+    kept = {url for url, in cache.conn.execute("SELECT url FROM pages")}
+    assert kept == {urls[0], urls[3]}
+    assert cache.total_bytes <= cache.max_bytes
+
+
+def test_size_survives_reopening(tmp_path):
+    path = str(tmp_path / "pages.sqlite")
+    cache = PageCache(path)
+    cache.put(URL, "<html>LG</html>")
+    cache.put(URL, "<html>LG 1.5 Ton</html>")
+    assert PageCache(path).total_bytes == cache.total_bytes
@@ -0,0 +1,282 @@
+import csv
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import croma
+import pipelines
+import ratelimit
+from page_cache import PageCache
+from checkpoint import Checkpoint
+
+LINKS = 30
+
+
+class FakeDriver:
+    title = "Croma"
+
+    def quit(self):
+        pass
+
+
+class FakePool:
+    def acquire(self, site=None):
+        return FakeDriver()
+
+    def release(self, driver, pages=0):
+        pass
+
+    def page_done(self, driver):
+        pass
+
+
+class QuietReporter(pipelines.Reporter):
+    def __init__(self):
+        super().__init__()
+        self.warnings = []
+
+    def note(self, message):
+        pass
+
+    def warn(self, message):
+        self.warnings.append(message)
+
+
+def product_url(n):
+    return f"https://www.croma.com/ac/p/{n}"
+
+
+@pytest.fixture
+def fake_croma(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ratelimit, "BACKOFF", 0.0)
+    monkeypatch.setitem(ratelimit._limiters, "croma", ratelimit.DomainLimiter("croma", None, 16))
+    scraped = []
+    specs_pages = {}
+
+    def iter_links(driver, search_for, listing):
+        for n in range(LINKS):
+            yield product_url(n)
+
+    # Later pages finish first, page 5 fails and page 7 has no row
+    def scrape_product(driver, link, cache=None, specs_page=None):
+        n = int(link.rsplit("/", 1)[1])
+        time.sleep(0.002 * (LINKS - n))
+        scraped.append(n)
+        specs_pages[n] = specs_page
+        if n == 5:
+            raise RuntimeError("boom")
+        if n == 7:
+            return None, []
+        return [f"AC {n}"] + ["NA"] * (len(croma.COLUMNS) - 2) + [link], []
+
+    monkeypatch.setattr(croma, "iter_links", iter_links)
+    monkeypatch.setattr(croma, "scrape_product", scrape_product)
+    return SimpleNamespace(scraped=scraped, specs_pages=specs_pages)
+
+
+def product_page(n):
+    return (f"<html><body><h1 class='pd-title pd-title-normal'>Cached AC {n}</h1>"
+            f"<div id='pdp-product-price'><span>₹45,990</span></div>"
+            f"<ul><li class='cp-specification-spec-title'><h4>Brand</h4></li>"
+            f"<li class='cp-specification-spec-details'>LG</li></ul></body></html>")
+
+
+def titles(filename):
+    with open(filename, newline="", encoding="utf-8") as f:
+        return [row[0] for row in list(csv.reader(f))[1:]]
+
+
+def test_keep_order_writes_rows_in_listing_order(fake_croma, monkeypatch):
+    written = []
+    write = pipelines.CsvSink.write
+
+    def spy(sink, row):
+        written.append((row[0], len(fake_croma.scraped)))
+        write(sink, row)
+
+    monkeypatch.setattr(pipelines.CsvSink, "write", spy)
+    reporter = QuietReporter()
+    count = pipelines.run_croma("ac", FakePool(), reporter, filename="out.csv", num_workers=4, keep_order=True)
+
+    expected = [f"AC {n}" for n in range(LINKS) if n not in (5, 7)]
+    assert count == len(expected)
+    assert titles("out.csv") == expected
+    assert [title for title, _ in written] == expected
+    # The finished prefix goes out while later pages are still being scraped
+    assert written[0][1] < LINKS
+    assert len(reporter.warnings) == 1
+
+
+def test_without_keep_order_every_row_is_written(fake_croma):
+    count = pipelines.run_croma("ac", FakePool(), QuietReporter(), filename="out.csv", num_workers=4)
+    assert count == LINKS - 2
+    assert sorted(titles("out.csv")) == sorted(f"AC {n}" for n in range(LINKS) if n not in (5, 7))
+
+
+def test_resumed_light_crawl_builds_rows_from_the_saved_cards(fake_croma, monkeypatch):
+    links = [product_url(n) for n in range(LINKS)]
+    ckpt = Checkpoint("croma", "ac")
+    ckpt.begin()
+    ckpt.save_links(links, {link: {"title": f"AC {n}", "price": f"₹{30000 + n}"} for n, link in enumerate(links)})
+    ckpt.flushed([["AC 0", links[0]]])
+
+    def no_discovery(driver, search_for, listing):
+        raise AssertionError("discovery ran again")
+        yield
+
+    monkeypatch.setattr(croma, "iter_links", no_discovery)
+    count = pipelines.run_croma("ac", FakePool(), QuietReporter(), filename="out.csv", resume=True, light=True)
+    assert count == LINKS - 1
+    assert fake_croma.scraped == []
+    with open("out.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["AC 1"] + ["NA"] * 5 + ["₹30001"] + ["NA"] * 4 + [links[1]]
+
+
+def test_closing_merged_results_stops_discovery_and_scrape(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    found = []
+    scraped = []
+
+    def discover():
+        for n in range(200):
+            found.append(n)
+            yield product_url(n)
+
+    def scrape(driver, link):
+        time.sleep(0.005)
+        scraped.append(link)
+        return [link], []
+
+    ckpt = Checkpoint("croma", "stop")
+    ckpt.begin()
+    pending = pipelines._Pending(discover(), set(), None, ckpt)
+    merged = pending.merge(pipelines.run_parallel(pending, scrape, FakeDriver, num_workers=2, queue_size=4))
+    for n, _ in enumerate(merged):
+        if n == 3:
+            break
+    pending.close()
+    time.sleep(1)
+    assert len(scraped) < 20
+    assert len(found) < 40
+    assert not ckpt.exists()
+
+
+def test_pending_merges_reused_rows_and_skips_repeats(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    links = [product_url(1), product_url(2) + "?utm_source=x", product_url(2), product_url(3)]
+    ckpt = Checkpoint("croma", "merge")
+    ckpt.begin()
+    pending = pipelines._Pending(iter(links), {product_url(3)}, None, ckpt,
+                                 reuse=lambda link: ["reused", link] if link.endswith("/1") else None)
+    results = pipelines.run_parallel(pending, lambda driver, link: (["scraped", link], []), FakeDriver)
+    rows = sorted(result[0] for _, _, result in pending.merge(results))
+    assert rows == [["reused", product_url(1)], ["scraped", product_url(2)]]
+    assert pending.order == {product_url(1): 0, product_url(2): 1}
+    assert ckpt.load()[0] == [product_url(1), product_url(2), product_url(3)]
+
+
+def test_each_product_is_looked_up_in_the_cache_once(fake_croma, tmp_path):
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    cache.put(product_url(1), product_page(1))
+    cache.put(product_url(2), product_page(2))
+    # Page 2 is too old for its price but its specs are still good
+    cache.conn.execute("UPDATE pages SET fetched_at = fetched_at - 3 * 3600 WHERE url = ?", (product_url(2),))
+    cache.conn.commit()
+
+    pipelines.run_croma("ac", FakePool(), QuietReporter(), filename="out.csv", num_workers=4, cache=cache)
+    assert (cache.hits, cache.misses) == (1, LINKS - 1)
+    assert 1 not in fake_croma.scraped
+    assert "Cached AC 1" in titles("out.csv")
+    assert "Cached AC 2" in fake_croma.specs_pages[2]
+    assert fake_croma.specs_pages[3] is None
+
+
+def test_fast_path_looks_the_price_up_once(fake_croma, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipelines.http_fetch, "fetch", lambda url, timeout=15: None)
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    cache.put(product_url(2), product_page(2))
+    cache.conn.execute("UPDATE pages SET fetched_at = fetched_at - 3 * 3600")
+    cache.conn.commit()
+
+    pipelines.run_croma("ac", FakePool(), QuietReporter(), filename="out.csv", num_workers=4, fast_path=True,
+                        cache=cache)
+    assert (cache.hits, cache.misses) == (0, LINKS)
+    assert len(fake_croma.scraped) == LINKS
+    assert "Cached AC 2" in fake_croma.specs_pages[2]
+
+
+def test_beestar_browser_is_quit_when_the_search_fails(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    quit = []
+    released = []
+
+    class BeeDriver(FakeDriver):
+        def get(self, url):
+            pass
+
+        def quit(self):
+            quit.append(self)
+
+    class BeePool(FakePool):
+        def acquire(self, site=None):
+            return BeeDriver()
+
+        def release(self, driver, pages=0):
+            released.append(driver)
+
+    def broken(driver):
+        yield [["LG / A", "Split", "4.1", "1.5", "850", "31/12/2026"]]
+        raise ValueError("stale element")
+
+    monkeypatch.setattr(pipelines.beestar, "submit_search", lambda driver, appliance, brand: None)
+    monkeypatch.setattr(pipelines.beestar, "stream_results", broken)
+    with pytest.raises(ValueError):
+        pipelines.run_beestar("Room Air Conditioners (Fixed Speed)", "LG", BeePool(), QuietReporter(),
+                              filename="bee.csv")
+    assert len(quit) == 1 and not released
+
+
+def test_flipkart_first_page_is_loaded_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(ratelimit._limiters, "flipkart", ratelimit.DomainLimiter("flipkart", None, 16))
+    loaded = []
+
+    class Element:
+        def is_displayed(self):
+            return True
+
+        def is_enabled(self):
+            return True
+
+        def click(self):
+            pass
+
+    class ListingDriver(FakeDriver):
+        title = "Flipkart"
+        current_url = None
+
+        def get(self, url):
+            loaded.append(url)
+            self.current_url = url
+
+        def find_element(self, by, selector):
+            return Element()
+
+        @property
+        def page_source(self):
+            page = self.current_url.rsplit("=", 1)[1]
+            return (f'<div class="tUxRFH"><div class="KzDlHZ">LG AC {page}</div>'
+                    f'<a class="CGtC98" href="/lg-ac/p/itm{page}?pid=AC{page}"></a></div>'
+                    '<div class="_1G0WLw"><span>Page 1 of 2</span></div>')
+
+    class ListingPool(FakePool):
+        def acquire(self, site=None):
+            return ListingDriver()
+
+    rows = pipelines.run_flipkart("lg ac", ListingPool(), QuietReporter(), filename="flipkart.csv",
+                                  num_workers=1)
+    assert rows == 2
+    assert loaded == [pipelines.flipkart.search_url("lg ac", 1), pipelines.flipkart.search_url("lg ac", 2)]
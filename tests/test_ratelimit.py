@@ -0,0 +1,162 @@
+import threading
+import time
+
+import pytest
+
+import ratelimit
+
+
+def finish(limiter, outcome, count=1, retry_after=None):
+    for _ in range(count):
+        limiter.release(limiter.acquire(), outcome, retry_after)
+
+
+def test_clean_window_grows_window_and_rate():
+    limiter = ratelimit.DomainLimiter("test", 10.0, 4)
+    finish(limiter, ratelimit.OK, 3)
+    assert limiter.window == 4
+    finish(limiter, ratelimit.OK)
+    assert limiter.window == 5
+    assert limiter.rate == 10.0 + ratelimit.RATE_STEP
+
+
+def test_pushback_halves_and_pauses():
+    limiter = ratelimit.DomainLimiter("test", 8.0, 8)
+    finish(limiter, ratelimit.THROTTLED)
+    assert limiter.window == 4
+    assert limiter.rate == 4.0
+    assert limiter.paused_until > time.time() + ratelimit.BACKOFF - 1
+    assert limiter.backoff == ratelimit.BACKOFF * 2
+    assert limiter.pushbacks == {ratelimit.THROTTLED: 1}
+
+
+def test_retry_after_replaces_the_backoff():
+    limiter = ratelimit.DomainLimiter("test", None, 4)
+    finish(limiter, ratelimit.THROTTLED, retry_after=0)
+    assert limiter.paused_until <= time.time()
+    assert limiter.window == 2
+
+
+def test_burst_of_failures_cuts_once():
+    limiter = ratelimit.DomainLimiter("test", None, 8)
+    tickets = [limiter.acquire() for _ in range(4)]
+    for ticket in tickets:
+        limiter.release(ticket, ratelimit.TIMEOUT, retry_after=0)
+    assert limiter.window == 4
+    assert limiter.pushbacks == {ratelimit.TIMEOUT: 4}
+
+
+def test_unrelated_errors_leave_the_limits_alone():
+    limiter = ratelimit.DomainLimiter("test", 5.0, 4)
+    finish(limiter, None)
+    assert (limiter.window, limiter.rate, limiter.clean) == (4, 5.0, 0)
+
+
+def test_window_floor_and_ceiling():
+    limiter = ratelimit.DomainLimiter("floor", None, 1)
+    finish(limiter, ratelimit.BLOCKED, retry_after=0)
+    assert limiter.window == 1
+    limiter = ratelimit.DomainLimiter("ceiling", None, ratelimit.MAX_CONCURRENCY)
+    finish(limiter, ratelimit.OK, ratelimit.MAX_CONCURRENCY)
+    assert limiter.window == ratelimit.MAX_CONCURRENCY
+
+
+def test_token_bucket_spaces_requests():
+    limiter = ratelimit.DomainLimiter("test", 20.0, 16)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - started >= 0.2
+
+
+def test_slot_reports_exceptions():
+    limiter = ratelimit.DomainLimiter("test", None, 4)
+    with pytest.raises(ValueError):
+        with limiter.slot():
+            raise ValueError()
+    with pytest.raises(ratelimit.TimeoutException):
+        with limiter.slot():
+            raise ratelimit.TimeoutException()
+    assert limiter.in_flight() == 0
+    assert limiter.pushbacks == {ratelimit.TIMEOUT: 1}
+
+
+def test_limited_skips_the_limiter_on_a_cache_hit():
+    limiter = ratelimit.for_site("localhost:1")
+    limiter.reset()
+    run = ratelimit.limited(lambda driver, url: ("scraped", []), cached=lambda url: ("cached", []))
+    assert run(None, "http://localhost:1/p/1") == ("cached", [])
+    assert limiter.requests == 0
+
+
+def test_response_outcome():
+    assert ratelimit.response_outcome(200, "<html><title>LG AC</title></html>") == ratelimit.OK
+    assert ratelimit.response_outcome(429, "") == ratelimit.THROTTLED
+    assert ratelimit.response_outcome(503, "") == ratelimit.THROTTLED
+    assert ratelimit.response_outcome(403, "") == ratelimit.BLOCKED
+    assert ratelimit.response_outcome(404, "") is None
+
+
+def test_block_page_needs_the_marker_in_title_or_visible_text():
+    assert ratelimit.is_block_page("<html><head><title>Access Denied</title></head></html>")
+    assert ratelimit.is_block_page("<html><body><h1>Are you a human?</h1></body></html>")
+    login = ("<html><head><script src='https://www.google.com/recaptcha/api.js'></script></head>"
+             "<body><form>Sign in</form><script>grecaptcha.render('captcha')</script></body></html>")
+    assert not ratelimit.is_block_page(login)
+    long_page = "<html><title>LG AC</title><body>" + "x" * ratelimit.BLOCK_PAGE_MAX + " captcha</body></html>"
+    assert not ratelimit.is_block_page(long_page)
+
+
+def test_retry_after():
+    assert ratelimit.retry_after("5") == 5.0
+    assert ratelimit.retry_after(None) is None
+    assert ratelimit.retry_after("soon") is None
+    assert ratelimit.retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_for_url_maps_hosts_to_sites():
+    assert ratelimit.for_url("https://www.croma.com/p/1") is ratelimit.for_site("croma")
+    assert ratelimit.for_url("https://api.croma.com/search") is ratelimit.for_site("croma")
+
+
+def test_processes_share_one_site_state(tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    first = ratelimit.DomainLimiter("shared", 8.0, 8, path=path)
+    # Another process's limiter: the site's state is already there, its own start values don't count
+    second = ratelimit.DomainLimiter("shared", 2.0, 2, path=path)
+    assert (second.rate, second.window) == (8.0, 8)
+    finish(first, ratelimit.THROTTLED, retry_after=0.3)
+    started = time.time()
+    second.release(second.acquire())
+    assert time.time() - started >= 0.25
+    assert second.window == 4
+
+
+def test_window_counts_slots_held_by_other_processes(tmp_path):
+    path = str(tmp_path / "shared.sqlite")
+    first = ratelimit.DomainLimiter("shared", None, 2, path=path)
+    second = ratelimit.DomainLimiter("shared", None, 2, path=path)
+    held = [first.acquire(), first.acquire()]
+    acquired = threading.Event()
+
+    def take():
+        second.release(second.acquire())
+        acquired.set()
+
+    threading.Thread(target=take, daemon=True).start()
+    assert not acquired.wait(0.3)
+    first.release(held.pop())
+    assert acquired.wait(2)
+    first.release(held.pop())
+    assert first.in_flight() == 0
+
+
+def test_slot_of_a_dead_process_expires(tmp_path, monkeypatch):
+    path = str(tmp_path / "shared.sqlite")
+    dead = ratelimit.DomainLimiter("shared", None, 1, path=path)
+    monkeypatch.setattr(ratelimit, "SLOT_LEASE", 0.2)
+    dead.acquire()
+    alive = ratelimit.DomainLimiter("shared", None, 1, path=path)
+    started = time.time()
+    alive.release(alive.acquire())
+    assert 0.1 <= time.time() - started < 2
@@ -0,0 +1,127 @@
+import vijaysales
+import extract
+
+PAGE_SIZE = 3
+
+
+def page_url(search_for, page):
+    return f"http://listing/{search_for}?page={page}"
+
+
+def page_number(url):
+    return int(url.rsplit("=", 1)[1])
+
+
+# fetch_pages over a fake listing of `pages` pages, handing pages back last first.
+# `fails` maps page -> how many times it fails before loading, `repeat` makes every page
+# serve page 1's cards and `counted` is the page count page 1 shows (None: no count).
+def fake_fetch(pages, fails=None, repeat=False, counted=None):
+    fails = dict(fails or {})
+    calls = []
+
+    def fetch_pages(urls):
+        urls = list(urls)
+        calls.append([page_number(url) for url in urls])
+        for i, url in reversed(list(enumerate(urls))):
+            page = page_number(url)
+            if fails.get(page, 0) > 0:
+                fails[page] -= 1
+                yield i, url, None
+                continue
+            if page > pages:
+                yield i, url, ({}, False, None)
+                continue
+            shown = 1 if repeat else page
+            cards = {f"https://www.vijaysales.com/ac/p/{shown}{n}": {"title": f"AC {shown}{n}", "price": "₹30,000"}
+                     for n in range(PAGE_SIZE)}
+            yield i, url, (cards, page < pages, counted if page == 1 else None)
+
+    return fetch_pages, calls
+
+
+def run(fetch_pages):
+    listing = {}
+    links = []
+    generator = vijaysales.iter_links_direct("ac", fetch_pages, listing, page_url=page_url)
+    try:
+        while True:
+            links.append(next(generator))
+    except StopIteration as stop:
+        return links, stop.value, listing
+
+
+def fetched(calls):
+    return [page for batch in calls for page in batch]
+
+
+def test_counted_pages_are_fetched_at_once():
+    fetch_pages, calls = fake_fetch(5, counted=5)
+    links, ok, listing = run(fetch_pages)
+    assert ok is True
+    assert calls == [[1], [2, 3, 4, 5]]
+    assert links == [f"https://www.vijaysales.com/ac/p/{page}{n}" for page in range(1, 6) for n in range(PAGE_SIZE)]
+    assert listing[links[0]]["price"] == "₹30,000"
+
+
+def test_without_a_count_no_page_past_the_last_is_fetched():
+    fetch_pages, calls = fake_fetch(3)
+    links, ok, _ = run(fetch_pages)
+    assert ok is True
+    assert len(links) == 3 * PAGE_SIZE
+    assert fetched(calls) == [1, 2, 3]
+
+
+def test_count_too_low_goes_on_page_by_page():
+    fetch_pages, calls = fake_fetch(5, counted=3)
+    links, ok, _ = run(fetch_pages)
+    assert ok is True
+    assert len(links) == 5 * PAGE_SIZE
+    assert calls == [[1], [2, 3], [4], [5]]
+
+
+def test_empty_page_past_the_last_ends_discovery():
+    fetch_pages, calls = fake_fetch(3, counted=4)
+    links, ok, _ = run(fetch_pages)
+    assert ok is True
+    assert len(links) == 3 * PAGE_SIZE
+
+
+def test_failed_page_is_retried():
+    fetch_pages, calls = fake_fetch(5, fails={3: 1}, counted=5)
+    links, ok, _ = run(fetch_pages)
+    assert ok is True
+    assert len(links) == 5 * PAGE_SIZE
+    assert fetched(calls).count(3) == 2
+
+
+def test_page_that_never_loads_is_not_the_last_page():
+    fetch_pages, calls = fake_fetch(5, fails={3: 99}, counted=5)
+    links, ok, _ = run(fetch_pages)
+    assert ok is False
+    assert len(links) == 2 * PAGE_SIZE
+    assert fetched(calls).count(3) == 1 + vijaysales.PAGE_RETRIES
+
+
+def test_unreadable_first_page():
+    fetch_pages, _ = fake_fetch(5, fails={1: 99})
+    assert run(fetch_pages) == ([], False, {})
+
+
+def test_page_urls_that_repeat_page_one():
+    fetch_pages, _ = fake_fetch(5, repeat=True)
+    links, ok, _ = run(fetch_pages)
+    assert ok is False
+    assert len(links) == PAGE_SIZE
+
+
+def test_read_listing_counts_pages():
+    cards = "".join(f"<div class='product-card'><a class='product-card__link' href='/ac/p/{n}'>AC {n}</a></div>"
+                    for n in range(24))
+    html = (f"<html><body><p>Showing 1 - 24 of 1,153 Products</p>{cards}"
+            f"<a class='arrow-btn' jsname='nextBtn'>Next</a></body></html>")
+    found, has_next, pages = vijaysales.read_listing(extract.parse_html(html, "https://www.vijaysales.com/"))
+    assert len(found) == 24
+    assert has_next is True
+    assert pages == 49
+    assert vijaysales.parse_listing("<html><body>No products found</body></html>", "https://www.vijaysales.com/") \
+        is None
@@ -0,0 +1,181 @@
+import threading
+import time
+
+import pytest
+
+import workers
+
+
+class FakeDriver:
+    def __init__(self):
+        self.alive = True
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise RuntimeError("session gone")
+        return "about:blank"
+
+    def quit(self):
+        self.quit_called = True
+
+
+def scrape(driver, link):
+    time.sleep(0.001)
+    return link * 2
+
+
+def test_run_parallel_yields_every_link():
+    released = []
+    results = list(workers.run_parallel(list(range(50)), scrape, FakeDriver, num_workers=4,
+                                        release_driver=lambda driver, pages: released.append(pages)))
+    assert sorted(i for i, _, _ in results) == list(range(50))
+    assert all(result == link * 2 for _, link, result in results)
+    assert len(released) == 4 and sum(released) == 50
+
+
+def test_run_parallel_reads_a_producing_iterator():
+    def links():
+        for n in range(20):
+            yield n
+
+    results = list(workers.run_parallel(links(), scrape, FakeDriver, num_workers=3, queue_size=2))
+    assert sorted(link for _, link, _ in results) == list(range(20))
+
+
+def test_scrape_errors_come_back_as_results():
+    def failing(driver, link):
+        if link == 3:
+            raise ValueError("bad page")
+        return link
+
+    results = {i: result for i, _, result in workers.run_parallel(list(range(6)), failing, FakeDriver)}
+    assert isinstance(results[3], ValueError)
+    assert len(results) == 6
+
+
+def test_driver_that_fails_to_start_returns_its_link_as_an_error():
+    started = []
+
+    def make_driver():
+        started.append(1)
+        if len(started) == 1:
+            raise RuntimeError("chrome did not start")
+        return FakeDriver()
+
+    results = {i: result for i, _, result in workers.run_parallel(list(range(20)), scrape, make_driver,
+                                                                 num_workers=3)}
+    assert sorted(results) == list(range(20))
+    assert sum(isinstance(result, RuntimeError) for result in results.values()) == 1
+
+
+def test_crashed_driver_is_replaced():
+    drivers = []
+
+    def make_driver():
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    def crashing(driver, link):
+        if link == 2:
+            driver.alive = False
+            raise RuntimeError("chrome crashed")
+        return link
+
+    results = list(workers.run_parallel(list(range(5)), crashing, make_driver, num_workers=1))
+    assert len(results) == 5
+    assert len(drivers) == 2 and drivers[0].quit_called
+
+
+def test_drivers_passed_in_are_used_first():
+    given = FakeDriver()
+    made = []
+    used = set()
+
+    def remember(driver, link):
+        used.add(id(driver))
+        return link
+
+    list(workers.run_parallel([1, 2, 3], remember, lambda: made.append(FakeDriver()) or made[-1],
+                              num_workers=1, drivers=[given]))
+    assert made == [] and used == {id(given)}
+
+
+def test_failing_link_iterator_is_raised():
+    def links():
+        yield 1
+        raise OSError("discovery failed")
+
+    with pytest.raises(OSError):
+        list(workers.run_parallel(links(), scrape, FakeDriver, num_workers=2))
+
+
+def test_closing_run_parallel_stops_the_producer():
+    taken = []
+
+    def links():
+        for n in range(1000):
+            taken.append(n)
+            yield n
+
+    results = workers.run_parallel(links(), scrape, FakeDriver, num_workers=2, queue_size=4)
+    for n, _ in enumerate(results):
+        if n == 3:
+            break
+    results.close()
+    time.sleep(0.6)
+    assert len(taken) < 50
+
+
+def test_channel_ends_after_close():
+    channel = workers.Channel(maxsize=2)
+
+    def produce():
+        for n in range(5):
+            channel.put(n)
+        channel.close()
+
+    threading.Thread(target=produce).start()
+    assert list(channel) == [0, 1, 2, 3, 4]
+
+
+def test_cancelled_channel_does_not_block():
+    channel = workers.Channel(maxsize=1)
+    assert channel.put(1)
+    channel.cancel()
+    assert channel.put(2) is False
+
+
+def test_interleave_takes_from_every_iterable():
+    assert sorted(workers.interleave(iter([1, 2]), iter([3]), iter([]))) == [1, 2, 3]
+
+
+def test_interleave_raises_once_the_others_are_done():
+    def broken():
+        yield 1
+        raise ValueError("stage failed")
+
+    seen = []
+    with pytest.raises(ValueError):
+        for item in workers.interleave(broken(), iter(range(10, 15))):
+            seen.append(item)
+    assert sorted(seen) == [1, 10, 11, 12, 13, 14]
+
+
+def test_stopping_interleave_closes_the_stages():
+    closed = threading.Event()
+
+    def stage():
+        try:
+            n = 0
+            while True:
+                n += 1
+                yield n
+        finally:
+            closed.set()
+
+    merged = workers.interleave(stage())
+    next(merged)
+    merged.close()
+    assert closed.wait(2)
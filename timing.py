@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Where a scrape spends its time. Every span is filed under one of these, anything else
+# is listed after them.
+PHASES = ("driver_startup", "navigation", "waits", "popups", "scrolling", "extraction", "csv_write")
+
+# Host suffix -> site, for code that only sees a URL
+SITE_HOSTS = {
+    "croma.com": "croma",
+    "vijaysales.com": "vijaysales",
+    "flipkart.com": "flipkart",
+    "beestarlabel.com": "beestar",
+}
+
+
+# Time spent per phase for one site: calls, total seconds and the longest single span,
+# both for the current run (since reset()) and for the life of the process. Spans can be
+# timed from worker threads; parallel spans add up, so a phase can total more than the
+# run's wall time.
+class PhaseTimer:
+    def __init__(self, site):
+        self.site = site
+        self.run = {}
+        self.total = {}
+        self.lock = threading.Lock()
+
+    def record(self, phase, seconds):
+        with self.lock:
+            for stats in (self.run, self.total):
+                calls, total, longest = stats.get(phase, (0, 0.0, 0.0))
+                stats[phase] = (calls + 1, total + seconds, max(longest, seconds))
+
+    @contextmanager
+    def span(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start)
+
+    def reset(self):
+        with self.lock:
+            self.run = {}
+
+    # Rows for the breakdown table, current run or (cumulative=True) since startup
+    def breakdown(self, cumulative=False):
+        with self.lock:
+            stats = dict(self.total if cumulative else self.run)
+        spent = sum(total for _, total, _ in stats.values())
+        rows = []
+        for phase in _ordered(stats):
+            calls, total, longest = stats[phase]
+            rows.append({
+                "Phase": phase,
+                "Calls": calls,
+                "Total (s)": round(total, 2),
+                "Mean (ms)": round(total / calls * 1000, 1),
+                "Max (ms)": round(longest * 1000, 1),
+                "Share": f"{total / spent:.0%}" if spent else "-",
+            })
+        return rows
+
+    def summary(self):
+        with self.lock:
+            stats = dict(self.run)
+        parts = [f"{phase} {stats[phase][1]:.1f}s" for phase in _ordered(stats)]
+        return "🧭 " + (", ".join(parts) if parts else "No phases timed")
+
+
+def _ordered(stats):
+    return [p for p in PHASES if p in stats] + sorted(p for p in stats if p not in PHASES)
+
+
+_timers = {}
+_timers_lock = threading.Lock()
+
+
+# Timers live for the whole server process, so the cumulative figures cover every run
+def for_site(site):
+    with _timers_lock:
+        if site not in _timers:
+            _timers[site] = PhaseTimer(site)
+        return _timers[site]
+
+
+def for_url(url):
+    host = urlsplit(url).netloc.lower()
+    for suffix, site in SITE_HOSTS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return for_site(site)
+    return for_site(host or "other")
+
+
+def _snapshot():
+    with _timers_lock:
+        timers = list(_timers.values())
+    snapshot = {}
+    for timer in timers:
+        with timer.lock:
+            snapshot[timer.site] = (dict(timer.run), dict(timer.total))
+    return snapshot
+
+
+def to_json():
+    def phases(stats):
+        return {phase: {"calls": calls, "seconds": round(total, 4), "max_seconds": round(longest, 4)}
+                for phase, (calls, total, longest) in stats.items()}
+
+    return json.dumps({site: {"run": phases(run), "total": phases(total)}
+                       for site, (run, total) in _snapshot().items()}, indent=2)
+
+
+# Prometheus text exposition format, cumulative since startup
+def to_prometheus():
+    snapshot = _snapshot()
+    metrics = (
+        ("scraper_phase_seconds_total", "counter", "Time spent in each scrape phase", 1),
+        ("scraper_phase_calls_total", "counter", "Spans timed in each scrape phase", 0),
+        ("scraper_phase_max_seconds", "gauge", "Longest single span in each scrape phase", 2),
+    )
+    lines = []
+    for name, kind, help_text, field in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for site, (_, total) in sorted(snapshot.items()):
+            for phase in _ordered(total):
+                lines.append(f'{name}{{site="{site}",phase="{phase}"}} {total[phase][field]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,365 @@
+import re
+from urllib.parse import quote
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+import canonical
+import extract
+import netlog
+import ratelimit
+import timing
+import waits
+from workers import close_iterator
+
+WAITS = waits.for_site("vijaysales")
+TIMES = timing.for_site("vijaysales")
+LIMITS = ratelimit.for_site("vijaysales")
+
+FILENAME = "VS_Data.csv"
+COLUMNS = ["Title", "Brand", "Model No", "Capacity", "BEE Star", "ISEER", "Price", "Review",
+           "No of Reviews",
+           "Cooling", "Num Buyers", "Listing Date", "Product Link"]
+# Row index -> captured listing field, for netlog.fill_missing
+LISTING_FIELDS = {0: "title", 6: "price", 7: "rating", 8: "reviews"}
+# Where a listing card shows each field, inside the card around a.product-card__link
+CARD_FIELDS = {
+    "title": ".product-card__title",
+    "price": ".product-card__price",
+    "rating": ".product-card__rating",
+    "reviews": ".product-card__reviews",
+}
+# The search API's responses; other JSON on the page lists products that are not results
+SEARCH_API = re.compile(r"vijaysales\.com/[^?]*search", re.IGNORECASE)
+# Extra tries for a listing page opened by URL that didn't load
+PAGE_RETRIES = 2
+# The result count a listing shows, e.g. "Showing 1 - 24 of 153 Products"
+RESULT_COUNT = re.compile(r"\bof\s+(\d[\d,]*)\s+(?:results|products|items)", re.IGNORECASE)
+# A listing page past the last one renders without cards and says so
+NO_RESULTS_JS = ("return /no (products?|results?) (were )?found|did not match any/i"
+                 ".test(document.body ? document.body.innerText : '')")
+
+
+def close_popup(driver):
+    with TIMES.span("popups"):
+        _close_popup(driver)
+
+
+def _close_popup(driver):
+    # Close or hide popup if it appears
+    try:
+        popup = driver.find_element(By.ID, "notify-visitors-confirm-popup-box")
+        if popup.is_displayed():
+            driver.execute_script("""
+                       let popup = document.getElementById('notify-visitors-confirm-popup-box');
+                       if (popup) popup.style.display = 'none';
+                   """)
+            # print("✅ Closed blocking popup")
+            WAITS.settle(driver, waits.hidden((By.ID, "notify-visitors-confirm-popup-box")), "popup", 0.5,
+                         replaces=0.5)
+    except:
+        pass  # Popup not found or already closed
+
+
+def specification_extraction(driver, replaces=0):
+    try:
+        WAITS.until(driver, EC.presence_of_element_located((By.CSS_SELECTOR, "ul li span.panel-list-key")),
+                    "specs", 5, replaces)
+    except Exception as e:
+        # print("❌ Specs section not found initially:", e)
+        return {}
+    with TIMES.span("extraction"):
+        return read_specs(extract.snapshot(driver))
+
+
+def read_specs(root):
+    spec_dict = {}
+    for item in extract.select(root, "ul li"):
+        key = extract.first_text(item, "span.panel-list-key", None)
+        value = extract.first_text(item, "span.panel-list-value", None)
+        if key is not None and value is not None:
+            spec_dict[key] = value
+    return spec_dict
+
+
+# Clicks through the listing with "Next", yielding each page's product links as soon as
+# it has loaded. Every page fetches its products over XHR, and the JSON (SEARCH_API
+# responses only) is captured from the network log into `listing` (product url ->
+# title/price/rating/reviews), topped up from the cards; its links are yielded too. Links
+# come out canonical and once each.
+def iter_links(driver, search_for, listing):
+    capture = netlog.NetworkCapture(driver)
+    capture.drain()
+    seen = canonical.SeenIndex()
+
+    def harvest():
+        found = []
+        for url, payload in capture.json_payloads(SEARCH_API):
+            products = netlog.find_products(payload, driver.current_url)
+            listing.update(products)
+            found.extend(link for link in products if seen.add(link))
+        return found
+
+    ratelimit.get(driver, f"https://www.vijaysales.com/search-listing?q={search_for}", TIMES)
+
+    # Wait for results page to load
+    WebDriverWait(driver, 15).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, "a.product-card__link"))
+    )
+
+    # print("✅ Search results loaded.")
+
+    while True:
+        # Wait for initial load
+        WebDriverWait(driver, 15).until(
+            EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.product-card__link"))
+        )
+
+        # The JSON first, so the listing fields are at hand when these links get scheduled
+        yield from harvest()
+        with TIMES.span("extraction"):
+            page_cards, _, _ = read_listing(extract.snapshot(driver))
+        # The same product can show up on more than one page
+        yield from _add_cards(listing, page_cards, seen)
+
+        # Check if "NEXT" button is available
+        try:
+            close_popup(driver)
+            # Find and click the "Next" button
+            next_btn = WebDriverWait(driver, 5).until(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, "a.arrow-btn[jsname='nextBtn']"))
+            )
+            is_disabled = next_btn.get_attribute("disabled")
+            WebDriverWait(driver, 15).until(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "a.product-card__link"))
+            )
+            if is_disabled:
+                # print("🔚 Reached last page.")
+                break
+            else:
+                with TIMES.span("scrolling"):
+                    driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", next_btn)
+                WAITS.settle(driver, EC.element_to_be_clickable(next_btn), "next_clickable", 2, replaces=2)
+                first_card = driver.find_element(By.CSS_SELECTOR, "a.product-card__link")
+                with LIMITS.slot():
+                    next_btn.click()
+                    # Let the next page load: the old cards go stale once it has been swapped in
+                    WAITS.settle(driver, waits.stale(first_card), "next_page", 5, replaces=5)
+        except Exception as e:
+            # print(f"❌ Could not click next: {e}")
+            break
+
+    yield from harvest()
+
+
+def listing_url(search_for, page=1):
+    return f"https://www.vijaysales.com/search-listing?q={quote(search_for)}&page={page}"
+
+
+# The cards on one listing page as {canonical product url: title/price/rating/reviews}
+# in page order, whether the page has an enabled "Next" button, and how many listing
+# pages there are going by the result count it shows (None if it shows none)
+def read_listing(root):
+    cards = {}
+    for link in extract.select(root, "a.product-card__link"):
+        if not link.get("href"):
+            continue
+        card = next((parent for parent in link.iterancestors()
+                     if "product-card" in (parent.get("class") or "").split()), link)
+        record = {field: extract.first_text(card, selector, None) for field, selector in CARD_FIELDS.items()}
+        record["title"] = record["title"] or extract.text(link) or None
+        cards.setdefault(canonical.canonical_url(link.get("href")), record)
+    next_btn = extract.first(root, "a.arrow-btn[jsname='nextBtn']")
+    has_next = next_btn is not None and next_btn.get("disabled") is None
+    total = RESULT_COUNT.search(extract.text(root)) if cards else None
+    pages = -(-int(total.group(1).replace(",", "")) // len(cards)) if total else None
+    return cards, has_next, pages
+
+
+# For listing pages fetched over HTTP, None when the cards are not in the static HTML
+def parse_listing(html, url):
+    listed = read_listing(extract.parse_html(html, url))
+    return listed if listed[0] else None
+
+
+# Files a page's cards under `listing` and returns the links `seen` didn't have yet
+def _add_cards(listing, cards, seen):
+    for link, record in cards.items():
+        netlog.add_card(listing, link, record)
+    return [link for link in cards if seen.add(link)]
+
+
+# A page past the last one gives no cards and no "Next" rather than None, so it ends
+# discovery instead of counting as a page that timed out
+def scrape_listing(driver, url):
+    with TIMES.span("navigation"):
+        driver.get(url)
+    try:
+        WAITS.until(driver, lambda d: d.find_elements(By.CSS_SELECTOR, "a.product-card__link")
+                    or d.execute_script(NO_RESULTS_JS), "listing", 15)
+    except TimeoutException:
+        return None
+    with TIMES.span("extraction"):
+        return read_listing(extract.snapshot(driver))
+
+
+# Discovery without clicking "Next": listing pages are opened straight by URL through
+# fetch_pages(urls) (which yields (index, url, result) like fetch_parsed and run_parallel
+# do), until a page adds no new products or has no "Next" button. When page 1 shows the
+# result count, every other page is asked for at once; otherwise one page at a time, as
+# only a "Next" button says the next page exists, so no page past the last one is ever
+# opened. Yields each page's new links in page order as soon as every page before it is
+# in, and files the cards' fields under `listing` like iter_links does. A page that
+# doesn't load is tried again (PAGE_RETRIES times); it is never taken for the last page.
+# Returns False (as the generator's return value) when the page URLs don't work, i.e.
+# page 1 is unreadable, page 2 repeats page 1 while page 1 says there is more, or a page
+# still doesn't load after its retries, so the caller can click through instead; True
+# otherwise. page_url(search_for, page) builds the page URLs, listing_url by default.
+def iter_links_direct(search_for, fetch_pages, listing, page_url=listing_url):
+    first = [result for _, _, result in fetch_pages([page_url(search_for, 1)])]
+    if not first or not isinstance(first[0], tuple):
+        return False
+    cards, has_next, pages = first[0]
+    seen = canonical.SeenIndex()
+    yield from _add_cards(listing, cards, seen)
+
+    page = 2
+    while has_next:
+        start = page
+        # Past the counted pages (or without a count) only the page "Next" points to
+        urls = [page_url(search_for, p) for p in range(start, max(pages or 0, start) + 1)]
+        arrived = {}
+        results = fetch_pages(urls)
+        try:
+            for i, _, result in results:
+                arrived[i] = result
+                while has_next and page - start in arrived:
+                    result = arrived.pop(page - start)
+                    for _ in range(PAGE_RETRIES):
+                        if isinstance(result, tuple):
+                            break
+                        result = next((r for _, _, r in fetch_pages([urls[page - start]])), None)
+                    if not isinstance(result, tuple):
+                        return False
+                    cards, has_next, _ = result
+                    new_links = _add_cards(listing, cards, seen)
+                    if not new_links:
+                        if page == 2:
+                            return False
+                        has_next = False
+                    yield from new_links
+                    page += 1
+                if not has_next:
+                    break
+        finally:
+            close_iterator(results)
+        if page - start < len(urls) and has_next:
+            # fetch_pages stopped short of the pages asked for
+            return False
+
+    return True
+
+
+def build_row(item_title, spec_dict, item_price, item_review, item_no_of_reviews, num_buyers, new_link):
+    return [
+        item_title,
+        spec_dict.get('BRAND', "NA"),
+        spec_dict.get('MODEL NAME', "NA"),
+        spec_dict.get('CAPACITY', "NA"),
+        spec_dict.get('STAR RATING') or spec_dict.get('ENERGY RATING', 'NA'),
+        spec_dict.get('ISEER VALUE') or spec_dict.get('ISEER', 'NA'),
+        item_price,
+        item_review,
+        item_no_of_reviews,
+        spec_dict.get('COOLING') or spec_dict.get('RATED COOLING CAPACITY', 'NA'),
+        num_buyers,
+        spec_dict.get('ITEM AVAILABLE FROM DATE', "NA"),
+        new_link
+    ]
+
+
+# Scrapes one product page with the given driver. Returns the CSV row, or None when the
+# page did not load in time. Pages that gave a full row are stored in `cache` (a
+# PageCache) if given. The caller looks the page up there first: specs_page is the cached
+# HTML when it is still fresh for specs, and then the scroll-and-wait spec loop is skipped.
+def scrape_product(driver, new_link, cache=None, specs_page=None):
+    cached_specs = read_specs(extract.parse_html(specs_page, new_link)) if specs_page else {}
+
+    try:
+        with TIMES.span("navigation"):
+            driver.get(new_link)
+        close_popup(driver)
+        with TIMES.span("waits"):
+            WebDriverWait(driver, 25).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "h1.productFullDetail__productName"))
+            ) or WebDriverWait(driver, 15).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "p.product__tags--label.label-two"))
+            )
+        # print("✅ Product page loaded.")
+
+    except TimeoutException:
+        return None
+
+    # Read the header fields from one page snapshot
+    with TIMES.span("extraction"):
+        item_title, item_price, item_review, item_no_of_reviews, num_buyers = read_header(extract.snapshot(driver))
+
+    # == Extracting data from specifications ==
+    if cached_specs:
+        return build_row(item_title, cached_specs, item_price, item_review, item_no_of_reviews, num_buyers,
+                         new_link)
+
+    scroll_attempts = 3
+    scroll_height = 1200
+    spec_dict = {}
+
+    for attempt in range(scroll_attempts):
+        with TIMES.span("scrolling"):
+            driver.execute_script(f"window.scrollBy(0, {scroll_height});")
+        # specification_extraction waits for the spec list itself, no need to sleep first
+        spec_dict = specification_extraction(driver, replaces=1)
+        if spec_dict:  # Break if we got the specs
+            break
+        scroll_height += 350
+
+    if not spec_dict:
+        pass
+        # print("⚠️ Specs not found even after scrolling.")
+    elif cache is not None and item_title != "NA":
+        cache.put(new_link, driver.page_source)
+
+    return build_row(item_title, spec_dict, item_price, item_review, item_no_of_reviews, num_buyers, new_link)
+
+
+def read_header(root):
+    item_title = extract.first_text(root, "h1.productFullDetail__productName")
+    num_buyers = extract.first_text(root, "p.product__tags--label.label-two")
+
+    item_price_elem = extract.first(root, ".product__price--price")
+    if item_price_elem is None:
+        item_price = "NA"
+    else:
+        item_price = item_price_elem.get("data-final-price")
+        if item_price is None:
+            item_price = extract.text(item_price_elem).removeprefix("₹")
+
+    item_review = extract.first_text(root, "p.product__title--stats")
+    item_no_of_reviews = extract.first_text(root, "p.product__title--stats span")
+    item_no_of_reviews = item_no_of_reviews.removeprefix("(").removesuffix(")")
+
+    return item_title, item_price, item_review, item_no_of_reviews, num_buyers
+
+
+# Parses a product page fetched over plain HTTP. Returns the CSV row, or None when the
+# title or the spec list is missing from the static HTML and the page has to go through
+# the browser instead.
+def parse_product(html, new_link):
+    root = extract.parse_html(html, new_link)
+    item_title, item_price, item_review, item_no_of_reviews, num_buyers = read_header(root)
+    spec_dict = read_specs(root)
+    if item_title in ("NA", "") or not spec_dict:
+        return None
+
+    return build_row(item_title, spec_dict, item_price, item_review, item_no_of_reviews, num_buyers, new_link)
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import deque
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+
+import timing
+
+POLL = 0.1
+MIN_SAMPLES = 5
+
+
+# Wraps WebDriverWait so every wait is timed. Each site's WAITS keeps the latencies per
+# wait name, and once there are a few samples the timeout shrinks to ~3x the observed p95
+# (never above the timeout the caller asked for). It also counts the waits, the total time
+# spent in them and the time saved over fixed sleeps. A wait that took the place of a
+# time.sleep passes that sleep as `replaces` and returns as soon as the page is ready;
+# what it saved is the part of the sleep it did not take, nothing if it ran longer.
+class WaitController:
+    def __init__(self, site, min_timeout=2.0):
+        self.site = site
+        self.min_timeout = min_timeout
+        self.samples = {}
+        self.saved = 0.0
+        self.waited = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def timeout(self, name, default):
+        with self.lock:
+            samples = sorted(self.samples.get(name, ()))
+        if len(samples) < MIN_SAMPLES:
+            return default
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return min(default, max(self.min_timeout, p95 * 3))
+
+    def record(self, name, took, replaces=0):
+        with self.lock:
+            self.samples.setdefault(name, deque(maxlen=50)).append(took)
+            self.waited += took
+            self.count += 1
+            if replaces:
+                self.saved += max(0.0, replaces - took)
+
+    def until(self, driver, condition, name, timeout, replaces=0):
+        limit = self.timeout(name, timeout)
+        start = time.time()
+        try:
+            return WebDriverWait(driver, limit, poll_frequency=POLL).until(condition)
+        finally:
+            took = time.time() - start
+            self.record(name, took, replaces)
+            timing.for_site(self.site).record("waits", took)
+
+    # Same as until() but a timeout just means "carry on", like the sleep it replaces
+    def settle(self, driver, condition, name, timeout, replaces=0):
+        try:
+            return self.until(driver, condition, name, timeout, replaces)
+        except TimeoutException:
+            return False
+
+    def reset(self):
+        with self.lock:
+            self.saved = 0.0
+            self.waited = 0.0
+            self.count = 0
+
+    def summary(self):
+        return f"⏱️ {self.count} waits took {self.waited:.1f}s, saving ~{self.saved:.1f}s over fixed sleeps"
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+# Controllers live for the whole server process, so learned timeouts carry over between
+# Streamlit reruns.
+def for_site(site):
+    with _controllers_lock:
+        if site not in _controllers:
+            _controllers[site] = WaitController(site)
+        return _controllers[site]
+
+
+# === Conditions ===
+
+def count_changed(selector, before):
+    return lambda driver: len(driver.find_elements(By.CSS_SELECTOR, selector)) != before
+
+
+def stale(element):
+    return EC.staleness_of(element)
+
+
+def hidden(locator):
+    return EC.invisibility_of_element_located(locator)
+
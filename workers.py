@@ -0,0 +1,231 @@
+import os
+import queue
+import threading
+import types
+
+_DONE = object()
+
+
+# Stops a generator that is being read (link discovery, a pipeline stage) so its finally
+# blocks run and the browsers or threads behind it are given back
+def close_iterator(iterator):
+    if isinstance(iterator, types.GeneratorType):
+        try:
+            iterator.close()
+        except Exception:
+            pass
+
+
+def default_workers():
+    return max(1, min(8, (os.cpu_count() or 2) // 2))
+
+
+def _driver_alive(driver):
+    try:
+        driver.current_url
+        return True
+    except:
+        return False
+
+
+# Runs scrape(driver, link) for every link on `num_workers` browsers at once and yields
+# (index, link, result) as pages finish. `result` is whatever scrape returned, or the
+# exception it raised. Each worker pulls the next link off a shared queue, so a slow page
+# only holds up its own browser. Drivers passed in `drivers` are used first (e.g. the one
+# that did the link discovery), the rest come from make_driver() when a worker gets its
+# first link, or its next one after Chrome crashed. If make_driver() fails, that link
+# comes back with its exception and the worker stops, the others carry on with the
+# queue. At the end every driver is handed to release_driver(driver, pages_scraped),
+# which by default quits it, and after_page(driver), if given, is called after every page.
+# `links` can also be an iterator that is still producing, e.g. link discovery: it is
+# read on a thread of its own into a queue of at most `queue_size` links, so a producer
+# that gets ahead of the browsers is paused instead of piling up links.
+def run_parallel(links, scrape, make_driver, num_workers=4, drivers=None, release_driver=None,
+                 queue_size=None, after_page=None):
+    if release_driver is None:
+        release_driver = lambda driver, pages: driver.quit()
+    sized = hasattr(links, "__len__")
+    if sized and not links:
+        for driver in drivers or []:
+            release_driver(driver, 0)
+        return
+
+    spare = list(drivers or [])
+    num_workers = max(1, min(num_workers, len(links)) if sized else num_workers)
+    while len(spare) > num_workers:
+        release_driver(spare.pop(), 0)
+
+    jobs = queue.Queue(maxsize=queue_size or 0)
+    results = queue.Queue()
+    stop = threading.Event()
+    feed_errors = []
+    worker_errors = []
+    fed = 0
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                jobs.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def feed():
+        nonlocal fed
+        link_iter = iter(links)
+        try:
+            for i, link in enumerate(link_iter):
+                if not put((i, link)):
+                    return
+                fed = i + 1
+        except Exception as e:
+            feed_errors.append(e)
+        finally:
+            close_iterator(link_iter)
+            for _ in range(num_workers):
+                put(_DONE)
+
+    def worker(driver):
+        pages = 0
+        try:
+            while not stop.is_set():
+                try:
+                    job = jobs.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if job is _DONE:
+                    break
+                i, link = job
+                if driver is None:
+                    try:
+                        driver = make_driver()
+                    except Exception as e:
+                        # The link comes back as an error instead of going down with the worker
+                        results.put((i, link, e))
+                        raise
+                pages += 1
+                try:
+                    results.put((i, link, scrape(driver, link)))
+                    if after_page is not None:
+                        after_page(driver)
+                except Exception as e:
+                    results.put((i, link, e))
+                    # Chrome crashed or the session went away, the next link gets a fresh browser
+                    if not _driver_alive(driver):
+                        try:
+                            driver.quit()
+                        except:
+                            pass
+                        driver = None
+                        pages = 0
+        except Exception as e:
+            worker_errors.append(e)
+        finally:
+            if driver is not None:
+                try:
+                    release_driver(driver, pages)
+                except:
+                    pass
+            results.put(_DONE)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    threads = []
+    for n in range(num_workers):
+        driver = spare[n] if n < len(spare) else None
+        t = threading.Thread(target=worker, args=(driver,), daemon=True)
+        t.start()
+        threads.append(t)
+
+    running = num_workers
+    received = 0
+    try:
+        while running:
+            item = results.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            received += 1
+            yield item
+
+        # The link iterator failed, or every worker died before finishing the queue
+        stop.set()
+        feeder.join(timeout=30)
+        if feed_errors:
+            raise feed_errors[0]
+        if received < fed and worker_errors:
+            raise worker_errors[0]
+    finally:
+        stop.set()
+        for t in threads:
+            t.join(timeout=30)
+
+
+# Queue between two stages of a pipeline that the next stage can iterate over. put()
+# blocks while `maxsize` items are waiting; iteration ends once close() is called and
+# everything put before it has been taken. When the next stage gives up, cancel() makes
+# put() return False instead of blocking the stage before it for good.
+class Channel:
+    def __init__(self, maxsize=0):
+        self.queue = queue.Queue(maxsize)
+        self.cancelled = threading.Event()
+
+    def put(self, item):
+        while not self.cancelled.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def close(self):
+        self.put(_DONE)
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                return
+            yield item
+
+
+# Runs every iterable on a thread of its own and yields their items as they come, so one
+# loop can take results from several pipeline stages. An exception in one of them is
+# raised once the others are done. If the loop stops early, each stage is closed once it
+# hands over its next item, so the scrapes behind it stop too.
+def interleave(*iterables):
+    results = queue.Queue()
+    errors = []
+    stop = threading.Event()
+
+    def drain(iterable):
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    break
+                results.put(item)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            close_iterator(iterable)
+            results.put(_DONE)
+
+    for iterable in iterables:
+        threading.Thread(target=drain, args=(iterable,), daemon=True).start()
+    running = len(iterables)
+    try:
+        while running:
+            item = results.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()